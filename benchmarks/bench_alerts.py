@@ -0,0 +1,51 @@
+"""Measure alert throughput (messages/s): one SMTP session per email vs the pooled dispatcher.
+
+Run from the repository root:  python benchmarks/bench_alerts.py [messages]
+"""
+import os
+import sys
+import time
+import smtplib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from smtp_sink import SMTPSink  # noqa: E402
+from website.send_email import AlertDispatcher  # noqa: E402
+
+SENDER = "fim@example.com"
+PAYLOAD = "<html><body>benchmark alert</body></html>"
+
+
+def connection_per_message(port, recipients):
+    """The original send loop: connect and log in once per recipient."""
+    for recipient in recipients:
+        with smtplib.SMTP("127.0.0.1", port) as server:
+            server.login(SENDER, "secret")
+            server.sendmail(SENDER, recipient, PAYLOAD)
+
+
+def pooled_dispatcher(port, recipients):
+    dispatcher = AlertDispatcher(host="127.0.0.1", port=port, use_ssl=False,
+                                 sender=SENDER, password="secret", queue_size=len(recipients))
+    dispatcher.submit(recipients, "benchmark", PAYLOAD)
+    dispatcher.flush()
+    dispatcher._disconnect()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    recipients = [f"admin{i}@example.com" for i in range(count)]
+
+    for label, fn in (("connection per message", connection_per_message), ("pooled dispatcher", pooled_dispatcher)):
+        sink = SMTPSink().start()
+        started = time.perf_counter()
+        fn(sink.port, recipients)
+        elapsed = time.perf_counter() - started
+        sink.shutdown()
+        print(f"{label:<24} {count / elapsed:>10.0f} messages/s "
+              f"({sink.messages} delivered over {sink.connections} connections)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Storage ratio and restore time for compressed base + delta backups of one large config file.
+
+Run from the repository root:  python benchmarks/bench_backups.py [size_mb] [versions]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from website.backup_store import BackupStore  # noqa: E402
+
+
+def make_xml(size):
+    """Build an XML document of roughly `size` bytes as a list of lines."""
+    lines = [b'<?xml version="1.0"?>\n', b"<config>\n"]
+    total = 0
+    i = 0
+    while total < size:
+        line = b'  <item id="%d" name="setting-%d" value="%d" enabled="true"/>\n' % (i, i, random.randrange(10**6))
+        lines.append(line)
+        total += len(line)
+        i += 1
+    lines.append(b"</config>\n")
+    return lines
+
+
+def edit(lines, edits=20):
+    """Change, insert and delete a handful of lines, like an admin editing the file."""
+    for _ in range(edits):
+        i = random.randrange(2, len(lines) - 1)
+        choice = random.random()
+        if choice < 0.6:
+            lines[i] = b'  <item id="%d" value="%d"/>\n' % (i, random.randrange(10**6))
+        elif choice < 0.8:
+            lines.insert(i, b'  <item id="new" value="%d"/>\n' % random.randrange(10**6))
+        else:
+            del lines[i]
+
+
+def main():
+    size = int(float(sys.argv[1]) * 2**20) if len(sys.argv) > 1 else 5 * 2**20
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    random.seed(42)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = BackupStore(os.path.join(directory, "Backups"))
+        path = os.path.join(directory, "big.xml")
+        lines = make_xml(size)
+        expected = {}
+
+        started = time.perf_counter()
+        for version in range(1, count + 1):
+            if version > 1:
+                edit(lines)
+            data = b"".join(lines)
+            with open(path, "wb") as f:
+                f.write(data)
+            store.backup(path, "big.xml")
+            expected[version] = data
+        backup_time = time.perf_counter() - started
+
+        restore_times = []
+        for version, data in expected.items():
+            started = time.perf_counter()
+            store.restore("big.xml", path, version)
+            restore_times.append(time.perf_counter() - started)
+            with open(path, "rb") as f:
+                assert f.read() == data, f"version {version} did not restore byte-for-byte"
+
+        stats = store.stats()
+        print(f"{count} versions of a {size / 2**20:.1f} MB XML file")
+        print(f"verbatim copies     {stats['logical_bytes'] / 2**20:>10.1f} MB")
+        print(f"base + deltas       {stats['stored_bytes'] / 2**20:>10.1f} MB "
+              f"({stats['full_objects']} full, {stats['delta_objects']} delta objects)")
+        print(f"storage ratio       {stats['logical_bytes'] / stats['stored_bytes']:>10.1f}x")
+        print(f"backup time         {backup_time / count * 1000:>10.1f} ms/version")
+        print(f"restore time        {sum(restore_times) / count * 1000:>10.1f} ms avg, "
+              f"{max(restore_times) * 1000:.1f} ms max")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Sweep file sizes and compare the 4 KiB hashing loop with each read strategy.
+
+Run from the repository root:  python benchmarks/bench_hash_strategies.py [max_size_mib] [repeats]
+Files are hashed warm (from the page cache), so the numbers measure per-call overhead,
+not the disk.
+"""
+import os
+import sys
+import time
+import hashlib
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from website import hash_engine  # noqa: E402
+from website.hash_engine import _read_and_hash, choose_strategy  # noqa: E402
+
+SIZES = [4 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2, 256 * 1024 ** 2, 1024 ** 3]
+STRATEGIES = ("oneshot", "readinto", "mmap", "auto")
+
+
+def legacy_4k(path):
+    """The original calculate_sha256 loop."""
+    with open(path, "rb") as f:
+        sha256 = hashlib.sha256()
+        while chunk := f.read(4096):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def make_file(directory, size):
+    path = os.path.join(directory, f"blob_{size}.dll")
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining:
+            block = os.urandom(min(remaining, 16 * 1024 ** 2))
+            f.write(block)
+            remaining -= len(block)
+    return path
+
+
+def timed(fn, path, repeats):
+    """Best of `repeats` runs (seconds) and the digest."""
+    best, digest = float("inf"), None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        digest = fn(path)
+        best = min(best, time.perf_counter() - started)
+    return best, digest
+
+
+def label(size):
+    return f"{size // 1024 ** 2} MiB" if size >= 1024 ** 2 else f"{size // 1024} KiB"
+
+
+def main():
+    max_size = (int(sys.argv[1]) if len(sys.argv) > 1 else 256) * 1024 ** 2
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    chunk_size = hash_engine.HASH_CHUNK_SIZE
+
+    print(f"{'size':>8} {'4 KiB loop':>12}" + "".join(f"{name:>12}" for name in STRATEGIES) + "   (MB/s, auto picks)")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (s for s in SIZES if s <= max_size):
+            path = make_file(directory, size)
+            legacy_time, expected = timed(legacy_4k, path, repeats)
+            row = f"{label(size):>8} {size / legacy_time / 2**20:>12.0f}"
+            for strategy in STRATEGIES:
+                elapsed, (digest, _) = timed(lambda p, s=strategy: _read_and_hash(p, chunk_size, s), path, repeats)
+                assert digest == expected, f"{strategy} digest differs at {label(size)}"
+                row += f"{size / elapsed / 2**20:>12.0f}"
+            print(f"{row}   {choose_strategy(size)}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
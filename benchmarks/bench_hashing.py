@@ -0,0 +1,65 @@
+"""Compare the serial 4 KiB hashing loop against the parallel hash engine.
+
+Run from the repository root:  python benchmarks/bench_hashing.py [files] [size_kib]
+"""
+import os
+import sys
+import time
+import hashlib
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from website.hash_engine import hash_files  # noqa: E402
+
+
+def serial_4k(paths):
+    """The original calculate_sha256 loop, one file at a time."""
+    results = []
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            sha256 = hashlib.sha256()
+            while chunk := f.read(4096):
+                sha256.update(chunk)
+        results.append((path, sha256.hexdigest()))
+    return results
+
+
+def make_tree(directory, count, size):
+    """Write `count` random files of `size` bytes under `directory`."""
+    paths = []
+    for i in range(count):
+        sub = os.path.join(directory, f"d{i % 16:02d}")
+        os.makedirs(sub, exist_ok=True)
+        path = os.path.join(sub, f"f{i:06d}.xml")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+def report(label, fn, paths, total_bytes):
+    started = time.perf_counter()
+    results = fn(paths)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<24} {len(paths) / elapsed:>10.0f} files/s {total_bytes / elapsed / 2**20:>10.1f} MB/s")
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    size = (int(sys.argv[2]) if len(sys.argv) > 2 else 256) * 1024
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_tree(directory, count, size)
+        total_bytes = count * size
+        print(f"{count} files x {size // 1024} KiB, {os.cpu_count()} CPUs")
+
+        expected = report("serial 4 KiB (current)", serial_4k, paths, total_bytes)
+        for mode in ("serial", "thread", "process"):
+            results = report(f"engine {mode}", lambda p, m=mode: hash_files(p, mode=m), paths, total_bytes)
+            assert results == expected, f"{mode} results differ from the serial path"
+
+
+if __name__ == "__main__":
+    main()
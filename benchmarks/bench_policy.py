@@ -0,0 +1,55 @@
+"""Per-path cost of critical-file classification: old splitext + list scan vs the compiled policy.
+
+Run from the repository root:  python benchmarks/bench_policy.py [paths]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from website.policy import CriticalPolicy, CRITICAL_EXTENSIONS  # noqa: E402
+
+
+def old_is_critical(file_path):
+    """The original check from fim_utils.py / fim_monitor.py."""
+    return os.path.splitext(file_path)[1] in CRITICAL_EXTENSIONS
+
+
+def timed(label, fn, paths):
+    started = time.perf_counter()
+    for path in paths:
+        fn(path)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<36} {elapsed / len(paths) * 1e9:>8.0f} ns/path")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    random.seed(7)
+    extensions = [".conf", ".xml", ".json", ".dll", ".txt", ".png", ".gif", ".pdf", ".log"]
+    paths = [
+        os.path.join("Monitor", f"dir{random.randrange(500)}", f"file{i}{random.choice(extensions)}")
+        for i in range(count)
+    ]
+
+    extension_policy = CriticalPolicy(cache_size=count * 2)
+    mixed_policy = CriticalPolicy(
+        [("extension", ext) for ext in CRITICAL_EXTENSIONS]
+        + [("glob", "*.ini"), ("glob", "dir1*/secret*"), ("regex", r"(^|/)\.env$"), ("prefix", "dir42")],
+        cache_size=count * 2,
+    )
+
+    timed("old splitext + list", old_is_critical, paths)
+    timed("policy, extensions, cold cache", extension_policy.is_critical, paths)
+    timed("policy, extensions, warm cache", extension_policy.is_critical, paths)
+    timed("policy, mixed rules, cold cache", mixed_policy.is_critical, paths)
+    timed("policy, mixed rules, warm cache", mixed_policy.is_critical, paths)
+
+    mismatches = sum(old_is_critical(p) != extension_policy.is_critical(p) for p in paths)
+    print(f"decisions differing from the old check: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""A tiny local SMTP server that accepts and counts mail, for exercising the alert dispatcher.
+
+    python benchmarks/smtp_sink.py [port]
+
+then set send_email.SMTP_SERVER = "localhost", SMTP_PORT = <port>, SMTP_USE_SSL = False.
+"""
+import sys
+import threading
+import socketserver
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Speak just enough SMTP (EHLO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT) for smtplib."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        try:
+            self.converse()
+        finally:
+            with self.server.lock:
+                self.server.closed += 1
+
+    def converse(self):
+        self.reply("220 fim-sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            text = line.decode(errors="replace").strip()
+            command = text.split(" ", 1)[0].upper()
+
+            if command == "EHLO":
+                self.reply("250-fim-sink")
+                self.reply("250-AUTH PLAIN LOGIN")
+                self.reply("250 OK")
+            elif command == "HELO":
+                self.reply("250 fim-sink")
+            elif command == "AUTH":
+                self.reply("535 Authentication failed" if self.server.reject_auth else "235 Authentication successful")
+            elif command == "RCPT":
+                with self.server.lock:
+                    self.server.recipients.append(text.split(":", 1)[-1].strip("<> "))
+                refused = self.server.recipients[-1] in self.server.refuse
+                self.reply("550 No such user" if refused else "250 OK")
+            elif command in ("MAIL", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self.reply("250 OK: queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, refuse=(), reject_auth=False):
+        super().__init__(("127.0.0.1", port), SMTPSinkHandler)
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.connections = 0
+        self.closed = 0  # Connections the client has hung up
+        self.recipients = []  # Every RCPT address, in order
+        self.refuse = set(refuse)  # Addresses answered with a permanent 550
+        self.reject_auth = reject_auth  # Answer AUTH with 535
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    sink = SMTPSink(int(sys.argv[1]) if len(sys.argv) > 1 else 1025)
+    print(f"SMTP sink listening on 127.0.0.1:{sink.port}")
+    sink.serve_forever()
@@ -0,0 +1,124 @@
+# conftest.py
+import os
+import sys
+import time
+import tempfile
+
+import pytest
+
+# The stores, logs and checkpoints use paths relative to the working directory, and
+# website.fim_utils opens fim.log on import: keep all of that out of the checkout.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+os.chdir(tempfile.mkdtemp(prefix="fim-tests-"))
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run every test in its own working directory (fresh baseline, event and state files)."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def monitored(tmp_path):
+    """A registered monitored root over an empty folder, with its own baseline partition."""
+    from website.roots import root_registry
+
+    path = tmp_path / "root"
+    path.mkdir()
+    yield root_registry.add("test", str(path))
+    root_registry.roots.pop("test", None)
+
+
+def write(path, data=b"x"):
+    """Create a file (and its folders) with the given content; returns its str path."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def wait_for(job_id, tracker=None, timeout=5):
+    """Poll a background job until it finishes; returns its status record."""
+    from website.jobs import job_tracker
+
+    tracker = tracker or job_tracker
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = tracker.get(job_id)
+        if job["finished"] is not None:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+@pytest.fixture
+def recorded(tmp_path, monkeypatch):
+    """(event store, alerts) of FIMHandlers, captured instead of written to events.db and sent."""
+    from collections import OrderedDict
+
+    from website import event_store, handler
+    from website.event_store import EventStore
+
+    store = EventStore(str(tmp_path / "events.db"))
+    alerts = []
+    monkeypatch.setattr(event_store, "_event_store", store)
+    monkeypatch.setattr(handler, "send_critical_alert", lambda **alert: alerts.append(alert))
+    monkeypatch.setattr(handler.FIMHandler, "get_admin_emails", lambda self: ["admin@example.com"])
+    monkeypatch.setattr(handler.event_pipeline, "claims", {})
+    monkeypatch.setattr(handler.event_pipeline, "recent", OrderedDict())
+    yield store, alerts
+    store.close()
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """The Flask app on a throwaway user database."""
+    import website
+    from website.roots import root_registry
+
+    website.DB_PATH = str(tmp_path_factory.mktemp("db") / "users.db")
+    app = website.create_app()
+    app.config["TESTING"] = True
+    yield app
+    root_registry.stop_scheduler()
+
+
+@pytest.fixture
+def browse_root(monitored, monkeypatch):
+    """Point the file browser (and the default root its handlers use) at the test root."""
+    from website import views
+    from website.roots import root_registry
+
+    monkeypatch.setattr(views, "ROOT_FOLDER", monitored.path)
+    monkeypatch.setattr(root_registry.default, "path", monitored.path)
+    return monitored
+
+
+def login_client(app, role="employee", name=None):
+    """A test client signed in as a (new or existing) user, without starting monitoring."""
+    from website import db
+    from website.models import User
+
+    name = name or role.capitalize()
+    with app.app_context():
+        user = User.query.filter_by(email=f"{name.lower()}@example.com").first()
+        if user is None:
+            user = User(email=f"{name.lower()}@example.com", firstName=name, password="x", role=role)
+            db.session.add(user)
+            db.session.commit()
+        user_id = user.id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+    return client
+
+
+@pytest.fixture
+def client(app):
+    return login_client(app)
+
+
+@pytest.fixture
+def admin_client(app):
+    return login_client(app, "admin")
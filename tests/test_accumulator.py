@@ -0,0 +1,36 @@
+from website.accumulator import AlertWindows, ChangeWindow, alert_paths
+
+
+def test_window_counts_everything_but_samples_a_bounded_set():
+    window = ChangeWindow(sample_size=2)
+    window.record(added=["a", "b", "c"], deleted=["d"])
+    window.add("added", "a")  # Already sampled: counted, not stored twice
+
+    snapshot = window.rollover()
+    assert snapshot["counts"]["added"] == 4 and snapshot["counts"]["deleted"] == 1
+    assert snapshot["paths"]["added"] == ["a", "b"]
+    assert snapshot["overflow"]["added"] == 1
+    assert snapshot["rounds"] == 1
+    assert alert_paths(snapshot, "added") == ["a", "b", "... and 1 more"]
+    assert alert_paths(snapshot, "deleted") == ["d"]
+
+
+def test_rollover_starts_an_empty_window():
+    window = ChangeWindow()
+    window.add("modified", "a")
+    window.rollover()
+
+    assert window.total() == 0
+    assert window.rollover()["paths"]["modified"] == []
+
+
+def test_alert_windows_evict_the_least_recently_used_group():
+    windows = AlertWindows(max_windows=2)
+    first = windows.window(["a@x.com"])
+    windows.window("b@x.com")
+    assert windows.window(("a@x.com",)) is first  # Lists and tuples name the same group
+    windows.window("c@x.com")
+
+    assert len(windows) == 2
+    assert windows.pop("b@x.com") is None
+    assert windows.pop(["a@x.com"]) is first
@@ -0,0 +1,187 @@
+import builtins
+import hashlib
+import os
+
+import pytest
+
+from conftest import write
+from website import backup_store, fim_monitor
+from website.backup_store import BackupStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BackupStore(str(tmp_path / "Backups"))
+    yield store
+    store.close()
+
+
+def test_ingest_streams_large_files_to_a_full_object(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_store, "MAX_DELTA_SIZE", 8)
+    monkeypatch.setattr(backup_store, "INGEST_CHUNK_SIZE", 4)
+    data = b"0123456789abcdef"
+
+    record, created, file_hash = store.ingest(write(tmp_path / "big.bin", data), "big.bin")
+
+    assert created and file_hash == hashlib.sha256(data).hexdigest()
+    assert store.read(file_hash) == data
+    assert [name for name in os.listdir(store.objects_dir) if name.endswith(".tmp")] == []
+
+
+def test_ingest_read_error_closes_and_removes_the_temp_object(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_store, "MAX_DELTA_SIZE", 8)
+    monkeypatch.setattr(backup_store, "INGEST_CHUNK_SIZE", 4)
+    source = write(tmp_path / "big.bin", b"0123456789abcdef")
+    opened = []
+
+    class FailingReader:
+        def __init__(self, f):
+            self.f, self.reads = f, 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.f.close()
+
+        def read(self, size):
+            self.reads += 1
+            if self.reads == 4:  # After the switch to streaming compression
+                raise OSError("I/O error")
+            return self.f.read(size)
+
+    def fake_open(path, mode="r", *args):
+        f = builtins.open(path, mode, *args)
+        if path == source:
+            return FailingReader(f)
+        opened.append(f)
+        return f
+
+    monkeypatch.setattr(backup_store, "open", fake_open, raising=False)
+    with pytest.raises(OSError):
+        store.ingest(source, "big.bin")
+
+    assert len(opened) == 1 and opened[0].closed
+    assert not os.path.exists(opened[0].name)
+    assert store.latest("big.bin") is None
+
+
+def test_ingest_directory_flushes_the_baseline_in_batches(monitored, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_store, "_backup_stores", {})
+    monkeypatch.setattr(fim_monitor, "SCAN_HASH_WINDOW", 2)
+    for n in range(5):
+        write(tmp_path / "root" / f"f{n}.conf", b"content %d" % n)
+
+    fim_monitor.ingest_directory(monitored.path)
+
+    baseline = monitored.open_baseline()
+    try:
+        assert baseline.count() == 5
+        assert baseline.get_generation() == 3  # Two full batches and the remainder
+        assert baseline.get("f3.conf")["sha256"] == hashlib.sha256(b"content 3").hexdigest()
+    finally:
+        baseline.close()
+    assert monitored.backups().latest("f4.conf")["version"] == 1
+
+
+def test_identical_content_is_stored_once(store, tmp_path):
+    first, created, file_hash = store.ingest(write(tmp_path / "a.conf", b"same"), "a.conf")
+    again, created_again, _ = store.ingest(write(tmp_path / "a.conf", b"same"), "a.conf")
+    other, _, _ = store.ingest(write(tmp_path / "b.conf", b"same"), "b.conf")
+
+    assert created and not created_again and again == first
+    assert other["version"] == 1 and other["sha256"] == file_hash
+    assert store.stats()["full_objects"] == 1
+    assert store.stats()["logical_bytes"] == 8
+
+
+def test_backup_with_a_known_hash_skips_the_read(store, tmp_path, monkeypatch):
+    path = write(tmp_path / "a.conf", b"v1")
+    _, _, file_hash = store.ingest(path, "a.conf")
+    monkeypatch.setattr(store, "ingest", lambda *args: pytest.fail("file was read"))
+
+    assert store.backup(path, "a.conf", file_hash) == (store.latest("a.conf"), False)
+    record, created = store.backup(path, "copy.conf", file_hash)
+    assert created and record["sha256"] == file_hash
+
+
+def test_versions_and_restore(store, tmp_path):
+    path = write(tmp_path / "a.conf", b"v1")
+    store.ingest(path, "a.conf")
+    write(tmp_path / "a.conf", b"v2")
+    store.ingest(path, "a.conf")
+
+    assert [record["version"] for record in store.versions("a.conf")] == [1, 2]
+    restored = tmp_path / "out" / "a.conf"
+    assert store.restore("a.conf", str(restored), version=1)["version"] == 1
+    assert restored.read_bytes() == b"v1"
+    assert store.restore("a.conf", str(restored), version=9) is None
+    assert store.restore("unknown.conf", str(restored)) is None
+
+
+def config(entries, extra=b""):
+    lines = [b"<config>\n"] + [b"  <item id=\"%d\">value %d</item>\n  </item>\n" % (n, n) for n in range(entries)]
+    return b"".join(lines) + extra + b"</config>\n"
+
+
+@pytest.mark.parametrize("target", [
+    config(200),
+    config(200).replace(b"value 17<", b"changed 17<"),
+    config(200, extra=b"  <new/>\n"),
+    b"",
+    b"no newline at the end",
+    config(50)[::-1],
+])
+def test_delta_round_trips(target):
+    base = config(200)
+
+    assert backup_store.apply_delta(base, backup_store.make_delta(base, target)) == target
+
+
+def test_small_edit_is_stored_as_a_small_delta(store, tmp_path):
+    base = config(400)
+    path = write(tmp_path / "a.xml", base)
+    store.ingest(path, "a.xml")
+    edited = base.replace(b"value 123<", b"edited 123<")
+    write(tmp_path / "a.xml", edited)
+    _, _, file_hash = store.ingest(path, "a.xml")
+
+    stats = store.stats()
+    assert (stats["full_objects"], stats["delta_objects"]) == (1, 1)
+    assert os.path.getsize(store.object_path(file_hash)) < 200
+    assert store.read(file_hash) == edited
+
+
+def test_rebases_after_too_many_deltas(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_store, "REBASE_EVERY", 2)
+    path = str(tmp_path / "a.xml")
+    for n in range(4):
+        write(tmp_path / "a.xml", config(400).replace(b"value 7<", b"edit %d<" % n))
+        store.ingest(path, "a.xml")
+
+    stats = store.stats()
+    assert (stats["full_objects"], stats["delta_objects"]) == (2, 2)
+    assert store.read(store.latest("a.xml")["sha256"]) == config(400).replace(b"value 7<", b"edit 3<")
+
+
+def test_corrupt_delta_is_rejected():
+    with pytest.raises(ValueError):
+        backup_store.apply_delta(b"base", b"X")
+
+
+def test_reingest_of_an_unchanged_tree_reads_nothing(monitored, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_store, "_backup_stores", {})
+    for n in range(3):
+        write(tmp_path / "root" / f"f{n}.conf", b"content %d" % n)
+    write(tmp_path / "root" / "changed.xml", b"old")
+
+    first = fim_monitor.ingest_directory(monitored.path)
+    assert (first["read"], first["bytes_read"]) == (4, first["bytes"])
+
+    write(tmp_path / "root" / "changed.xml", b"new content")
+    reads_before = dict(fim_monitor.io_counters)
+    second = fim_monitor.ingest_directory(monitored.path)
+
+    assert (second["stat_skipped"], second["read"]) == (3, 1)
+    assert second["bytes_read"] == len(b"new content")
+    assert fim_monitor.io_counters["files_read"] - reads_before["files_read"] == 1
@@ -0,0 +1,149 @@
+import json
+import threading
+
+import pytest
+
+from website import baseline_store
+from website.baseline_store import JSONBaselineStore, SQLiteBaselineStore, open_baseline_store
+
+
+def entry(sha256, size=1):
+    return {"sha256": sha256, "size": size, "mtime_ns": 1, "inode": 2, "ctime_ns": 3}
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "json":
+        store = JSONBaselineStore(str(tmp_path / "baseline.json"))
+    else:
+        store = SQLiteBaselineStore(str(tmp_path / "baseline.db"))
+    yield store
+    store.close()
+
+
+def test_update_round_trip_and_generation(store):
+    assert not store.exists() and store.get_generation() == 0
+
+    store.update({"b.conf": entry("bb"), "a.conf": entry("aa")})
+    store.update({"a.conf": entry("a2")}, deletes=["b.conf"])
+
+    assert store.exists()
+    assert store.get_generation() == 2
+    assert store.get("a.conf") == entry("a2")
+    assert store.get("b.conf") is None
+    assert store.count() == 1
+
+
+def test_items_are_path_ordered_and_resumable(store):
+    store.update({path: entry(path) for path in ("c", "a", "b/x", "b")})
+
+    assert [path for path, _ in store.items()] == ["a", "b", "b/x", "c"]
+    assert [path for path, _ in store.items(after="b")] == ["b/x", "c"]
+    assert list(store.paths()) == ["a", "b", "b/x", "c"]
+
+
+def test_items_under_is_the_subtree_only(store):
+    store.update({path: entry(path) for path in ("dir", "dir/a", "dir/sub/b", "dir-x", "dira", "other")})
+
+    assert [path for path, _ in store.items_under("dir")] == ["dir", "dir/a", "dir/sub/b"]
+
+
+def test_rename_rekeys_a_subtree_and_replaces_the_destination(store):
+    store.update({"old/a": entry("1"), "old/b/c": entry("2"), "new/stale": entry("3"), "older": entry("4")})
+
+    assert store.rename("old", "new") == 2
+    assert {path: item["sha256"] for path, item in store.items()} == {"new/a": "1", "new/b/c": "2", "older": "4"}
+    assert store.rename("old", "new") == 0  # Already re-keyed: nothing changes
+    assert store.get("new/a") == entry("1")
+
+
+def test_json_store_reads_legacy_flat_files(tmp_path):
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps({"a.conf": "aa"}))
+    store = JSONBaselineStore(str(path))
+
+    assert store.get_generation() == 0
+    assert store.get("a.conf") == {"sha256": "aa", "size": None, "mtime_ns": None, "inode": None, "ctime_ns": None}
+    store.update({"b.conf": entry("bb")})
+    assert json.loads(path.read_text())["generation"] == 1
+
+
+def test_json_store_picks_up_another_writer(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    reader, writer = JSONBaselineStore(path), JSONBaselineStore(path)
+    writer.update({"a.conf": entry("aa")})
+    assert reader.get("a.conf")["sha256"] == "aa"
+
+    writer.update({"a.conf": entry("a2")})
+    assert reader.get("a.conf")["sha256"] == "a2"
+    assert reader.get_generation() == 2
+
+
+def test_sqlite_store_migrates_baseline_json_on_first_open(tmp_path, monkeypatch):
+    monkeypatch.setattr(baseline_store, "BASELINE_FILE", str(tmp_path / "baseline.json"))
+    monkeypatch.setattr(baseline_store, "BASELINE_DB", str(tmp_path / "baseline.db"))
+    (tmp_path / "baseline.json").write_text(json.dumps({"a.conf": "aa", "b.conf": "bb"}))
+
+    store = open_baseline_store("sqlite")
+    try:
+        assert store.count() == 2
+        assert store.get("b.conf")["sha256"] == "bb"
+    finally:
+        store.close()
+
+    store = open_baseline_store("sqlite")
+    try:
+        store.update(deletes=["a.conf", "b.conf"])  # Legitimately emptied
+    finally:
+        store.close()
+    store = open_baseline_store("sqlite")
+    try:
+        assert store.count() == 0  # Not refilled from the stale baseline.json
+    finally:
+        store.close()
+
+    partitioned = open_baseline_store("sqlite", partition="extra")
+    try:
+        assert partitioned.path.endswith("baseline-extra.db") and partitioned.count() == 0
+    finally:
+        partitioned.close()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        open_baseline_store("csv")
+
+
+def test_failed_json_write_leaves_the_previous_baseline(tmp_path, monkeypatch):
+    store = JSONBaselineStore(str(tmp_path / "baseline.json"))
+    store.update({"a.conf": entry("aa")})
+
+    def crash(data, f, **kwargs):
+        f.write('{"generation": 2, "entr')
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch, pytest.raises(OSError):
+        patch.setattr(baseline_store.json, "dump", crash)
+        store.update({"b.conf": entry("bb")})
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["baseline.json"]
+    reader = JSONBaselineStore(str(tmp_path / "baseline.json"))
+    assert reader.get_generation() == 1 and [path for path, _ in reader.items()] == ["a.conf"]
+
+
+def test_json_stores_on_one_file_do_not_lose_concurrent_updates(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    assert JSONBaselineStore(path).lock is JSONBaselineStore(path).lock
+
+    def writer(prefix):
+        for n in range(20):
+            JSONBaselineStore(path).update({f"{prefix}{n}": entry(prefix)})  # A new store per update, like open_baseline
+
+    threads = [threading.Thread(target=writer, args=(prefix,)) for prefix in "abc"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    store = JSONBaselineStore(path)
+    assert store.count() == 60 and store.get_generation() == 60
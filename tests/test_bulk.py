@@ -0,0 +1,56 @@
+from conftest import wait_for, write
+from website.handler import event_pipeline
+
+
+def run(client, *operations):
+    response = client.post("/api/bulk", json={"operations": list(operations)})
+    assert response.status_code == 202
+    return wait_for(response.json["job"]["id"])
+
+
+def test_bulk_items_run_in_order_with_one_event_and_alert(client, browse_root, recorded, tmp_path):
+    store, alerts = recorded
+    root = tmp_path / "root"
+    write(root / "old.conf")
+    write(root / "gone.txt")
+
+    job = run(
+        client,
+        {"op": "create-folder", "path": "", "name": "etc"},
+        {"op": "create-file", "path": "etc", "name": "app.conf"},
+        {"op": "rename", "path": "old.conf", "newName": "new.conf"},
+        {"op": "delete", "path": "gone.txt"},
+        {"op": "delete", "path": "missing.txt"},
+        {"op": "explode", "path": "x"},
+        {"op": "create-file", "path": "../..", "name": "escape.txt"},
+    )
+
+    assert job["status"] == "done"
+    result = job["result"]
+    assert (result["succeeded"], result["failed"]) == (4, 3)
+    assert [item.get("error") for item in result["results"][4:]] == ["File not found", "Unknown operation: explode", "Access Denied"]
+    assert (root / "etc" / "app.conf").exists() and (root / "new.conf").exists() and not (root / "gone.txt").exists()
+
+    events, _ = store.query()
+    assert [(event["event_type"], event["count"], event["unauthorized"]) for event in events] == [("bulk", 4, True)]
+    assert len(alerts) == 1
+    assert sorted(alerts[0]["added_files"]) == ["etc/app.conf", "new.conf"]
+    assert alerts[0]["deleted_files"] == ["old.conf"]
+    # The watcher's copies of these changes are dropped when they reach the pipeline
+    assert str(root / "new.conf") in event_pipeline.claims
+
+
+def test_existing_folder_is_neither_reported_nor_claimed(client, browse_root, recorded, tmp_path):
+    store, alerts = recorded
+    (tmp_path / "root" / "etc").mkdir()
+
+    job = run(client, {"op": "create-folder", "path": "", "name": "etc"})
+
+    assert job["result"]["succeeded"] == 1
+    assert store.query()[0] == [] and alerts == []
+    assert event_pipeline.claims == {}
+
+
+def test_bulk_request_is_validated(client, browse_root):
+    assert client.post("/api/bulk", json={"operations": []}).status_code == 400
+    assert client.post("/api/bulk", data="not json").status_code == 400
@@ -0,0 +1,62 @@
+import os
+
+from conftest import write
+from website.dir_cache import DirectoryCache
+
+
+def test_listing_sorts_folders_first(tmp_path):
+    write(tmp_path / "b.conf")
+    write(tmp_path / "a.txt")
+    (tmp_path / "z").mkdir()
+
+    items = DirectoryCache().listing(str(tmp_path))["items"]
+
+    assert [(item["name"], item["isFolder"], item["isCritical"]) for item in items] == [
+        ("z", True, False), ("a.txt", False, False), ("b.conf", False, True),
+    ]
+
+
+def test_unchanged_folder_is_served_from_cache(tmp_path, monkeypatch):
+    cache = DirectoryCache()
+    first = cache.listing(str(tmp_path))
+    monkeypatch.setattr(os, "scandir", None)  # Any rescan would fail
+
+    assert cache.listing(str(tmp_path)) is first
+
+
+def test_invalidate_drops_parent_and_subtree(tmp_path):
+    cache = DirectoryCache()
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    for directory in (tmp_path, tmp_path / "a", tmp_path / "a" / "b"):
+        cache.listing(str(directory))
+    etag = cache.listing(str(tmp_path))["etag"]
+
+    cache.invalidate(str(tmp_path / "a"), is_directory=True)
+
+    assert cache.entries == {}
+    assert cache.listing(str(tmp_path))["etag"] != etag
+
+
+def test_pages_follow_the_cursor(tmp_path):
+    for index in range(5):
+        write(tmp_path / f"{index}.txt")
+    (tmp_path / "dir").mkdir()
+    cache = DirectoryCache()
+
+    names, cursor = [], None
+    while True:
+        items, cursor, _ = cache.page(str(tmp_path), cursor, 2)
+        names += [item["name"] for item in items]
+        if cursor is None:
+            break
+
+    assert names == ["dir", "0.txt", "1.txt", "2.txt", "3.txt", "4.txt"]
+
+
+def test_has_subfolders(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    cache = DirectoryCache()
+
+    assert cache.has_subfolders(str(tmp_path / "a"))
+    assert not cache.has_subfolders(str(tmp_path / "a" / "b"))
+    assert not cache.has_subfolders(str(tmp_path / "missing"))
@@ -0,0 +1,66 @@
+import pytest
+
+from website import event_store
+from website.event_store import EventStore, make_event
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = EventStore(str(tmp_path / "events.db"))
+    monkeypatch.setattr(event_store, "_event_store", store)  # What get_event_store() returns
+    yield store
+    store.close()
+
+
+def test_query_filters_and_orders_newest_first(store):
+    store.append([
+        make_event("Tom", "employee", "modified", "etc/a.conf", critical=True, unauthorized=True, ts=1.0),
+        make_event("Ann", "admin", "created", "etc/sub/b.conf", critical=True, ts=2.0),
+        make_event("Tom", "employee", "deleted", "etc-old/c.txt", ts=3.0),
+        make_event(None, None, "moved", "var/d.xml", "etc/d.xml", ts=4.0, root="extra"),
+    ])
+
+    def paths(**filters):
+        return [event["path"] for event in store.query(**filters)[0]]
+
+    assert paths() == ["var/d.xml", "etc-old/c.txt", "etc/sub/b.conf", "etc/a.conf"]
+    assert paths(user="Tom") == ["etc-old/c.txt", "etc/a.conf"]
+    assert paths(path="etc") == ["etc/sub/b.conf", "etc/a.conf"]
+    assert paths(path="/etc/sub/") == ["etc/sub/b.conf"]
+    assert paths(unauthorized=True) == ["etc/a.conf"]
+    assert paths(critical=False, event_type="moved", root="extra") == ["var/d.xml"]
+    assert paths(since=2.0, until=4.0) == ["etc-old/c.txt", "etc/sub/b.conf"]
+
+    event = store.query(user="Tom", event_type="modified")[0][0]
+    assert event["critical"] is True and event["unauthorized"] is True and event["role"] == "employee"
+
+
+def test_cursor_pages_through_equal_timestamps(store):
+    store.append([make_event("Tom", "employee", "modified", f"f{n}.conf", ts=1.0) for n in range(5)])
+
+    seen, cursor = [], None
+    while True:
+        events, cursor = store.query(cursor=cursor, limit=2)
+        seen += [event["path"] for event in events]
+        if cursor is None:
+            break
+
+    assert seen == ["f4.conf", "f3.conf", "f2.conf", "f1.conf", "f0.conf"]
+    assert store.count() == 5
+    assert store.append([]) == 0
+
+
+def test_events_endpoint_limits_employees_to_their_own(store, app):
+    from conftest import login_client
+
+    store.append([
+        make_event("Employee", "employee", "modified", "a.conf", ts=1.0),
+        make_event("Other", "employee", "modified", "b.conf", ts=2.0),
+    ])
+
+    employee = login_client(app).get("/api/events?user=Other").get_json()
+    admin = login_client(app, "admin").get("/api/events?user=Other").get_json()
+
+    assert [event["path"] for event in employee["events"]] == ["a.conf"]
+    assert [event["path"] for event in admin["events"]] == ["b.conf"]
+    assert login_client(app, "admin").get("/api/events?cursor=bad").status_code == 400
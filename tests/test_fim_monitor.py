@@ -0,0 +1,134 @@
+import hashlib
+import os
+
+from conftest import write
+from website import fim_monitor
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_merge_join_pairs_sorted_streams():
+    live = [("a", "live-a"), ("c", "live-c")]
+    baseline = [("b", "base-b"), ("c", "base-c")]
+
+    joined = list(fim_monitor.merge_join(iter(live), iter(baseline)))
+
+    assert joined == [("a", ("a", "live-a"), None), ("b", None, "base-b"), ("c", ("c", "live-c"), "base-c")]
+
+
+def test_iter_sorted_files_matches_string_order(monitored, tmp_path):
+    for path in ("a.conf", "a/b.conf", "a-b.conf", "z.txt", "ab/c.json"):
+        write(tmp_path / "root" / path)
+
+    paths = [relative_path for relative_path, _, _ in fim_monitor.iter_sorted_files(monitored.path)]
+
+    assert paths == sorted(paths)
+    assert paths == ["a-b.conf", "a.conf", "a/b.conf", "ab/c.json"]
+
+
+def test_iter_diff_reports_added_deleted_modified(monitored, tmp_path):
+    root = tmp_path / "root"
+    write(root / "keep.conf", b"keep")
+    write(root / "change.conf", b"old")
+    write(root / "gone.conf", b"gone")
+    fim_monitor.create_baseline(monitored.path)
+    write(root / "change.conf", b"new content")
+    (root / "gone.conf").unlink()
+    write(root / "new.xml", b"new")
+
+    store = monitored.open_baseline()
+    try:
+        diff = sorted((kind, path) for kind, path, _, _ in fim_monitor.iter_diff(monitored.path, store))
+    finally:
+        store.close()
+
+    assert diff == [("added", "new.xml"), ("deleted", "gone.conf"), ("modified", "change.conf")]
+
+
+def diff_run(monitored, mode=None):
+    """One scan the way compare_with_baseline runs it: ([(kind, path)], scan report)."""
+    store = monitored.open_baseline()
+    try:
+        diff = [(kind, path) for kind, path, _, _ in fim_monitor.iter_diff(monitored.path, store, fim_monitor.resolve_scan_mode(mode))]
+    finally:
+        store.close()
+    return diff, dict(fim_monitor.last_scan_report)
+
+
+def test_same_stat_tuple_is_skipped_until_the_paranoid_run(monitored, tmp_path, monkeypatch):
+    monkeypatch.setattr(fim_monitor, "PARANOID_EVERY_N_RUNS", 3)
+    monkeypatch.setattr(fim_monitor, "scan_runs", 0)
+    path = write(tmp_path / "root" / "a.conf", b"original")
+    write(tmp_path / "root" / "b.conf", b"other")
+    fim_monitor.create_baseline(monitored.path, mode="full")  # Run 1
+
+    # Same size, mtime put back; the baseline is given the new ctime, as on a filesystem whose
+    # ctime did not tick, so the whole stat tuple matches while the content differs
+    before = os.stat(path)
+    write(tmp_path / "root" / "a.conf", b"tampered")
+    os.utime(path, ns=(before.st_atime_ns, before.st_mtime_ns))
+    store = monitored.open_baseline()
+    try:
+        store.update({"a.conf": dict(store.get("a.conf"), ctime_ns=os.stat(path).st_ctime_ns)})
+    finally:
+        store.close()
+
+    diff, report = diff_run(monitored)  # Run 2: incremental trusts the stat tuple
+    assert diff == []
+    assert (report["mode"], report["stat_skipped"], report["rehashed"]) == ("incremental", 2, 0)
+
+    diff, report = diff_run(monitored)  # Run 3 is paranoid
+    assert diff == [("modified", "a.conf")]
+    assert (report["mode"], report["rehashed"], report["stat_skipped"]) == ("full", 2, 0)
+
+
+def test_changed_mtime_is_rehashed(monitored, tmp_path):
+    path = write(tmp_path / "root" / "a.conf", b"same")
+    write(tmp_path / "root" / "b.conf", b"other")
+    fim_monitor.create_baseline(monitored.path)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+
+    diff, report = diff_run(monitored, "incremental")
+
+    assert diff == []  # Touched, not changed
+    assert (report["scanned"], report["stat_skipped"], report["rehashed"]) == (2, 1, 1)
+
+
+def test_refresh_baseline_paths_updates_only_given_paths(monitored, tmp_path):
+    root = tmp_path / "root"
+    write(root / "a.conf", b"a")
+    write(root / "dir" / "b.conf", b"b")
+    fim_monitor.create_baseline(monitored.path)
+    write(root / "a.conf", b"a2")
+    write(root / "dir" / "b.conf", b"b2")
+    write(root / "dir" / "c.conf", b"c")
+
+    result = fim_monitor.refresh_baseline_paths(monitored.path, ["dir"])
+
+    assert result["updated"] == 2
+    baseline = fim_monitor.load_baseline(monitored.path)
+    assert baseline["a.conf"]["sha256"] == sha256(b"a")  # Not touched
+    assert baseline["dir/b.conf"]["sha256"] == sha256(b"b2")
+    assert baseline["dir/c.conf"]["sha256"] == sha256(b"c")
+
+
+def test_refresh_baseline_paths_drops_vanished_files(monitored, tmp_path):
+    root = tmp_path / "root"
+    write(root / "dir" / "a.conf", b"a")
+    fim_monitor.create_baseline(monitored.path)
+    (root / "dir" / "a.conf").unlink()
+
+    assert fim_monitor.refresh_baseline_paths(monitored.path, ["dir/a.conf"])["removed"] == 1
+    assert fim_monitor.load_baseline(monitored.path) == {}
+
+
+def test_refresh_baseline_paths_accepts_dotted_names_but_not_parents(monitored, tmp_path):
+    write(tmp_path / "root" / "..foo.xml", b"dots")
+    write(tmp_path / "outside.conf", b"outside")
+
+    result = fim_monitor.refresh_baseline_paths(monitored.path, ["..foo.xml", "../outside.conf"])
+
+    assert result["updated"] == 1
+    assert list(fim_monitor.load_baseline(monitored.path)) == ["..foo.xml"]
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from conftest import write
+from website.fim_monitor import create_baseline
+from website.handler import CoalescedEvent, FIMHandler, event_pipeline
+
+
+@pytest.fixture(autouse=True)
+def fresh_recent():
+    event_pipeline.recent.clear()
+    yield
+    event_pipeline.recent.clear()
+
+
+def event(event_type, src_path, dest_path=None, is_directory=False):
+    return CoalescedEvent(event_type, src_path, dest_path, is_directory, 1)
+
+
+def test_folder_expansion_and_watcher_record_a_delete_once(monitored):
+    handler = FIMHandler("employee", "Emp", monitored)
+    path = os.path.join(monitored.path, "a.conf")
+
+    assert handler.first_record(event("deleted", path), expanded=False)
+    assert not handler.first_record(event("deleted", path), expanded=True)
+
+
+def test_recreated_file_is_recorded_when_deleted_again(monitored):
+    handler = FIMHandler("employee", "Emp", monitored)
+    path = os.path.join(monitored.path, "a.conf")
+
+    assert handler.first_record(event("deleted", path), expanded=False)
+    assert handler.first_record(event("created", path), expanded=False)
+    assert handler.first_record(event("deleted", path), expanded=True)
+
+
+def test_moved_back_file_is_recorded_when_moved_again(monitored):
+    handler = FIMHandler("employee", "Emp", monitored)
+    a, b = (os.path.join(monitored.path, name) for name in ("a.conf", "b.conf"))
+
+    assert handler.first_record(event("moved", a, b), expanded=True)
+    assert handler.first_record(event("moved", b, a), expanded=False)
+    assert handler.first_record(event("moved", a, b), expanded=False)
+
+
+def test_deleted_folder_expands_into_its_baselined_files(monitored, tmp_path):
+    for name in ("cfg/a.conf", "cfg/sub/b.xml", "cfg/readme.md", "cfgx.conf"):
+        write(tmp_path / "root" / name)
+    create_baseline(monitored.path)
+    handler = FIMHandler("employee", "Emp", monitored)
+    folder = os.path.join(monitored.path, "cfg")
+
+    baseline = monitored.open_baseline()
+    try:
+        children = list(handler.expand_event(event("moved", folder, folder + "2", True), baseline))
+    finally:
+        baseline.close()
+
+    assert [(child.src_path, child.dest_path) for child in children] == [
+        (os.path.join(folder, "a.conf"), os.path.join(folder + "2", "a.conf")),
+        (os.path.join(folder, "sub", "b.xml"), os.path.join(folder + "2", "sub", "b.xml")),
+    ]
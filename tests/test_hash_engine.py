@@ -0,0 +1,64 @@
+import hashlib
+import os
+
+import pytest
+
+from conftest import write
+from website import hash_engine
+
+SIZES = (0, 1, hash_engine.ONE_SHOT_LIMIT, hash_engine.ONE_SHOT_LIMIT + 1, 3 * 1024 * 1024 + 7)
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("strategy", ("auto", "oneshot", "readinto", "mmap"))
+def test_every_strategy_matches_hashlib(tmp_path, size, strategy):
+    data = os.urandom(size)
+    path = write(tmp_path / "blob.dll", data)
+
+    digest, nbytes = hash_engine._read_and_hash(path, 64 * 1024, strategy)
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert nbytes == size
+
+
+def test_mmap_is_opt_in():
+    assert hash_engine.choose_strategy(1024 ** 3) == "readinto"
+
+
+def test_auto_keeps_the_first_read_when_the_file_shrinks(tmp_path, monkeypatch):
+    data = os.urandom(hash_engine.ONE_SHOT_LIMIT + 4096)
+    path = write(tmp_path / "blob.dll", data)
+    # As if the file had been truncated to a small size between the first read() and fstat()
+    monkeypatch.setattr(hash_engine, "choose_strategy", lambda size: "oneshot")
+
+    digest, nbytes = hash_engine._read_and_hash(path, 64 * 1024)
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert nbytes == len(data)
+
+
+def test_unreadable_file_hashes_to_none(tmp_path):
+    assert hash_engine.hash_file(str(tmp_path / "missing.conf")) is None
+
+
+def test_hash_files_returns_sorted_pairs(tmp_path):
+    paths = [write(tmp_path / f"{name}.conf", name.encode()) for name in ("b", "a", "c")]
+
+    results = hash_engine.hash_files(paths, workers=2, mode="thread")
+
+    assert results == [(path, hashlib.sha256(os.path.basename(path)[0].encode()).hexdigest()) for path in sorted(paths)]
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_pools_are_started_once_and_reused(tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(hash_engine, "_pools", {})
+    paths = [write(tmp_path / f"{n}.conf", b"%d" % n) for n in range(3)]
+
+    first = hash_engine.hash_files(paths, workers=2, mode=mode)
+    pool = hash_engine._pools[(mode, 2)]
+    second = hash_engine.hash_files(paths, workers=2, mode=mode)
+
+    assert first == second and first[1][1] == hashlib.sha256(b"1").hexdigest()
+    assert hash_engine._pools == {(mode, 2): pool}
+    hash_engine.shutdown_pools()
+    assert hash_engine._pools == {}
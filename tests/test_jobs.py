@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from conftest import wait_for, write
+from website.handler import FIMHandler
+from website.jobs import JobTracker, job_tracker
+
+
+@pytest.fixture
+def tracker():
+    tracker = JobTracker(workers=1, max_jobs=2)
+    yield tracker
+    if tracker.executor is not None:
+        tracker.executor.shutdown(wait=True)
+
+
+def test_jobs_report_results_and_failures(tracker):
+    done = tracker.submit("delete", "Tom", "a", ["/r/a"], lambda x: x * 2, 21)
+    failed = tracker.submit("rename", "Tom", "b", ["/r/b"], lambda: 1 / 0)
+
+    assert "paths" not in done
+    assert wait_for(done["id"], tracker)["result"] == 42
+    job = wait_for(failed["id"], tracker)
+    assert job["status"] == "failed" and "division" in job["error"]
+    assert tracker.stats() == {"done": 1, "failed": 1, "pending": 0, "tracked": 2}
+
+
+def test_busy_covers_paths_inside_and_above_a_pending_job(tracker):
+    release = threading.Event()
+    job = tracker.submit("delete", "Tom", "a", ["/r/a"], release.wait)
+    try:
+        assert tracker.busy("/r/a/b.conf")["id"] == job["id"]
+        assert tracker.busy("/r")["id"] == job["id"]
+        assert tracker.busy("/r/ab") is None
+    finally:
+        release.set()
+    wait_for(job["id"], tracker)
+    assert tracker.busy("/r/a") is None
+
+
+def test_oldest_finished_jobs_are_pruned(tracker):
+    jobs = [tracker.submit("delete", owner, owner, [f"/r/{owner}"], lambda: None) for owner in ("a", "b")]
+    for job in jobs:
+        wait_for(job["id"], tracker)
+    tracker.submit("delete", "c", "c", ["/r/c"], lambda: None)
+
+    assert tracker.get(jobs[0]["id"]) is None
+    assert [job["owner"] for job in tracker.list()][-1] == "b"
+    assert [job["owner"] for job in tracker.list("b")] == ["b"]
+
+
+def test_folder_delete_runs_as_a_job_and_locks_its_path(client, browse_root, tmp_path, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(FIMHandler, "on_any_event", lambda self, event: release.wait(5))
+    write(tmp_path / "root" / "folder" / "a.conf")
+
+    response = client.delete("/api/delete-item", json={"path": "folder"})
+    assert response.status_code == 202
+    job = response.json["job"]
+    try:
+        busy = client.post("/api/create-file", json={"path": "folder", "name": "b.conf"})
+        assert busy.status_code == 409 and busy.json["job"]["id"] == job["id"]
+    finally:
+        release.set()
+
+    assert client.get(f"/api/jobs/{job['id']}").json["status"] in ("running", "done")
+    assert wait_for(job["id"])["status"] == "done"
+    assert not (tmp_path / "root" / "folder").exists()
+    assert any(item["id"] == job["id"] for item in client.get("/api/jobs").json["jobs"])
+
+
+def test_other_users_jobs_are_hidden(client, app):
+    from conftest import login_client
+
+    job = job_tracker.submit("delete", "Someone", "x", ["/nowhere/x"], lambda: None)
+    wait_for(job["id"])
+
+    assert client.get(f"/api/jobs/{job['id']}").status_code == 404
+    assert login_client(app, "admin").get(f"/api/jobs/{job['id']}").json["owner"] == "Someone"
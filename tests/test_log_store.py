@@ -0,0 +1,185 @@
+import logging
+import queue
+
+import pytest
+
+from website import log_store
+from website.log_store import (
+    ArchivingFileHandler, BoundedQueueHandler, list_segments, make_filter, read_after, read_tail,
+)
+
+
+def line(n, level="INFO", message=None):
+    return f"2025-01-01 00:00:{n:02d},000 | {level} | {message or f'line {n}'}"
+
+
+def write_lines(handler, *lines):
+    for text in lines:
+        handler.stream.write(text + "\n")
+    handler.stream.flush()
+
+
+def test_rotation_numbers_and_compresses_segments(tmp_path):
+    handler = ArchivingFileHandler(str(tmp_path / "fim.log"))
+    write_lines(handler, line(1))
+    handler.doRollover()
+    write_lines(handler, line(2))
+    handler.doRollover()
+    write_lines(handler, line(3))
+
+    segments = list_segments(str(tmp_path / "fim.log"))
+    assert [(number, compressed) for number, _, compressed in segments] == [(1, True), (2, True), (3, False)]
+    handler.close()
+
+
+def test_backup_count_zero_keeps_no_archives(tmp_path):
+    handler = ArchivingFileHandler(str(tmp_path / "fim.log"), backup_count=0)
+    write_lines(handler, line(1))
+    handler.doRollover()
+
+    assert handler.backupCount == 0
+    assert [path for _, path, _ in list_segments(str(tmp_path / "fim.log"))] == [str(tmp_path / "fim.log")]
+    handler.close()
+
+
+def test_read_after_crosses_segments_and_leaves_partial_lines(tmp_path):
+    log_file = str(tmp_path / "fim.log")
+    handler = ArchivingFileHandler(log_file)
+    write_lines(handler, line(1), line(2))
+    handler.doRollover()
+    write_lines(handler, line(3))
+    handler.stream.write("2025-01-01 00:00:04,000 | INFO | half")
+    handler.stream.flush()
+
+    lines, cursor = read_after("1:0", log_file)
+    assert lines == [line(1), line(2), line(3)]
+    assert cursor == f"2:{len(line(3)) + 1}"
+
+    lines, cursor = read_after("1:0", log_file, limit=1)
+    assert (lines, cursor) == ([line(1)], f"1:{len(line(1)) + 1}")
+    assert read_after(cursor, log_file)[0] == [line(2), line(3)]
+    handler.close()
+
+
+def test_read_after_labels_a_live_file_rotated_mid_read(tmp_path, monkeypatch):
+    log_file = str(tmp_path / "fim.log")
+    handler = ArchivingFileHandler(log_file)
+    write_lines(handler, line(1))
+    open_segment = log_store._open_segment
+
+    def rotate_first(path, compressed):
+        # The writer rotates between the reader's listing and its open of the live file
+        monkeypatch.setattr(log_store, "_open_segment", open_segment)
+        handler.doRollover()
+        write_lines(handler, line(2))
+        return open_segment(path, compressed)
+
+    monkeypatch.setattr(log_store, "_open_segment", rotate_first)
+    lines, cursor = read_after("1:0", log_file)
+
+    assert lines == [line(1), line(2)]
+    assert cursor == f"2:{len(line(2)) + 1}"
+    assert read_after(cursor, log_file) == ([], cursor)
+    handler.close()
+
+
+def test_read_after_restarts_at_oldest_archive_after_pruning(tmp_path):
+    log_file = str(tmp_path / "fim.log")
+    handler = ArchivingFileHandler(log_file, backup_count=1)
+    for n in range(1, 4):
+        write_lines(handler, line(n))
+        handler.doRollover()
+
+    assert read_after("1:5", log_file)[0] == [line(3)]
+    handler.close()
+
+
+def test_read_tail_returns_last_lines_across_segments(tmp_path):
+    log_file = str(tmp_path / "fim.log")
+    handler = ArchivingFileHandler(log_file)
+    write_lines(handler, line(1), line(2))
+    handler.doRollover()
+    write_lines(handler, line(3))
+
+    lines, cursor = read_tail(2, log_file)
+    assert lines == [line(2), line(3)]
+    assert read_after(cursor, log_file) == ([], cursor)
+    handler.close()
+
+
+def test_filter_matches_level_and_whole_user_name():
+    by_tom = make_filter(user="Tom")
+    assert by_tom(line(1, message="Tom (employee) triggered created on a.txt"))
+    assert by_tom(line(2, "WARNING", "Unauthorized critical file moved by Tom: a.conf"))
+    assert not by_tom(line(3, message="Tommy (employee) triggered created on a.txt"))
+    assert not by_tom(line(4, message="Atom (admin) triggered created on a.txt"))
+    assert not by_tom("continuation line without fields")
+
+    warnings = make_filter(level="warning")
+    assert warnings(line(5, "ERROR"))
+    assert not warnings(line(6, "INFO"))
+    assert make_filter() is None
+
+
+def test_queue_handler_drops_when_full():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1), policy="drop")
+    record = logging.LogRecord("FIMLogger", logging.INFO, __file__, 1, "x", None, None)
+    before = log_store.log_stats()["dropped"]
+
+    handler.enqueue(record)
+    handler.enqueue(record)
+
+    assert handler.queue.qsize() == 1
+    assert log_store.log_stats()["dropped"] == before + 1
+
+
+def test_sample_policy_thins_info_but_keeps_warnings(monkeypatch):
+    monkeypatch.setattr(log_store, "LOG_SAMPLE_RATE", 2)
+    handler = BoundedQueueHandler(queue.Queue(maxsize=10), policy="sample")
+    for _ in range(8):
+        handler.queue.put_nowait(None)  # Fill past the sampling threshold
+
+    def record(level):
+        return logging.LogRecord("FIMLogger", level, __file__, 1, "x", None, None)
+
+    for _ in range(4):
+        handler.enqueue(record(logging.INFO))
+    handler.enqueue(record(logging.WARNING))
+
+    assert handler.queue.qsize() == 8 + 2  # Every second INFO record, and the queue is then full
+    assert BoundedQueueHandler(queue.Queue(), policy="block").policy == "block"
+    with pytest.raises(ValueError):
+        BoundedQueueHandler(queue.Queue(), policy="spill")
+
+
+def test_writer_drains_the_queue_in_batches(tmp_path):
+    handler = ArchivingFileHandler(str(tmp_path / "fim.log"))
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    writer = log_store.BatchingLogWriter(handler, batch_size=3)
+    for n in range(7):
+        writer.queue.put(logging.LogRecord("FIMLogger", logging.INFO, __file__, 1, f"record {n}", None, None))
+    writer.stop()
+
+    assert not writer.thread.is_alive()
+    assert (tmp_path / "fim.log").read_text().splitlines() == [f"record {n}" for n in range(7)]
+    handler.close()
+
+
+def test_fim_logger_does_not_reach_root_handlers():
+    from website.fim_utils import fim_logger
+
+    received = []
+
+    class Recorder(logging.Handler):
+        def emit(self, record):
+            received.append(record)
+
+    recorder = Recorder()
+    logging.getLogger().addHandler(recorder)
+    try:
+        fim_logger.warning("WARNING | test record")
+    finally:
+        logging.getLogger().removeHandler(recorder)
+
+    assert received == []
+    assert any(isinstance(handler, BoundedQueueHandler) for handler in fim_logger.handlers)
@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from conftest import login_client
+from website.metrics import Registry
+
+
+def test_counter_and_histogram_render_in_prometheus_format():
+    registry = Registry()
+    counter = registry.counter("fim_things_total", "Things by kind", "kind")
+    histogram = registry.histogram("fim_wait_seconds", "Waits", (0.1, 1))
+    counter.inc("a")
+    counter.inc("a", 2)
+    counter.inc("b")
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert registry.render().splitlines() == [
+        "# HELP fim_things_total Things by kind",
+        "# TYPE fim_things_total counter",
+        'fim_things_total{kind="a"} 3',
+        'fim_things_total{kind="b"} 1',
+        "# HELP fim_wait_seconds Waits",
+        "# TYPE fim_wait_seconds histogram",
+        'fim_wait_seconds_bucket{le="0.1"} 1',
+        'fim_wait_seconds_bucket{le="1"} 2',
+        'fim_wait_seconds_bucket{le="+Inf"} 3',
+        "fim_wait_seconds_sum 5.55",
+        "fim_wait_seconds_count 3",
+    ]
+
+
+def test_sampled_values_are_read_at_scrape_time():
+    registry = Registry()
+    state = {"depth": 1}
+    registry.sampled("fim_depth", "Depth", lambda: state["depth"])
+    registry.sampled("fim_by_root", "By root", lambda: {"b": 2, "a": None}, "root", kind="counter")
+    state["depth"] = 7
+
+    lines = registry.render().splitlines()
+
+    assert "fim_depth 7" in lines
+    assert 'fim_by_root{root="b"} 2' in lines
+    assert not any(line.startswith('fim_by_root{root="a"}') for line in lines)  # None is skipped
+
+
+def test_counts_from_finished_threads_are_kept():
+    registry = Registry()
+    counter = registry.counter("fim_hits_total", "Hits")
+    threads = [threading.Thread(target=lambda: [counter.inc() for _ in range(1000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc()
+
+    assert "fim_hits_total 4001" in registry.render().splitlines()
+    assert "fim_hits_total 4001" in registry.render().splitlines()  # Retired shards are not counted twice
+
+
+def test_broken_collector_does_not_fail_the_scrape():
+    registry = Registry()
+    registry.sampled("fim_broken", "Broken", lambda: 1 / 0)
+    registry.sampled("fim_fine", "Fine", lambda: 1)
+
+    assert registry.render().splitlines() == ["# HELP fim_fine Fine", "# TYPE fim_fine gauge", "fim_fine 1"]
+
+
+def test_names_are_unique():
+    registry = Registry()
+    registry.counter("fim_x_total", "X")
+    with pytest.raises(ValueError):
+        registry.counter("fim_x_total", "X again")
+
+
+def test_metrics_endpoint_is_for_admins_and_scrapers(app, monkeypatch):
+    from website import views
+
+    assert login_client(app).get("/metrics").status_code == 403
+    response = login_client(app, "admin").get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert "# TYPE fim_events_received_total counter" in response.get_data(as_text=True)
+
+    monkeypatch.setattr(views, "METRICS_TOKEN", "s3cret")
+    assert app.test_client().get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+    assert app.test_client().get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 403
+
+
+def test_baseline_size_is_counted_at_most_every_few_minutes(monitored, monkeypatch):
+    from website import roots
+
+    opened = []
+    open_baseline = monitored.open_baseline
+    monkeypatch.setattr(monitored, "open_baseline", lambda: opened.append(True) or open_baseline())
+
+    assert monitored.baseline_count() == 0
+    assert monitored.baseline_count() == 0
+    assert len(opened) == 1
+    monkeypatch.setattr(roots, "BASELINE_COUNT_SECONDS", 0)
+    monitored.baseline_count()
+    assert len(opened) == 2
@@ -0,0 +1,73 @@
+import threading
+
+from website.monitor_service import MonitorService
+
+
+class Handler:
+    def __init__(self):
+        self.events = []
+
+    def on_any_event(self, event):
+        self.events.append(event)
+
+
+def test_references_are_counted_per_user(tmp_path):
+    service = MonitorService()
+    try:
+        assert service.acquire(str(tmp_path), "a", Handler) == 1
+        assert service.acquire(str(tmp_path), "a", Handler) == 2
+        assert service.acquire(str(tmp_path), "b", Handler) == 1
+        assert len(service.watches) == 1
+
+        assert service.release("a") == 1
+        assert service.release("a") == 0
+        assert service.release("a") is None
+        assert service.release("b") == 0
+        assert service.watches == {} and service.observer is None
+    finally:
+        for username in list(service.refcounts):
+            service.release(username, force=True)
+
+
+def test_concurrent_logins_take_one_reference(tmp_path):
+    service = MonitorService()
+    created = []
+
+    def factory():
+        created.append(True)
+        return Handler()
+
+    barrier = threading.Barrier(8)
+
+    def login():
+        barrier.wait()
+        service.acquire(str(tmp_path), "a", factory, reuse=True)
+
+    threads = [threading.Thread(target=login) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert service.refcounts == {"a": 1}
+        assert len(created) == 1
+    finally:
+        assert service.release("a") == 0
+    assert service.observer is None
+
+
+def test_events_go_once_to_the_recorder(tmp_path):
+    service = MonitorService()
+    recorder = Handler()
+    try:
+        service.acquire(str(tmp_path), "a", Handler, lambda: recorder)
+        service.acquire(str(tmp_path), "b", Handler)
+        fan_out = service.watches[str(tmp_path)][1]
+
+        fan_out.on_any_event("event")
+
+        assert recorder.events == ["event"]
+        assert all(handler.events == [] for handler in service.handlers.values())
+    finally:
+        service.release("a", force=True)
+        service.release("b", force=True)
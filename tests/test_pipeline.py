@@ -0,0 +1,279 @@
+import os
+import shutil
+
+import pytest
+from watchdog.events import (
+    DirDeletedEvent, DirMovedEvent, FileCreatedEvent, FileDeletedEvent, FileModifiedEvent, FileMovedEvent,
+)
+
+from conftest import write
+from website.fim_monitor import create_baseline
+from website.handler import EventPipeline, FIMHandler, acting_consumer
+
+
+class Consumer:
+    """Stands in for a FIMHandler: records the batches it is handed."""
+
+    def __init__(self, username=None, user_role=None):
+        self.username, self.user_role = username, user_role
+        self.actor = username or "unknown"
+        self.batches = []
+
+    def handle_batch(self, events):
+        self.batches.append(events)
+
+    @property
+    def events(self):
+        return [(event.event_type, event.src_path, event.dest_path) for batch in self.batches for event in batch]
+
+
+def run(pipeline, *submissions, at=0.0):
+    """Coalesce (consumer, event) pairs seen at `at`, then flush once the window has passed."""
+    for consumer, event in submissions:
+        pipeline._coalesce(at, consumer, event)
+    pipeline._flush(at + pipeline.debounce + 1)
+
+
+def test_created_then_modified_is_one_created():
+    pipeline, watcher = EventPipeline(), Consumer()
+    run(pipeline, (watcher, FileCreatedEvent("/r/a.conf")), (watcher, FileModifiedEvent("/r/a.conf")))
+
+    assert watcher.events == [("created", "/r/a.conf", None)]
+    assert watcher.batches[0][0].count == 2
+
+
+def test_created_then_deleted_nets_out():
+    pipeline, watcher = EventPipeline(), Consumer()
+    run(pipeline, (watcher, FileCreatedEvent("/r/a.conf")), (watcher, FileDeletedEvent("/r/a.conf")))
+
+    assert watcher.events == []
+
+
+def test_atomic_save_is_a_modification_of_the_real_file():
+    pipeline, watcher = EventPipeline(), Consumer()
+    run(
+        pipeline,
+        (watcher, FileCreatedEvent("/r/.a.conf.swp")),
+        (watcher, FileModifiedEvent("/r/.a.conf.swp")),
+        (watcher, FileMovedEvent("/r/.a.conf.swp", "/r/a.conf")),
+    )
+
+    assert watcher.events == [("modified", "/r/a.conf", None)]
+
+
+def test_critical_files_with_temp_names_are_recorded():
+    pipeline, watcher = EventPipeline(), Consumer()
+    run(
+        pipeline,
+        (watcher, FileCreatedEvent("/r/~$evil.dll")),
+        (watcher, FileModifiedEvent("/r/.#x.conf")),
+        (watcher, FileCreatedEvent("/r/notes.txt.swp")),
+        (watcher, FileMovedEvent("/r/.#y.json", "/r/y.json")),
+    )
+
+    assert sorted(watcher.events) == [
+        ("created", "/r/~$evil.dll", None), ("modified", "/r/.#x.conf", None), ("moved", "/r/.#y.json", "/r/y.json"),
+    ]
+
+
+def test_move_carries_the_pending_change_of_its_source():
+    pipeline, watcher, employee = EventPipeline(), Consumer(), Consumer("Tom", "employee")
+    run(
+        pipeline,
+        (employee, FileModifiedEvent("/r/a.conf")),
+        (watcher, FileMovedEvent("/r/a.conf", "/r/b.conf")),
+    )
+
+    assert employee.events == [("moved", "/r/a.conf", "/r/b.conf")]
+    assert employee.batches[0][0].count == 2
+    assert watcher.events == []
+
+
+def test_created_then_moved_is_created_at_the_destination():
+    pipeline, watcher = EventPipeline(), Consumer()
+    run(pipeline, (watcher, FileCreatedEvent("/r/a.conf")), (watcher, FileMovedEvent("/r/a.conf", "/r/b.conf")))
+
+    assert watcher.events == [("created", "/r/b.conf", None)]
+
+
+def test_created_then_moved_over_a_deleted_file_is_a_modification():
+    pipeline, watcher = EventPipeline(), Consumer()
+    run(
+        pipeline,
+        (watcher, FileDeletedEvent("/r/b.conf")),
+        (watcher, FileCreatedEvent("/r/a.conf")),
+        (watcher, FileMovedEvent("/r/a.conf", "/r/b.conf")),
+    )
+
+    assert watcher.events == [("modified", "/r/b.conf", None)]
+
+
+def test_renamed_twice_is_one_move_from_the_original_path():
+    pipeline, watcher = EventPipeline(), Consumer()
+    run(pipeline, (watcher, FileMovedEvent("/r/a.conf", "/r/b.conf")), (watcher, FileMovedEvent("/r/b.conf", "/r/c.conf")))
+
+    assert watcher.events == [("moved", "/r/a.conf", "/r/c.conf")]
+
+
+def test_renamed_back_is_a_modification():
+    pipeline, watcher = EventPipeline(), Consumer()
+    run(pipeline, (watcher, FileMovedEvent("/r/a.conf", "/r/b.conf")), (watcher, FileMovedEvent("/r/b.conf", "/r/a.conf")))
+
+    assert watcher.events == [("modified", "/r/a.conf", None)]
+
+
+def test_move_over_a_pending_move_keeps_the_first_source_deleted():
+    pipeline, watcher = EventPipeline(), Consumer()
+    run(pipeline, (watcher, FileMovedEvent("/r/x.conf", "/r/b.conf")), (watcher, FileMovedEvent("/r/a.conf", "/r/b.conf")))
+
+    assert sorted(watcher.events) == [("deleted", "/r/x.conf", None), ("moved", "/r/a.conf", "/r/b.conf")]
+
+
+@pytest.mark.parametrize("user_first", [False, True])
+@pytest.mark.parametrize("is_directory", [False, True])
+def test_rename_seen_by_watcher_and_user_is_one_move(monitored, tmp_path, recorded, is_directory, user_first):
+    store, alerts = recorded
+    root = tmp_path / "root"
+    if is_directory:
+        write(root / "cfg" / "a.conf")
+        write(root / "cfg" / "sub" / "b.xml")
+        src, dest, moved_event = str(root / "cfg"), str(root / "cfg2"), DirMovedEvent
+    else:
+        write(root / "a.conf")
+        src, dest, moved_event = str(root / "a.conf"), str(root / "b.conf"), FileMovedEvent
+    create_baseline(monitored.path)
+    os.rename(src, dest)
+
+    # The observer and the view each submit their own event object for the one rename
+    copies = [(FIMHandler.watcher(monitored), moved_event(src, dest)), (FIMHandler("employee", "Emp", monitored), moved_event(src, dest))]
+    if user_first:
+        copies.reverse()
+    pipeline = EventPipeline()
+    for at, (consumer, event) in enumerate(copies):
+        pipeline._coalesce(at * 0.1, consumer, event)
+    pipeline._flush(10.0)
+
+    records = store.query()[0]
+    assert {(record["username"], record["event_type"]) for record in records} == {("Emp", "moved")}
+    assert len(records) == (3 if is_directory else 1)  # The folder and each baselined file under it
+    assert len(alerts) == 1
+
+
+@pytest.mark.parametrize("role", ["admin", "employee"])
+def test_folder_delete_is_the_users_even_if_the_watcher_flushes_first(monitored, tmp_path, recorded, monkeypatch, role):
+    from website import handler, views
+
+    store, alerts = recorded
+    folder = tmp_path / "root" / "cfg"
+    files = [write(folder / f"{n}.conf") for n in range(3)] + [write(folder / "sub" / "x.xml")]
+    create_baseline(monitored.path)
+    pipeline, submitted = EventPipeline(), []
+    monkeypatch.setattr(handler, "event_pipeline", pipeline)
+    monkeypatch.setattr(pipeline, "submit", lambda consumer, event: submitted.append((consumer, event)))
+    watcher, user = FIMHandler.watcher(monitored), FIMHandler(role, "Boss", monitored)
+
+    real_rmtree = shutil.rmtree
+
+    def rmtree(path):
+        os.remove(files[0])
+        # The observer reports each file as it goes, and those pass the debounce before rmtree returns
+        pipeline._coalesce(0.0, watcher, FileDeletedEvent(files[0]))
+        pipeline._flush(1.0)
+        real_rmtree(path)
+        for at, path in enumerate(files[1:]):
+            pipeline._coalesce(1.0 + at / 100, watcher, FileDeletedEvent(path))
+        pipeline._coalesce(1.1, watcher, DirDeletedEvent(str(folder / "sub")))
+        pipeline._flush(2.0)
+
+    monkeypatch.setattr(views.shutil, "rmtree", rmtree)
+    views.delete_tree(str(folder), user)
+    for consumer, event in submitted:
+        pipeline._coalesce(3.0, consumer, event)
+    pipeline._flush(4.0)
+
+    records = store.query()[0]
+    assert {record["username"] for record in records} == {"Boss"}
+    assert sorted((record["event_type"], record["path"]) for record in records) == [
+        ("deleted", path) for path in ("cfg", "cfg/0.conf", "cfg/1.conf", "cfg/2.conf", "cfg/sub", "cfg/sub/x.xml")
+    ]
+    assert bool(alerts) == (role == "employee")
+
+
+def test_debounce_holds_events_back():
+    pipeline, watcher = EventPipeline(), Consumer()
+    pipeline._coalesce(0.0, watcher, FileModifiedEvent("/r/a.conf"))
+    pipeline._flush(pipeline.debounce / 2)
+    assert watcher.batches == []
+    pipeline._flush(pipeline.debounce * 2)
+    assert watcher.events == [("modified", "/r/a.conf", None)]
+
+
+def test_each_change_is_recorded_once_by_the_acting_user():
+    pipeline, watcher, user = EventPipeline(), Consumer(), Consumer("Emp", "employee")
+    created = FileCreatedEvent("/r/a.conf")
+    run(pipeline, (user, created), (watcher, FileCreatedEvent("/r/a.conf")), (watcher, FileCreatedEvent("/r/b.conf")))
+
+    assert user.events == [("created", "/r/a.conf", None)]
+    assert watcher.events == [("created", "/r/b.conf", None)]
+
+
+def test_admin_edit_does_not_cover_an_employee_change():
+    watcher, employee, admin = Consumer(), Consumer("Emp", "employee"), Consumer("Adm", "admin")
+
+    assert acting_consumer(watcher, admin) is admin
+    assert acting_consumer(admin, employee) is employee
+    assert acting_consumer(employee, admin) is employee
+    assert acting_consumer(employee, watcher) is employee
+
+
+def test_claim_drops_only_the_watcher_copy_of_that_change():
+    pipeline, watcher, bulk_user, other = EventPipeline(), Consumer(), Consumer("Bulk", "employee"), Consumer("Other", "employee")
+    pipeline.claim(bulk_user, [("created", "/r/a.conf"), ("deleted", "/r/b.conf"), ("created", "/r/c.conf")], since=0.0)
+
+    run(
+        pipeline,
+        (watcher, FileCreatedEvent("/r/a.conf")),  # The bulk job's own change: dropped
+        (watcher, FileModifiedEvent("/r/b.conf")),  # Different change than claimed: kept
+        (other, FileCreatedEvent("/r/c.conf")),  # Someone else's operation: kept
+        at=1.0,
+    )
+
+    assert watcher.events == [("modified", "/r/b.conf", None)]
+    assert other.events == [("created", "/r/c.conf", None)]
+    assert sorted(pipeline.claims) == ["/r/b.conf", "/r/c.conf"]  # Unused claims just expire
+
+
+def test_claim_is_used_once_and_ignores_earlier_events():
+    pipeline, watcher, bulk_user = EventPipeline(), Consumer(), Consumer("Bulk", "employee")
+    pipeline.claim(bulk_user, [("deleted", "/r/a.conf")], since=5.0)
+
+    run(pipeline, (watcher, FileDeletedEvent("/r/a.conf")), at=1.0)  # Before the operation started
+    assert watcher.events == [("deleted", "/r/a.conf", None)]
+
+    run(pipeline, (watcher, FileDeletedEvent("/r/a.conf")), at=6.0)
+    run(pipeline, (watcher, FileDeletedEvent("/r/a.conf")), at=7.0)
+    assert len(watcher.events) == 2
+
+
+def test_side_effects_run_once_per_event(monkeypatch):
+    from website import handler
+
+    invalidated = []
+    monkeypatch.setattr(handler.directory_cache, "invalidate", lambda path, is_directory=False: invalidated.append(path))
+    pipeline, first, second = EventPipeline(), Consumer("A", "employee"), Consumer("B", "employee")
+    event = DirDeletedEvent("/r/dir")
+    run(pipeline, (first, event), (second, event))
+
+    assert invalidated == ["/r/dir"]
+
+
+def test_raw_events_are_counted_once(monkeypatch):
+    from website import handler
+
+    counted = []
+    monkeypatch.setattr(handler.events_received, "inc", lambda value="", amount=1: counted.append(value))
+    pipeline, first, second = EventPipeline(), Consumer("A", "employee"), Consumer("B", "employee")
+    event = FileModifiedEvent("/r/a.conf")
+    run(pipeline, (first, event), (second, event), (first, FileModifiedEvent("/r/a.conf")))
+
+    assert counted == ["modified", "modified"]
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from website.policy import CriticalPolicy
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "root")
+
+
+def test_default_rules_match_critical_extensions(root):
+    policy = CriticalPolicy(root=root)
+
+    assert policy.is_critical(os.path.join(root, "app", "settings.conf"))
+    assert policy.is_critical(os.path.join(root, "lib.dll"))
+    assert not policy.is_critical(os.path.join(root, "notes.txt"))
+    assert not policy.is_critical(os.path.join(root, ".conf"))  # A dot file has no suffix
+    assert not policy.is_critical(os.path.join(root, "a.conf.bak"))
+
+
+def test_glob_regex_and_prefix_rules(root):
+    policy = CriticalPolicy([
+        ("glob", "*.ini"),
+        ("glob", "etc/*.cfg"),
+        ("regex", r"secrets?/"),
+        ("prefix", "CustomerInfo"),
+    ], root=root)
+
+    def critical(relative_path):
+        return policy.is_critical(os.path.join(root, *relative_path.split("/")))
+
+    assert critical("boot.ini") and critical("deep/dir/boot.ini")
+    assert critical("etc/app.cfg") and not critical("other/etc/app.cfg") and not critical("app.cfg")
+    assert critical("app/secret/key.txt") and critical("secrets/key.txt")
+    assert critical("CustomerInfo") and critical("CustomerInfo/jane.txt")
+    assert not critical("CustomerInformation.txt")
+    assert not critical("readme.md")
+
+
+def test_decisions_are_cached(root):
+    policy = CriticalPolicy(root=root)
+    path = os.path.join(root, "a.json")
+
+    policy.is_critical(path)
+    policy.is_critical(path)
+
+    info = policy.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_unknown_rule_type_is_rejected(root):
+    with pytest.raises(ValueError):
+        CriticalPolicy([("suffix", ".conf")], root=root)
@@ -0,0 +1,78 @@
+import threading
+
+from website.recipients import RecipientCache
+
+
+class FakeCache(RecipientCache):
+    """Serves queued results (lists, or exceptions to raise) instead of querying users."""
+
+    def __init__(self, *results, ttl=None):
+        super().__init__(ttl)
+        self.results = list(results)
+        self.queries = 0
+
+    def _load(self):
+        self.queries += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result() if callable(result) else result
+
+
+def test_list_is_cached_until_invalidated():
+    cache = FakeCache(["a@x.com"], ["a@x.com", "b@x.com"])
+
+    assert cache.admin_emails() == ["a@x.com"]
+    assert cache.admin_emails() == ["a@x.com"]
+    cache.invalidate()
+    assert cache.admin_emails() == ["a@x.com", "b@x.com"]
+    assert cache.queries == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_load_overlapping_an_invalidation_is_not_cached():
+    cache = FakeCache()
+
+    def signup_during_query():
+        cache.invalidate()  # A new admin commits while this query is running
+        return ["a@x.com"]
+
+    cache.results = [signup_during_query, ["a@x.com", "new@x.com"]]
+
+    assert cache.admin_emails() == ["a@x.com", "new@x.com"]
+    assert cache.admin_emails() == ["a@x.com", "new@x.com"]
+    assert cache.queries == 2
+
+
+def test_last_list_is_the_fallback_when_a_reload_fails():
+    cache = FakeCache(["a@x.com"], RuntimeError("database is locked"))
+    cache.admin_emails()
+    cache.invalidate()
+
+    assert cache.admin_emails() == ["a@x.com"]
+    assert cache.stats()["errors"] == 1
+
+
+def test_concurrent_misses_share_one_query():
+    gate = threading.Event()
+    cache = FakeCache(lambda: gate.wait() and ["a@x.com"])
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.admin_emails())) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [["a@x.com"]] * 5
+    assert cache.queries == 1
+
+
+def test_admins_are_read_from_the_user_table(app):
+    from conftest import login_client
+
+    login_client(app, "admin", "Boss")
+    cache = RecipientCache()
+    cache.init_app(app)
+
+    assert "boss@example.com" in cache.admin_emails()
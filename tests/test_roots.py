@@ -0,0 +1,60 @@
+import pytest
+
+from conftest import write
+from website import backup_store
+from website.recipients import admin_recipients
+from website.roots import RootRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = RootRegistry({"Monitor": {"path": str(tmp_path / "default")}})
+    yield registry
+    registry.stop_scheduler()
+
+
+def test_for_path_picks_the_innermost_root(registry, tmp_path):
+    outer = registry.add("outer", str(tmp_path / "data"))
+    inner = registry.add("inner", str(tmp_path / "data" / "etc"))
+
+    assert registry.for_path(str(tmp_path / "data" / "etc" / "a.conf")) is inner
+    assert registry.for_path(str(tmp_path / "data" / "etc-old" / "a.conf")) is outer
+    assert registry.for_path(str(tmp_path / "elsewhere")) is registry.default
+
+
+def test_roots_have_their_own_policy_and_partition(registry, tmp_path):
+    root = registry.add("etc", str(tmp_path / "etc"), rules=[("glob", "*.cfg")], scan_interval=60)
+
+    assert root.partition == "etc" and registry.default.partition is None
+    assert root.is_critical(str(tmp_path / "etc" / "app.cfg"))
+    assert not root.is_critical(str(tmp_path / "etc" / "app.conf"))
+    assert root.status()["nextScanIn"] == 60
+    assert registry.default.status()["nextScanIn"] is None
+    with pytest.raises(ValueError):
+        registry.add("etc", str(tmp_path / "other"))
+
+
+def test_default_root_sweeps_out_of_the_box():
+    registry = RootRegistry()
+    try:
+        assert registry.default.status()["nextScanIn"] == 3600
+    finally:
+        registry.stop_scheduler()
+
+
+def test_run_scan_ingests_then_verifies(monitored, tmp_path, monkeypatch):
+    from website.roots import root_registry
+
+    monkeypatch.setattr(backup_store, "_backup_stores", {})
+    monkeypatch.setattr(admin_recipients, "admin_emails", lambda: [])
+    write(tmp_path / "root" / "a.conf", b"one")
+
+    first = root_registry.run_scan(monitored)
+    assert first["status"] == "ok" and first["ingested"] == 1
+    assert monitored.baseline_count() == 1
+
+    write(tmp_path / "root" / "a.conf", b"changed")
+    second = root_registry.run_scan(monitored)
+    assert second["status"] == "ok" and second["sweep"] == "completed"
+    assert second["modified"] == 1
+    assert not monitored.scanning
@@ -0,0 +1,87 @@
+import os
+import smtplib
+import sys
+import time
+
+import pytest
+
+from website import send_email
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks"))
+from smtp_sink import SMTPSink  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(send_email, "RETRY_BACKOFF", 0.01)
+
+
+def sink_and_dispatcher(password="", **sink_options):
+    sink = SMTPSink(**sink_options).start()
+    dispatcher = send_email.AlertDispatcher(host="127.0.0.1", port=sink.port, use_ssl=False, password=password)
+    return sink, dispatcher
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_alerts_are_delivered_over_one_connection():
+    sink, dispatcher = sink_and_dispatcher()
+    try:
+        assert dispatcher.submit(["a@x.com", "b@x.com", "c@x.com"], "subject", "<p>body</p>")
+        assert dispatcher.flush(timeout=5)
+        assert (sink.messages, sink.connections) == (3, 1)
+        assert dispatcher.sent == 3
+    finally:
+        sink.shutdown()
+
+
+def test_refused_recipient_is_not_retried():
+    sink, dispatcher = sink_and_dispatcher(refuse={"gone@x.com"})
+    try:
+        dispatcher.submit(["gone@x.com", "ok@x.com"], "subject", "body")
+        assert dispatcher.flush(timeout=5)
+        assert sink.recipients.count("gone@x.com") == 1
+        assert (dispatcher.failed, dispatcher.sent, sink.messages) == (1, 1, 1)
+    finally:
+        sink.shutdown()
+
+
+def test_worker_survives_unexpected_errors(monkeypatch):
+    sink, dispatcher = sink_and_dispatcher()
+    deliver = dispatcher._deliver
+
+    def flaky(recipient, subject, content_html):
+        if recipient == "bad@x.com":
+            raise ValueError("malformed message")
+        deliver(recipient, subject, content_html)
+
+    monkeypatch.setattr(dispatcher, "_deliver", flaky)
+    try:
+        dispatcher.submit(["bad@x.com", "ok@x.com"], "subject", "body")
+        assert dispatcher.flush(timeout=5)
+        assert dispatcher.thread.is_alive()
+        assert (dispatcher.failed, sink.messages) == (1, 1)
+    finally:
+        sink.shutdown()
+
+
+def test_failed_login_closes_the_connection(monkeypatch):
+    sink, dispatcher = sink_and_dispatcher(password="wrong", reject_auth=True)
+    closed = []
+    close = smtplib.SMTP.close
+    monkeypatch.setattr(smtplib.SMTP, "close", lambda self: closed.append(self) or close(self))
+    try:
+        dispatcher.submit(["a@x.com"], "subject", "body")
+        assert dispatcher.flush(timeout=5)
+        assert dispatcher.failed == 1
+        assert sink.connections == 1  # 535 is permanent: no retries
+        assert len(closed) == 1
+        wait_for(lambda: sink.closed == sink.connections)
+        assert dispatcher.server is None
+    finally:
+        sink.shutdown()
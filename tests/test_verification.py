@@ -0,0 +1,80 @@
+import hashlib
+import threading
+
+from conftest import write
+from website import verification
+
+
+def record(monitored, files):
+    """Baseline {relative_path: content} as recorded at some earlier time (stale stat tuples)."""
+    store = monitored.open_baseline()
+    try:
+        store.update({
+            path: {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data), "mtime_ns": 1, "inode": 1, "ctime_ns": 1}
+            for path, data in files.items()
+        })
+    finally:
+        store.close()
+
+
+def test_sweep_reports_emptied_file_as_modified(monitored, tmp_path):
+    record(monitored, {"a.conf": b"secret", "b.conf": b"same"})
+    write(tmp_path / "root" / "a.conf", b"")
+    write(tmp_path / "root" / "b.conf", b"same")
+
+    state = verification.run_sweep(monitored)
+
+    assert state["status"] == "completed"
+    assert state["counts"]["modified"] == 1
+    assert state["paths"]["modified"] == ["a.conf"]
+
+
+def test_unreadable_file_is_an_error_not_a_change(monitored, tmp_path, monkeypatch):
+    record(monitored, {"a.conf": b"secret"})
+    write(tmp_path / "root" / "a.conf", b"secret")
+    monkeypatch.setattr(verification, "hash_file", lambda path: None)
+
+    state = verification.run_sweep(monitored)
+
+    assert state["counts"]["modified"] == 0
+    assert state["errors"] == 1
+    assert state["error_paths"] == ["a.conf"]
+
+
+def test_sweep_pages_through_the_baseline(monitored, tmp_path, monkeypatch):
+    files = {f"dir/{index:02}.conf": b"v%d" % index for index in range(7)}
+    record(monitored, files)
+    for path, data in files.items():
+        write(tmp_path / "root" / path, data)
+    write(tmp_path / "root" / "dir" / "new.conf", b"new")
+    monkeypatch.setattr(verification, "VERIFY_PAGE_SIZE", 3)
+
+    state = verification.run_sweep(monitored)
+
+    assert state["files"] == 8
+    assert state["counts"]["added"] == 1
+    assert state["counts"]["modified"] == 0
+
+
+def test_paged_items_matches_items(monitored):
+    record(monitored, {f"{index:03}.conf": b"x" for index in range(10)})
+    store = monitored.open_baseline()
+    try:
+        assert list(verification.paged_items(store, page_size=4)) == list(store.items())
+        assert list(verification.paged_items(store, "004.conf", page_size=4)) == list(store.items(after="004.conf"))
+    finally:
+        store.close()
+
+
+def test_interrupted_sweep_resumes_after_checkpoint(monitored, tmp_path):
+    files = {f"{index}.conf": b"v" for index in range(4)}
+    record(monitored, files)
+    for path, data in files.items():
+        write(tmp_path / "root" / path, data)
+    stop = threading.Event()
+    stop.set()
+
+    assert verification.run_sweep(monitored, stop_event=stop)["status"] == "interrupted"
+    state = verification.run_sweep(monitored)
+    assert state["status"] == "completed"
+    assert state["files"] == 4
@@ -0,0 +1,47 @@
+from conftest import write
+from website.dir_cache import directory_cache
+
+
+def test_tree_etag_changes_when_a_child_gains_a_subfolder(client, browse_root, tmp_path):
+    (tmp_path / "root" / "a").mkdir()
+    first = client.get("/api/tree?depth=1")
+    assert first.json == [{"name": "a", "path": "a", "hasChildren": False}]
+
+    (tmp_path / "root" / "a" / "b").mkdir()
+    directory_cache.invalidate(str(tmp_path / "root" / "a" / "b"), is_directory=True)
+    second = client.get("/api/tree?depth=1", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 200
+    assert second.json[0]["hasChildren"] is True
+
+
+def test_tree_is_revalidated_with_its_etag(client, browse_root, tmp_path):
+    (tmp_path / "root" / "a").mkdir()
+    first = client.get("/api/tree?depth=2")
+
+    assert client.get("/api/tree?depth=2", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+
+def test_list_pages_and_rejects_escapes(client, browse_root, tmp_path):
+    for name in ("a.conf", "b.txt"):
+        write(tmp_path / "root" / name)
+
+    page = client.get("/api/list?limit=1").json
+    assert [item["name"] for item in page["files"]] == ["a.conf"]
+    assert page["files"][0]["isCritical"] is True
+    assert client.get(f"/api/list?cursor={page['nextCursor']}").json["files"][0]["name"] == "b.txt"
+    assert client.get("/api/list?path=../..").status_code == 403
+
+
+def test_start_monitoring_twice_adds_one_reference_each(client, monitored):
+    first = client.get("/start-monitoring?root=test").json
+    second = client.get("/start-monitoring?root=test").json
+    try:
+        assert first["message"] == "FIM monitoring started."
+        assert second == {"message": "FIM monitoring already running.", "references": 2}
+        assert monitored.service.refcounts == {"Employee": 2}
+    finally:
+        assert client.get("/stop-monitoring?root=test").json["references"] == 1
+        assert client.get("/stop-monitoring?root=test").json["message"] == "FIM monitoring stopped."
+    assert monitored.service.observer is None
+    assert client.get("/start-monitoring?root=missing").status_code == 404
@@ -39,6 +39,14 @@ def create_app():
     login_manager.login_view = 'auth.login'
     login_manager.init_app(app)
 
+    # Let observer threads look up alert recipients without a request context
+    from .recipients import admin_recipients
+    admin_recipients.init_app(app)
+
+    # Periodic full scans of every monitored root
+    from .roots import root_registry
+    root_registry.start_scheduler()
+
     @login_manager.user_loader
     def load_user(user_id):
         return User.query.get(int(user_id))
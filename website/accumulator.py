@@ -0,0 +1,110 @@
+# accumulator.py
+import time
+import threading
+from collections import OrderedDict
+from website.fim_utils import fim_logger
+
+# Accumulator limits (hard ceiling on what pending alerts can hold)
+MAX_SAMPLE_PATHS = 100  # Distinct paths kept per change type per window
+MAX_ALERT_WINDOWS = 256  # Recipient groups with pending changes (oldest evicted first)
+CHANGE_KINDS = ("added", "deleted", "modified", "unauthorized")
+
+
+class ChangeWindow:
+    """Changes since the last alert: exact counts plus a capped, deduplicated path sample."""
+
+    def __init__(self, sample_size=None):
+        self.sample_size = sample_size or MAX_SAMPLE_PATHS
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.counts = dict.fromkeys(CHANGE_KINDS, 0)
+        self.samples = {kind: {} for kind in CHANGE_KINDS}  # Insertion-ordered sets
+        self.overflow = dict.fromkeys(CHANGE_KINDS, 0)  # Changes to paths that didn't fit the sample
+        self.rounds = 0
+        self.started_at = time.time()
+
+    def add(self, kind, path):
+        with self.lock:
+            self._add(kind, path)
+
+    def record(self, **changes):
+        """Add one round of changes, e.g. record(added=[...], deleted=[...])."""
+        with self.lock:
+            self.rounds += 1
+            for kind, paths in changes.items():
+                for path in paths:
+                    self._add(kind, path)
+
+    def _add(self, kind, path):
+        self.counts[kind] += 1
+        sample = self.samples[kind]
+        if path in sample:
+            return
+        if len(sample) < self.sample_size:
+            sample[path] = None
+        else:
+            self.overflow[kind] += 1
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def rollover(self):
+        """Return a snapshot of this window and start a new, empty one."""
+        with self.lock:
+            snapshot = {
+                "counts": self.counts,
+                "paths": {kind: list(sample) for kind, sample in self.samples.items()},
+                "overflow": self.overflow,
+                "rounds": self.rounds,
+                "started_at": self.started_at,
+                "ended_at": time.time(),
+            }
+            self._reset()
+        return snapshot
+
+
+def alert_paths(snapshot, kind):
+    """Sampled paths for an alert row, with a note for the ones left out."""
+    paths = list(snapshot["paths"][kind])
+    if snapshot["overflow"][kind]:
+        paths.append(f"... and {snapshot['overflow'][kind]} more")
+    return paths
+
+
+class AlertWindows:
+    """ChangeWindows keyed by recipient group, bounded in number."""
+
+    def __init__(self, max_windows=None, sample_size=None):
+        self.max_windows = max_windows or MAX_ALERT_WINDOWS
+        self.sample_size = sample_size
+        self.windows = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(recipients):
+        return recipients if isinstance(recipients, str) else tuple(recipients)
+
+    def window(self, recipients):
+        """Return the open window for a recipient group, creating it if needed."""
+        key = self._key(recipients)
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None:
+                window = self.windows[key] = ChangeWindow(self.sample_size)
+                while len(self.windows) > self.max_windows:
+                    evicted_key, evicted = self.windows.popitem(last=False)
+                    fim_logger.warning(
+                        f"WARNING | Dropped {evicted.total()} pending alert changes for {evicted_key} (too many alert groups)"
+                    )
+            self.windows.move_to_end(key)
+            return window
+
+    def pop(self, recipients):
+        """Remove and return the window for a recipient group (None if there is none)."""
+        with self.lock:
+            return self.windows.pop(self._key(recipients), None)
+
+    def __len__(self):
+        return len(self.windows)
@@ -5,7 +5,8 @@ from .models import User
 from . import db
 from .decorators import role_required  # ✅ Import the decorator
 from flask_login import current_user
-from .fim_monitor import start_fim_monitor, MONITOR_DIR
+from .fim_monitor import start_fim_monitor, stop_fim_monitor, MONITOR_DIR
+from .recipients import admin_recipients
 from threading import Thread
 from flask import Flask, render_template, request, jsonify
 # In auth.py
@@ -43,11 +44,9 @@ def login():
             login_user(user, remember=True)
             flash(f'Welcome {user.firstName}!', category='success')
 
-            # Initialize FIM monitoring if not already running
-            if not hasattr(current_user, '_fim_thread') or not current_user._fim_thread.is_alive():
-                fim_thread = threading.Thread(target=start_fim_monitor, args=(MONITOR_DIR, current_user.role, current_user.firstName), daemon=True)
-                fim_thread.start()
-                current_user._fim_thread = fim_thread
+            # Subscribe to the shared FIM observer (a user who is already monitoring keeps one reference)
+            fim_thread = threading.Thread(target=start_fim_monitor, args=(MONITOR_DIR, user.role, user.firstName, True), daemon=True)
+            fim_thread.start()
 
             # Redirect based on role
             if user.role == 'admin':
@@ -63,9 +62,8 @@ def login():
 @auth.route('/logout')
 @login_required
 def logout():
-    if hasattr(current_user, '_fim_thread') and current_user._fim_thread.is_alive():
-        # Stop the FIM thread if it's alive
-        current_user._fim_thread.join()
+    # Drop the reference taken at login
+    stop_fim_monitor(current_user.firstName)
     logout_user()
     return redirect(url_for('auth.login'))
 
@@ -105,6 +103,8 @@ def sign_up():
             )
             db.session.add(new_user)
             db.session.commit()
+            if role == 'admin':
+                admin_recipients.invalidate()  # New admin must receive the next alert
             login_user(new_user, remember=True)
             flash(f'{role.capitalize()} account created!', category='success')
             return redirect(url_for('auth.login'))  # ✅ Redirect to login page after signup
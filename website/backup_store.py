@@ -0,0 +1,368 @@
+# backup_store.py
+import os
+import time
+import zlib
+import struct
+import sqlite3
+import hashlib
+import threading
+from website.fim_utils import fim_logger
+from website.hash_engine import record_read
+from website.metrics import registry
+
+# Store layout: Backups/objects/<2-char prefix>/<sha256>.z holds each distinct content once,
+# either zlib-compressed in full or as a compressed delta against a full base of the same path.
+# Backups/index.db maps every monitored path to its list of versions.
+BACKUP_DIR = "Backups"
+INDEX_NAME = "index.db"
+
+# Delta settings
+COMPRESS_LEVEL = 6
+MIN_DELTA_SIZE = 4096  # Smaller files are always stored in full
+MAX_DELTA_SIZE = 64 * 1024 * 1024  # Larger files are streamed straight to a full object (deltas need them in memory)
+INGEST_CHUNK_SIZE = 1024 * 1024
+REBASE_EVERY = 50  # Store a fresh full base after this many deltas against the current one
+REBASE_RATIO = 0.5  # ...or as soon as a delta is larger than this fraction of the full object
+COPY_OP = b"C"
+INSERT_OP = b"I"
+
+backup_bytes_written = registry.counter("fim_backup_bytes_written_total", "Compressed bytes written to backup objects, by object kind", "kind")
+
+
+def make_delta(base, target):
+    """Encode target as copy/insert operations against base (line-aligned matching).
+
+    Lines that occur once in base act as anchors; after a mismatch the matcher also
+    tries the line the base would have had at the same position, which catches
+    in-place edits of repeated lines such as closing XML tags.
+    """
+    base_lines = base.splitlines(keepends=True)
+    offsets = [0]
+    for line in base_lines:
+        offsets.append(offsets[-1] + len(line))
+
+    anchors = {}
+    for index, line in enumerate(base_lines):
+        anchors[line] = -1 if line in anchors else index
+
+    ops = []
+    inserted = []
+    run_start = run_end = None  # Base line range currently being copied
+    cursor = 0  # Base line aligned with the current target line
+
+    def close_run():
+        if run_start is not None:
+            ops.append(COPY_OP + struct.pack(">QQ", offsets[run_start], offsets[run_end] - offsets[run_start]))
+
+    for line in target.splitlines(keepends=True):
+        if run_end is not None and run_end < len(base_lines) and base_lines[run_end] == line:
+            run_end += 1
+            cursor = run_end
+            continue
+
+        if cursor < len(base_lines) and base_lines[cursor] == line:
+            start = cursor
+        else:
+            start = anchors.get(line, -1)
+
+        if start >= 0:
+            close_run()
+            if inserted:
+                data = b"".join(inserted)
+                ops.append(INSERT_OP + struct.pack(">Q", len(data)) + data)
+                inserted = []
+            run_start, run_end = start, start + 1
+            cursor = run_end
+        else:
+            if run_start is not None:
+                close_run()
+                run_start = run_end = None
+            inserted.append(line)
+            cursor += 1
+
+    close_run()
+    if inserted:
+        data = b"".join(inserted)
+        ops.append(INSERT_OP + struct.pack(">Q", len(data)) + data)
+    return b"".join(ops)
+
+
+def apply_delta(base, delta):
+    """Rebuild the target bytes from a base and a delta produced by make_delta."""
+    parts = []
+    view = memoryview(delta)
+    position = 0
+    while position < len(delta):
+        op = delta[position:position + 1]
+        if op == COPY_OP:
+            start, length = struct.unpack_from(">QQ", delta, position + 1)
+            parts.append(base[start:start + length])
+            position += 17
+        elif op == INSERT_OP:
+            (length,) = struct.unpack_from(">Q", delta, position + 1)
+            parts.append(view[position + 9:position + 9 + length])
+            position += 9 + length
+        else:
+            raise ValueError(f"Corrupt delta at byte {position}")
+    return b"".join(parts)
+
+
+class BackupStore:
+    """Content-addressed, compressed backup objects plus a per-path version index."""
+
+    def __init__(self, backup_dir=None):
+        self.backup_dir = backup_dir or BACKUP_DIR
+        self.objects_dir = os.path.join(self.backup_dir, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(self.backup_dir, INDEX_NAME), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS versions ("
+            "path TEXT NOT NULL, version INTEGER NOT NULL, sha256 TEXT NOT NULL, "
+            "size INTEGER, created TEXT, PRIMARY KEY (path, version)) WITHOUT ROWID"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS objects ("
+            "sha256 TEXT PRIMARY KEY, kind TEXT NOT NULL, base TEXT, "
+            "size INTEGER, stored_size INTEGER) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS objects_base ON objects (base)")
+        self.conn.commit()
+
+    def object_path(self, file_hash):
+        """Location of the stored content for a SHA-256."""
+        return os.path.join(self.objects_dir, file_hash[:2], f"{file_hash}.z")
+
+    def latest(self, relative_path):
+        """Return the newest version record for a path, or None."""
+        row = self.conn.execute(
+            "SELECT version, sha256, size, created FROM versions WHERE path = ? ORDER BY version DESC LIMIT 1",
+            (relative_path,),
+        ).fetchone()
+        return _version_record(row) if row else None
+
+    def versions(self, relative_path):
+        """Return every version record for a path, oldest first."""
+        rows = self.conn.execute(
+            "SELECT version, sha256, size, created FROM versions WHERE path = ? ORDER BY version",
+            (relative_path,),
+        ).fetchall()
+        return [_version_record(row) for row in rows]
+
+    def get_version(self, relative_path, version=None):
+        """Return a specific version record (latest when version is None), or None."""
+        if version is None:
+            return self.latest(relative_path)
+        row = self.conn.execute(
+            "SELECT version, sha256, size, created FROM versions WHERE path = ? AND version = ?",
+            (relative_path, version),
+        ).fetchone()
+        return _version_record(row) if row else None
+
+    def backup(self, file_path, relative_path, file_hash=None):
+        """Back up a file; returns (version record, created) and costs nothing if unchanged.
+
+        With a known hash (e.g. from a stat-matched baseline entry) an unchanged or
+        already-stored file is recorded without reading it at all.
+        """
+        if file_hash is not None:
+            with self.lock:
+                latest = self.latest(relative_path)
+                if latest and latest["sha256"] == file_hash:
+                    return latest, False  # Same content as the last backup of this path
+                if self._has_object(file_hash):
+                    return self._add_version(relative_path, file_hash, os.path.getsize(file_path), latest), True
+        record, created, _ = self.ingest(file_path, relative_path)
+        return record, created
+
+    def ingest(self, file_path, relative_path):
+        """Read a file once, feeding the same buffer to SHA-256 and the object writer.
+
+        Returns (version record, created, sha256). Files up to MAX_DELTA_SIZE are
+        buffered so they can be delta-encoded; larger ones are compressed to a
+        temp object while they are read.
+        """
+        sha256 = hashlib.sha256()
+        buffered = []
+        size = 0
+        temp_path = None
+        out = None
+        compressor = None
+
+        try:
+            with open(file_path, "rb") as f:
+                while chunk := f.read(INGEST_CHUNK_SIZE):
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    if compressor is None and size > MAX_DELTA_SIZE:
+                        # Too big to keep in memory: switch to streaming compression
+                        compressor = zlib.compressobj(COMPRESS_LEVEL)
+                        temp_path = os.path.join(self.objects_dir, f"ingest-{threading.get_ident()}.tmp")
+                        out = open(temp_path, "wb")
+                        for pending in buffered:
+                            out.write(compressor.compress(pending))
+                        buffered = []
+                    if compressor is None:
+                        buffered.append(chunk)
+                    else:
+                        out.write(compressor.compress(chunk))
+            if out is not None:
+                out.write(compressor.flush())
+                out.close()
+            record_read(size)
+            file_hash = sha256.hexdigest()
+
+            with self.lock:
+                latest = self.latest(relative_path)
+                if latest and latest["sha256"] == file_hash:
+                    return latest, False, file_hash
+
+                if not self._has_object(file_hash):
+                    if temp_path is not None:
+                        stored = self.object_path(file_hash)
+                        os.makedirs(os.path.dirname(stored), exist_ok=True)
+                        os.replace(temp_path, stored)
+                        self._record_object(file_hash, "full", None, size, os.path.getsize(stored))
+                    else:
+                        self._store_bytes(file_hash, b"".join(buffered), latest)
+                return self._add_version(relative_path, file_hash, size, latest), True, file_hash
+        finally:
+            if out is not None:
+                out.close()  # A read error left the temp object open
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _add_version(self, relative_path, file_hash, size, latest):
+        record = {
+            "version": (latest["version"] + 1) if latest else 1,
+            "sha256": file_hash,
+            "size": size,
+            "created": time.strftime('%Y-%m-%d_%H-%M-%S'),
+        }
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO versions VALUES (?, ?, ?, ?, ?)",
+                (relative_path, record["version"], record["sha256"], record["size"], record["created"]),
+            )
+        return record
+
+    def read(self, file_hash):
+        """Return the exact bytes of a stored object (at most one delta is applied)."""
+        row = self.conn.execute("SELECT kind, base FROM objects WHERE sha256 = ?", (file_hash,)).fetchone()
+        if row is None:
+            with open(self._plain_path(file_hash), "rb") as f:  # Uncompressed object from an older store
+                return f.read()
+
+        kind, base = row
+        with open(self.object_path(file_hash), "rb") as f:
+            data = zlib.decompress(f.read())
+        if kind == "delta":
+            data = apply_delta(self.read(base), data)
+        return data
+
+    def restore(self, relative_path, destination, version=None):
+        """Write a stored version back to destination; returns the record or None if unknown."""
+        record = self.get_version(relative_path, version)
+        if record is None:
+            return None
+        if not self._has_object(record["sha256"]) and not os.path.exists(self._plain_path(record["sha256"])):
+            return None
+
+        data = self.read(record["sha256"])
+        if hashlib.sha256(data).hexdigest() != record["sha256"]:
+            fim_logger.error(f"ERROR | Backup object {record['sha256']} failed verification")
+            return None
+
+        os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+        temp_path = f"{destination}.restore-tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, destination)
+        return record
+
+    def stats(self):
+        """Return logical vs stored byte totals for the whole store."""
+        logical = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM versions").fetchone()[0]
+        stored, full, deltas = self.conn.execute(
+            "SELECT COALESCE(SUM(stored_size), 0), SUM(kind = 'full'), SUM(kind = 'delta') FROM objects"
+        ).fetchone()
+        return {"logical_bytes": logical, "stored_bytes": stored, "full_objects": full or 0, "delta_objects": deltas or 0}
+
+    def _plain_path(self, file_hash):
+        return os.path.join(self.objects_dir, file_hash[:2], file_hash)
+
+    def _has_object(self, file_hash):
+        return self.conn.execute("SELECT 1 FROM objects WHERE sha256 = ?", (file_hash,)).fetchone() is not None
+
+    def _store_bytes(self, file_hash, data, latest):
+        """Store a new object, as a delta against the path's current base when that pays off."""
+        base = self._base_for(latest) if latest and MIN_DELTA_SIZE <= len(data) <= MAX_DELTA_SIZE else None
+
+        if base is not None:
+            base_hash, deltas_on_base, base_stored_size = base
+            if deltas_on_base < REBASE_EVERY:
+                delta = zlib.compress(make_delta(self.read(base_hash), data), COMPRESS_LEVEL)
+                if len(delta) <= base_stored_size * REBASE_RATIO:
+                    self._write_object(file_hash, "delta", base_hash, len(data), delta)
+                    return
+
+        self._write_object(file_hash, "full", None, len(data), zlib.compress(data, COMPRESS_LEVEL))
+
+    def _base_for(self, latest):
+        """Return (base sha, deltas already stored against it, base stored size) for a path's latest version."""
+        row = self.conn.execute(
+            "SELECT kind, base FROM objects WHERE sha256 = ?", (latest["sha256"],)
+        ).fetchone()
+        if row is None:
+            return None
+        base_hash = latest["sha256"] if row[0] == "full" else row[1]
+        deltas_on_base, = self.conn.execute(
+            "SELECT COUNT(*) FROM objects WHERE base = ?", (base_hash,)
+        ).fetchone()
+        base_stored_size, = self.conn.execute(
+            "SELECT stored_size FROM objects WHERE sha256 = ?", (base_hash,)
+        ).fetchone()
+        return base_hash, deltas_on_base, base_stored_size
+
+    def _write_object(self, file_hash, kind, base, size, payload):
+        stored = self.object_path(file_hash)
+        os.makedirs(os.path.dirname(stored), exist_ok=True)
+        temp_path = f"{stored}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(payload)
+        os.replace(temp_path, stored)  # Objects appear atomically, never half-written
+        self._record_object(file_hash, kind, base, size, len(payload))
+
+    def _record_object(self, file_hash, kind, base, size, stored_size):
+        backup_bytes_written.inc(kind, stored_size)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?)",
+                (file_hash, kind, base, size, stored_size),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def _version_record(row):
+    version, file_hash, size, created = row
+    return {"version": version, "sha256": file_hash, "size": size, "created": created}
+
+
+_backup_stores = {}  # namespace -> BackupStore
+_backup_store_lock = threading.Lock()
+
+
+def backup_dir_for(namespace=None):
+    """Backup directory of a namespace (None is the original BACKUP_DIR)."""
+    return os.path.join(BACKUP_DIR, "roots", namespace) if namespace else BACKUP_DIR
+
+
+def get_backup_store(namespace=None):
+    """Return the process-wide backup store for a namespace, opening it on first use."""
+    with _backup_store_lock:
+        if namespace not in _backup_stores:
+            _backup_stores[namespace] = BackupStore(backup_dir_for(namespace))
+        return _backup_stores[namespace]
@@ -0,0 +1,349 @@
+# baseline_store.py
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+from website.fim_utils import fim_logger
+
+# Backend settings
+BASELINE_BACKEND = "sqlite"  # "sqlite" (indexed, WAL mode) or "json" (legacy single file)
+BASELINE_FILE = "baseline.json"
+BASELINE_DB = "baseline.db"
+ENTRY_FIELDS = ("sha256", "size", "mtime_ns", "inode", "ctime_ns")
+BATCH_SIZE = 5000  # Rows written per executemany call
+JSON_SEPARATORS = (",", ":")  # Compact baseline.json (no indentation or padding)
+
+
+def normalize_entry(entry):
+    """Turn a baseline entry into a dict (old JSON baselines store only the hash string)."""
+    if isinstance(entry, dict):
+        return {field: entry.get(field) for field in ENTRY_FIELDS}
+    return {"sha256": entry, "size": None, "mtime_ns": None, "inode": None, "ctime_ns": None}
+
+
+def read_json_baseline(f):
+    """Return (generation, entries) from an open baseline.json (old flat files are generation 0)."""
+    data = json.load(f)
+    if isinstance(data.get("entries"), dict) and isinstance(data.get("generation"), int):
+        return data["generation"], data["entries"]
+    return 0, data
+
+
+def atomic_write_json(path, data):
+    """Write JSON to a temp file next to `path`, fsync it and rename it into place.
+
+    Readers see either the old file or the new one, never a partial write, and a
+    crash mid-write leaves the previous file untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, separators=JSON_SEPARATORS)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):  # Persist the rename itself (POSIX only)
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def subtree_bounds(path):
+    """(lower, upper) such that lower < p < upper holds exactly for paths strictly below `path`."""
+    return path + os.sep, path + chr(ord(os.sep) + 1)
+
+
+_path_locks = {}  # Absolute path -> lock shared by every JSONBaselineStore on that file
+_path_locks_lock = threading.Lock()
+
+
+def _path_lock(path):
+    with _path_locks_lock:
+        return _path_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def _file_identity(st):
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class JSONBaselineStore:
+    """Baseline kept as one JSON document (loaded whole, replaced atomically on every update).
+
+    The document is {"generation": n, "entries": {...}}; each update bumps the
+    generation. The in-memory copy is never mutated in place, so an items() walk
+    keeps the generation it started on, and a file replaced by another writer is
+    picked up on the next read.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or BASELINE_FILE
+        self.lock = _path_lock(self.path)  # Stores are opened per use, so writers of one file share it
+        self.data = None  # Parsed once per file version, then served from memory
+        self.generation = 0
+        self.identity = None  # (inode, mtime_ns, size) of the file self.data came from
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _load(self):
+        try:
+            identity = _file_identity(os.stat(self.path))
+        except FileNotFoundError:
+            identity = None
+        if self.data is None or identity != self.identity:
+            if identity is None:
+                self.generation, self.data = 0, {}
+            else:
+                with open(self.path, "r") as f:
+                    identity = _file_identity(os.fstat(f.fileno()))
+                    self.generation, self.data = read_json_baseline(f)
+            self.identity = identity
+        return self.data
+
+    def get_generation(self):
+        """Generation of the baseline currently on disk (0 before the first update)."""
+        self._load()
+        return self.generation
+
+    def get(self, path):
+        """Return the entry for a relative path, or None."""
+        entry = self._load().get(path)
+        return normalize_entry(entry) if entry is not None else None
+
+    def items(self, after=None):
+        """Yield (path, entry) pairs in path order (only paths sorting after `after` if given)."""
+        data = self._load()
+        for path in sorted(data):
+            if after is None or path > after:
+                yield path, normalize_entry(data[path])
+
+    def paths(self):
+        """Yield relative paths in path order."""
+        yield from sorted(self._load())
+
+    def items_under(self, path):
+        """Yield (path, entry) for a path and everything below it, in path order."""
+        data = self._load()
+        lower, upper = subtree_bounds(path)
+        for key in sorted(key for key in data if key == path or lower < key < upper):
+            yield key, normalize_entry(data[key])
+
+    def count(self):
+        return len(self._load())
+
+    def update(self, upserts=None, deletes=()):
+        """Apply inserts/updates and deletions as one new generation (copy, write, rename)."""
+        with self.lock:
+            data = dict(self._load())
+            for path, entry in (upserts or {}).items():
+                data[path] = normalize_entry(entry)
+            for path in deletes:
+                data.pop(path, None)
+            self._write(data)
+
+    def rename(self, old_path, new_path):
+        """Re-key a path and everything below it (hashes are kept); returns the entries moved."""
+        with self.lock:
+            data = dict(self._load())
+            old_lower, old_upper = subtree_bounds(old_path)
+            new_lower, new_upper = subtree_bounds(new_path)
+            moved = [key for key in data if key == old_path or old_lower < key < old_upper]
+            if not moved:
+                return 0  # Nothing recorded there (or already re-keyed): leave the destination alone
+            for key in [key for key in data if key == new_path or new_lower < key < new_upper]:
+                del data[key]  # Whatever the rename replaced
+            for key in moved:
+                data[new_path + key[len(old_path):]] = data.pop(key)
+            self._write(data)
+            return len(moved)
+
+    def _write(self, data):
+        generation = self.generation + 1
+        atomic_write_json(self.path, {"generation": generation, "entries": data})
+        self.data, self.generation = data, generation
+        self.identity = _file_identity(os.stat(self.path))
+
+    def close(self):
+        pass
+
+
+class SQLiteBaselineStore:
+    """Baseline kept in an indexed SQLite table (WAL mode, rows clustered by path)."""
+
+    def __init__(self, path=None):
+        self.path = path or BASELINE_DB
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS baseline ("
+            "path TEXT PRIMARY KEY, sha256 TEXT, size INTEGER, "
+            "mtime_ns INTEGER, inode INTEGER, ctime_ns INTEGER) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS baseline_meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self.conn.commit()
+
+    def exists(self):
+        return self.conn.execute("SELECT 1 FROM baseline LIMIT 1").fetchone() is not None
+
+    def get(self, path):
+        """Return the entry for a relative path, or None."""
+        row = self.conn.execute(
+            "SELECT sha256, size, mtime_ns, inode, ctime_ns FROM baseline WHERE path = ?", (path,)
+        ).fetchone()
+        return dict(zip(ENTRY_FIELDS, row)) if row else None
+
+    def items(self, after=None):
+        """Stream (path, entry) pairs in path order without loading the table."""
+        if after is None:
+            cursor = self.conn.execute(
+                "SELECT path, sha256, size, mtime_ns, inode, ctime_ns FROM baseline ORDER BY path"
+            )
+        else:  # Resume point: a range scan on the primary key
+            cursor = self.conn.execute(
+                "SELECT path, sha256, size, mtime_ns, inode, ctime_ns FROM baseline WHERE path > ? ORDER BY path",
+                (after,),
+            )
+        for row in cursor:
+            yield row[0], dict(zip(ENTRY_FIELDS, row[1:]))
+
+    def paths(self):
+        """Stream relative paths in path order."""
+        for (path,) in self.conn.execute("SELECT path FROM baseline ORDER BY path"):
+            yield path
+
+    def items_under(self, path):
+        """Stream (path, entry) for a path and everything below it (a range scan on the primary key)."""
+        cursor = self.conn.execute(
+            "SELECT path, sha256, size, mtime_ns, inode, ctime_ns FROM baseline "
+            "WHERE path = ? OR (path > ? AND path < ?) ORDER BY path",
+            (path,) + subtree_bounds(path),
+        )
+        for row in cursor:
+            yield row[0], dict(zip(ENTRY_FIELDS, row[1:]))
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM baseline").fetchone()[0]
+
+    def get_generation(self):
+        """Number of committed updates (0 before the first one)."""
+        return self.get_meta("generation") or 0
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM baseline_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO baseline_meta VALUES (?, ?)", (key, value))
+
+    def update(self, upserts=None, deletes=()):
+        """Apply inserts/updates and deletions in a single transaction that bumps the generation."""
+        rows = (
+            (path,) + tuple(normalize_entry(entry)[field] for field in ENTRY_FIELDS)
+            for path, entry in (upserts or {}).items()
+        )
+        with self.lock, self.conn:
+            _executemany_batched(
+                self.conn, "INSERT OR REPLACE INTO baseline VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            _executemany_batched(
+                self.conn, "DELETE FROM baseline WHERE path = ?", ((path,) for path in deletes)
+            )
+            self._bump_generation()
+
+    def rename(self, old_path, new_path):
+        """Re-key a path and everything below it in one transaction (hashes are kept); returns the rows moved."""
+        old_range = (old_path,) + subtree_bounds(old_path)
+        with self.lock, self.conn:
+            if self.conn.execute("SELECT 1 FROM baseline WHERE path = ? OR (path > ? AND path < ?) LIMIT 1", old_range).fetchone() is None:
+                return 0  # Nothing recorded there (or already re-keyed): leave the destination alone
+            self.conn.execute(  # Whatever the rename replaced
+                "DELETE FROM baseline WHERE path = ? OR (path > ? AND path < ?)", (new_path,) + subtree_bounds(new_path)
+            )
+            moved = self.conn.execute(
+                "UPDATE baseline SET path = ? || substr(path, ?) WHERE path = ? OR (path > ? AND path < ?)",
+                (new_path, len(old_path) + 1) + old_range,
+            ).rowcount
+            self._bump_generation()
+        return moved
+
+    def _bump_generation(self):
+        self.conn.execute(
+            "INSERT INTO baseline_meta VALUES ('generation', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+
+    def close(self):
+        self.conn.close()
+
+
+def _executemany_batched(conn, sql, rows):
+    """Feed rows to executemany in fixed-size batches."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            conn.executemany(sql, batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+
+
+def migrate_json_baseline(json_path=None, store=None):
+    """One-shot import of a baseline.json file into the SQLite store."""
+    json_path = json_path or BASELINE_FILE
+    store = store or SQLiteBaselineStore()
+    with open(json_path, "r") as f:
+        _, data = read_json_baseline(f)
+
+    store.update(data)
+    store.set_meta("migrated", 1)
+    fim_logger.info(f"INFO | Migrated {len(data)} baseline entries from {json_path} to {store.path}")
+    return store
+
+
+def partition_path(path, partition=None):
+    """Baseline file for a partition: "baseline.db" -> "baseline-<partition>.db"."""
+    if not partition:
+        return path
+    stem, extension = os.path.splitext(path)
+    return f"{stem}-{partition}{extension}"
+
+
+def open_baseline_store(backend=None, partition=None):
+    """Open the configured baseline backend, migrating baseline.json once (on first use).
+
+    Each monitored root keeps its baseline in its own partition (None is the original files).
+    """
+    backend = backend or BASELINE_BACKEND
+    if backend == "json":
+        return JSONBaselineStore(partition_path(BASELINE_FILE, partition))
+    if backend != "sqlite":
+        raise ValueError(f"Unknown baseline backend: {backend}")
+
+    store = SQLiteBaselineStore(partition_path(BASELINE_DB, partition))
+    if not partition and not store.get_meta("migrated"):
+        # Only the first open decides: an emptied baseline is never refilled from a stale baseline.json
+        if not store.exists() and os.path.exists(BASELINE_FILE):
+            migrate_json_baseline(BASELINE_FILE, store)
+        else:
+            store.set_meta("migrated", 1)
+    return store
+
+
+if __name__ == "__main__":
+    # python -m website.baseline_store [baseline.json]  -> one-shot migration
+    import sys
+    migrate_json_baseline(sys.argv[1] if len(sys.argv) > 1 else None).close()
@@ -0,0 +1,99 @@
+# dir_cache.py
+import os
+import hashlib
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from website.fim_utils import is_critical
+
+DIR_CACHE_SIZE = 4096  # Directory listings kept in memory (least recently used are evicted)
+
+
+class DirectoryCache:
+    """Sorted directory listings keyed by absolute path.
+
+    Entries are revalidated with one stat of the directory (mtime_ns) and dropped
+    early by watchdog events, so unchanged folders never need another scandir.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or DIR_CACHE_SIZE
+        self.entries = OrderedDict()  # directory -> listing dict
+        self.generation = 0  # Bumped on every invalidation so ETags change even within one mtime tick
+        self.lock = threading.Lock()
+
+    def listing(self, directory):
+        """Return {"items", "keys", "etag"} for a directory (folders first, then by name)."""
+        directory = os.path.abspath(directory)
+        mtime_ns = os.stat(directory).st_mtime_ns
+        with self.lock:
+            cached = self.entries.get(directory)
+            if cached is not None and cached["mtime_ns"] == mtime_ns:
+                self.entries.move_to_end(directory)
+                return cached
+            generation = self.generation
+
+        items = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                is_folder = entry.is_dir()
+                items.append({"name": entry.name, "isFolder": is_folder, "isCritical": is_critical(entry.path)})
+        items.sort(key=sort_key)
+
+        listing = {
+            "items": items,
+            "keys": [sort_key(item) for item in items],
+            "mtime_ns": mtime_ns,
+            "etag": hashlib.sha1(f"{directory}:{mtime_ns}:{generation}".encode()).hexdigest(),
+        }
+        with self.lock:
+            if generation == self.generation:  # Don't cache a listing that an event already invalidated
+                self.entries[directory] = listing
+                self.entries.move_to_end(directory)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return listing
+
+    def page(self, directory, cursor=None, limit=None):
+        """Return (items, next_cursor, listing) for one page after the given cursor."""
+        listing = self.listing(directory)
+        start = bisect_right(listing["keys"], decode_cursor(cursor)) if cursor else 0
+        end = start + limit if limit else len(listing["items"])
+        items = listing["items"][start:end]
+        next_cursor = encode_cursor(items[-1]) if items and end < len(listing["items"]) else None
+        return items, next_cursor, listing
+
+    def has_subfolders(self, directory):
+        """Check whether a directory contains at least one folder (for lazy tree expansion)."""
+        try:
+            return any(item["isFolder"] for item in self.listing(directory)["items"])
+        except OSError:
+            return False
+
+    def invalidate(self, path, is_directory=False):
+        """Drop the listing of a changed path's parent (and its own subtree if it is a folder)."""
+        path = os.path.abspath(path)
+        with self.lock:
+            self.generation += 1
+            self.entries.pop(os.path.dirname(path), None)
+            if is_directory:
+                prefix = path + os.sep
+                for directory in [d for d in self.entries if d == path or d.startswith(prefix)]:
+                    del self.entries[directory]
+
+
+def sort_key(item):
+    return (0 if item["isFolder"] else 1, item["name"])
+
+
+def encode_cursor(item):
+    """Opaque page cursor for the last item returned."""
+    return f"{sort_key(item)[0]}/{item['name']}"
+
+
+def decode_cursor(cursor):
+    rank, _, name = cursor.partition("/")
+    return (int(rank), name)
+
+
+directory_cache = DirectoryCache()  # Shared by the file-browser API and the watchdog handlers
@@ -0,0 +1,146 @@
+# event_store.py
+import os
+import time
+import sqlite3
+import threading
+
+# Event store settings
+EVENT_DB = "events.db"
+EVENT_PAGE_SIZE = 100  # Default events per query page
+MAX_EVENT_PAGE_SIZE = 1000
+EVENT_FIELDS = (
+    "ts", "username", "role", "event_type", "path", "dest_path",
+    "critical", "unauthorized", "sha256_before", "sha256_after", "count", "root",
+)
+
+
+def make_event(username, role, event_type, path, dest_path=None, critical=False, unauthorized=False,
+               sha256_before=None, sha256_after=None, count=1, ts=None, root=None):
+    """Build one event record (paths are relative to the monitored root, stored with '/')."""
+    return {
+        "ts": time.time() if ts is None else ts,
+        "username": username,
+        "role": role,
+        "event_type": event_type,
+        "path": path.replace(os.sep, "/"),
+        "dest_path": dest_path.replace(os.sep, "/") if dest_path else None,
+        "critical": bool(critical),
+        "unauthorized": bool(unauthorized),
+        "sha256_before": sha256_before,
+        "sha256_after": sha256_after,
+        "count": count,
+        "root": root,
+    }
+
+
+class EventStore:
+    """Append-only FIM event log in SQLite, indexed by path, user and time."""
+
+    def __init__(self, path=None):
+        self.path = path or EVENT_DB
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, username TEXT, role TEXT, "
+            "event_type TEXT NOT NULL, path TEXT NOT NULL, dest_path TEXT, "
+            "critical INTEGER NOT NULL DEFAULT 0, unauthorized INTEGER NOT NULL DEFAULT 0, "
+            "sha256_before TEXT, sha256_after TEXT, count INTEGER NOT NULL DEFAULT 1, root TEXT);"
+            "CREATE INDEX IF NOT EXISTS events_ts ON events (ts);"
+            "CREATE INDEX IF NOT EXISTS events_path_ts ON events (path, ts);"
+            "CREATE INDEX IF NOT EXISTS events_user_ts ON events (username, ts);"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(events)")}
+        if "root" not in columns:  # Stores created before multi-root monitoring
+            self.conn.execute("ALTER TABLE events ADD COLUMN root TEXT")
+        self.conn.commit()
+
+    def append(self, events):
+        """Write a batch of events in one transaction; return how many were stored."""
+        rows = [tuple(event.get(field) for field in EVENT_FIELDS) for event in events]
+        if not rows:
+            return 0
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO events ({', '.join(EVENT_FIELDS)}) VALUES ({', '.join('?' * len(EVENT_FIELDS))})",
+                rows,
+            )
+        return len(rows)
+
+    def query(self, user=None, path=None, event_type=None, since=None, until=None,
+              critical=None, unauthorized=None, root=None, cursor=None, limit=None):
+        """Return (events newest first, next_cursor) matching every given filter.
+
+        `path` matches the path itself and everything below it. `cursor` is the
+        opaque value returned by the previous page ("<ts>:<id>").
+        """
+        limit = max(1, min(limit or EVENT_PAGE_SIZE, MAX_EVENT_PAGE_SIZE))
+        clauses, params = [], []
+        if user:
+            clauses.append("username = ?")
+            params.append(user)
+        if path:
+            path = path.replace("\\", "/").strip("/")
+            clauses.append("(path = ? OR (path > ? AND path < ?))")
+            # Children of a folder sort between "<folder>/" and "<folder>0" ('0' follows '/')
+            params += [path, path + "/", path + "0"]
+        if root:
+            clauses.append("root = ?")
+            params.append(root)
+        if event_type:
+            clauses.append("event_type = ?")
+            params.append(event_type)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if critical is not None:
+            clauses.append("critical = ?")
+            params.append(int(critical))
+        if unauthorized is not None:
+            clauses.append("unauthorized = ?")
+            params.append(int(unauthorized))
+        if cursor:
+            ts, _, event_id = cursor.partition(":")
+            ts, event_id = float(ts), int(event_id)
+            clauses.append("(ts < ? OR (ts = ? AND id < ?))")
+            params += [ts, ts, event_id]
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id, {', '.join(EVENT_FIELDS)} FROM events {where} ORDER BY ts DESC, id DESC LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
+
+        events = []
+        for row in rows[:limit]:
+            event = dict(zip(("id",) + EVENT_FIELDS, row))
+            event["critical"] = bool(event["critical"])
+            event["unauthorized"] = bool(event["unauthorized"])
+            events.append(event)
+        next_cursor = f"{events[-1]['ts']!r}:{events[-1]['id']}" if len(rows) > limit else None
+        return events, next_cursor
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+_event_store = None
+_event_store_lock = threading.Lock()
+
+
+def get_event_store():
+    """Return the process-wide event store, opening it on first use."""
+    global _event_store
+    with _event_store_lock:
+        if _event_store is None:
+            _event_store = EventStore()
+        return _event_store
@@ -1,24 +1,32 @@
 import os
-import hashlib
-import json
 import shutil
 import time
-from website.fim_utils import is_critical, fim_logger, calculate_sha256
+from website.fim_utils import fim_logger
+from website.hash_engine import hash_file, hash_files, io_counters
 from website.send_email import send_critical_alert  # Import email function
 from flask_login import current_user
 import logging
-from watchdog.observers import Observer
-from collections import defaultdict
+from website import MONITOR_DIR
+from website.monitor_service import monitor_service
+from website.roots import root_registry
+from website.backup_store import BACKUP_DIR, get_backup_store
+from website.accumulator import AlertWindows, alert_paths
+from website.metrics import registry, SCAN_BUCKETS
 
 # Constants
-BASELINE_FILE = "baseline.json"
-BACKUP_DIR = "Backups"
-MONITOR_DIR = "Monitor"
 LOG_FILE = "fim.log"
-CRITICAL_EXTENSIONS = ['.conf', '.xml', '.json', '.dll']
-user_fim_handlers = {}  # Track FIM handlers per user
+user_fim_handlers = monitor_service.handlers  # Track FIM handlers per user
 ALERT_THRESHOLD = 1  # Max number of file changes before sending a batch email alert
-email_batch = defaultdict(list)  # Store alerts for batch processing
+email_batch = AlertWindows()  # Pending changes per recipient group (bounded, rolled over on send)
+SCAN_MODE = "incremental"  # "incremental" re-hashes only files whose stat tuple changed, "full" re-hashes everything
+PARANOID_EVERY_N_RUNS = 0  # Force a full re-hash every N scans (0 disables paranoid mode)
+STAT_FIELDS = ("size", "mtime_ns", "inode", "ctime_ns")
+scan_runs = 0  # Number of scans run by this process
+last_scan_report = {}  # Stats of the most recent scan (stat-skipped vs re-hashed)
+SCAN_HASH_WINDOW = 1024  # Records buffered while their hashes are computed in parallel
+scan_seconds = registry.histogram("fim_scan_duration_seconds", "Baseline scans and ingests, by mode", SCAN_BUCKETS, "mode")
+scan_files = registry.counter("fim_scan_files_total", "Files examined by scans, by how their hash was obtained", "result")
+alert_batches = registry.counter("fim_alert_batches_total", "Batched scan alerts sent")
 
 # Move the import of FIMHandler inside a function to avoid circular import
 def get_fim_handler():
@@ -31,145 +39,355 @@ def calculate_sha256(file_path):
         if os.path.getsize(file_path) == 0:
             fim_logger.warning(f"WARNING | File is empty: {file_path}")
             return None  # Skip empty files
-        
-        with open(file_path, "rb") as f:
-            sha256 = hashlib.sha256()
-            while chunk := f.read(4096):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+
+        return hash_file(file_path)
     except Exception as e:
         fim_logger.error(f"ERROR | Hashing failed for {file_path} | {e}")
         return None
 
-def is_critical(file_path):
-    """Check if a file is critical based on its extension."""
-    return os.path.splitext(file_path)[1] in CRITICAL_EXTENSIONS
+def file_signature(file_path):
+    """Return the stat tuple used to decide whether a file needs re-hashing."""
+    return stat_signature(os.stat(file_path))
+
+def stat_signature(st):
+    """Build a signature dict from an os.stat_result."""
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "inode": st.st_ino,
+        "ctime_ns": st.st_ctime_ns,
+    }
+
+def entry_hash(entry):
+    """Return the SHA-256 stored in a baseline entry (old entries are plain strings)."""
+    if isinstance(entry, dict):
+        return entry.get("sha256")
+    return entry
+
+def signature_matches(entry, signature):
+    """Check whether a baseline entry was recorded for the same stat tuple."""
+    if not isinstance(entry, dict):
+        return False
+    return all(entry.get(key) == signature[key] for key in STAT_FIELDS)
+
+def resolve_scan_mode(mode=None):
+    """Pick the scan mode for this run, forcing a full re-hash every N runs when paranoid."""
+    global scan_runs
+    scan_runs += 1
+    mode = mode or SCAN_MODE
+    if mode == "incremental" and PARANOID_EVERY_N_RUNS and scan_runs % PARANOID_EVERY_N_RUNS == 0:
+        fim_logger.info(f"INFO | Paranoid scan #{scan_runs}: forcing a full re-hash")
+        return "full"
+    return mode
+
+def iter_sorted_files(directory, relative_dir="", critical=None, start_after=None):
+    """Yield (relative_path, file_path, signature) for critical files in path order.
+
+    Directories sort as "name/" so the walk order matches a plain string sort of
+    the relative paths, which is the order the baseline store iterates in.
+    `critical` defaults to the policy of the root that contains the directory;
+    `start_after` skips every path up to a resume point (whole subtrees included).
+    """
+    if critical is None:
+        critical = root_registry.for_path(directory).is_critical
+    try:
+        with os.scandir(directory) as it:
+            entries = [(entry.name + os.sep if entry.is_dir(follow_symlinks=False) else entry.name, entry) for entry in it]
+    except OSError as e:
+        fim_logger.error(f"ERROR | Cannot list {directory} | {e}")
+        return
+
+    for key, entry in sorted(entries, key=lambda item: item[0]):
+        relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+        if start_after is not None:
+            subtree = relative_path + os.sep
+            if key.endswith(os.sep) and subtree < start_after and not start_after.startswith(subtree):
+                continue  # The whole folder sorts before the resume point
+            if not key.endswith(os.sep) and relative_path <= start_after:
+                continue
+        if key.endswith(os.sep):
+            yield from iter_sorted_files(entry.path, relative_path, critical, start_after)
+        elif critical(entry.path):
+            try:
+                if entry.is_file():
+                    yield relative_path, entry.path, stat_signature(entry.stat())
+            except OSError as e:
+                fim_logger.error(f"ERROR | Cannot stat {entry.path} | {e}")
+
+def merge_join(live_files, baseline_items):
+    """Join two path-ordered streams, yielding (relative_path, live_item, baseline_entry)."""
+    live_files = iter(live_files)
+    baseline_items = iter(baseline_items)
+    live = next(live_files, None)
+    base = next(baseline_items, None)
+
+    while live is not None or base is not None:
+        if base is None or (live is not None and live[0] < base[0]):
+            yield live[0], live, None
+            live = next(live_files, None)
+        elif live is None or base[0] < live[0]:
+            yield base[0], None, base[1]
+            base = next(baseline_items, None)
+        else:
+            yield live[0], live, base[1]
+            live = next(live_files, None)
+            base = next(baseline_items, None)
+
+def iter_scan(directory, store, mode="incremental"):
+    """Stream (relative_path, baseline_entry, current_entry) for every path in the tree or baseline.
+
+    Files whose stat tuple is unchanged reuse the stored hash; the rest are hashed
+    in bounded windows so memory stays flat regardless of tree size.
+    """
+    report = {"mode": mode, "scanned": 0, "stat_skipped": 0, "rehashed": 0}
+    started = time.monotonic()
+    pending = []  # (relative_path, previous, current) in path order
+    to_hash = {}  # file_path -> current entry still missing its hash
+
+    def flush():
+        for file_path, file_hash in hash_files(to_hash):
+            to_hash[file_path]["sha256"] = file_hash
+            report["rehashed"] += 1
+        to_hash.clear()
+        yield from pending
+        pending.clear()
+
+    for relative_path, live, previous in merge_join(iter_sorted_files(directory), store.items()):
+        if live is None:
+            pending.append((relative_path, previous, None))
+        else:
+            _, file_path, signature = live
+            report["scanned"] += 1
+            if mode == "incremental" and signature_matches(previous, signature):
+                current = dict(signature, sha256=entry_hash(previous))
+                report["stat_skipped"] += 1
+            elif signature["size"] == 0:
+                fim_logger.warning(f"WARNING | File is empty: {file_path}")
+                current = dict(signature, sha256=None)  # Skip empty files
+            else:
+                current = signature
+                to_hash[file_path] = current
+            pending.append((relative_path, previous, current))
+
+        if len(pending) >= SCAN_HASH_WINDOW:
+            yield from flush()
+    yield from flush()
+
+    report["duration"] = round(time.monotonic() - started, 3)
+    scan_seconds.observe(time.monotonic() - started, mode)
+    scan_files.inc("stat_skipped", report["stat_skipped"])
+    scan_files.inc("rehashed", report["rehashed"])
+    last_scan_report.clear()
+    last_scan_report.update(report)
+    fim_logger.info(
+        f"INFO | Scan report ({report['mode']}): {report['scanned']} files, "
+        f"{report['stat_skipped']} stat-skipped, {report['rehashed']} re-hashed in {report['duration']}s"
+    )
 
-def create_baseline(directory):
+def iter_diff(directory, store, mode="incremental"):
+    """Stream ("added" | "deleted" | "modified", relative_path, baseline_entry, current_entry) records."""
+    for relative_path, previous, current in iter_scan(directory, store, mode):
+        if previous is None:
+            yield "added", relative_path, None, current
+        elif current is None:
+            yield "deleted", relative_path, previous, None
+        elif entry_hash(previous) != current["sha256"]:
+            yield "modified", relative_path, previous, current
+
+def scan_directory(directory, baseline, mode="incremental"):
+    """Return {relative_path: entry} for the live tree, reusing hashes from the baseline store."""
+    return {
+        relative_path: current
+        for relative_path, _, current in iter_scan(directory, baseline, mode)
+        if current is not None
+    }
+
+def create_baseline(directory, mode=None):
     """Create a baseline containing only critical files."""
-    baseline = {}
-    for root, _, files in os.walk(directory):
-        for file in files:
-            file_path = os.path.join(root, file)
-            if is_critical(file_path):
-                relative_path = os.path.relpath(file_path, directory)
-                file_hash = calculate_sha256(file_path)  # Ensure hash is calculated
-
-                if file_hash:  # Only add the file if it has a valid hash
-                    baseline[relative_path] = file_hash
-                else:
-                    fim_logger.warning(f"Skipping file with invalid hash: {file_path}")
+    store = root_registry.for_path(directory).open_baseline()
+    try:
+        current_files = scan_directory(directory, store, resolve_scan_mode(mode))
+
+        baseline = {}
+        for relative_path, entry in current_files.items():
+            if entry["sha256"]:  # Only add the file if it has a valid hash
+                baseline[relative_path] = entry
+            else:
+                fim_logger.warning(f"Skipping file with invalid hash: {os.path.join(directory, relative_path)}")
 
-    with open(BASELINE_FILE, "w") as f:
-        json.dump(baseline, f, indent=4)
+        stale_paths = [path for path in store.paths() if path not in baseline]
+        store.update(baseline, stale_paths)
+    finally:
+        store.close()
 
     fim_logger.info("INFO | Baseline created successfully.")
 
 
 
-def load_baseline():
-    """Load the existing baseline from JSON."""
-    if os.path.exists(BASELINE_FILE):
-        with open(BASELINE_FILE, "r") as f:
-            return json.load(f)
-    return {}
+def load_baseline(directory=MONITOR_DIR):
+    """Load the existing baseline into a dict (prefer open_baseline_store for large trees)."""
+    store = root_registry.for_path(directory).open_baseline()
+    try:
+        return dict(store.items())
+    finally:
+        store.close()
 
-def update_baseline(user_role):
-    """Update baseline when admin makes changes."""
+def baseline_exists(directory=MONITOR_DIR):
+    """Check whether a baseline has been recorded."""
+    store = root_registry.for_path(directory).open_baseline()
+    try:
+        return store.exists()
+    finally:
+        store.close()
+
+def refresh_baseline_paths(directory, paths):
+    """Re-hash only the given paths (files, or folders and everything below them) into the baseline.
+
+    Unchanged stat tuples keep their stored hash; vanished paths are dropped. All changes
+    land in one atomic store update. Returns {"updated": n, "removed": n, "generation": n}.
+    """
+    root = root_registry.for_path(directory)
+    upserts, deletes, to_hash = {}, [], {}
+    store = root.open_baseline()
+    try:
+        for path in sorted(set(paths)):
+            file_path = os.path.normpath(os.path.join(directory, path))
+            relative_path = os.path.relpath(file_path, directory)
+            if relative_path == os.curdir or relative_path.split(os.sep)[0] == os.pardir:
+                fim_logger.warning(f"WARNING | Skipping baseline update outside {directory}: {path}")
+                continue
+
+            if os.path.isdir(file_path):
+                live_files = iter_sorted_files(file_path, relative_path, root.is_critical)
+            elif os.path.isfile(file_path) and root.is_critical(file_path):
+                live_files = [(relative_path, file_path, file_signature(file_path))]
+            else:
+                live_files = []
+
+            for joined_path, live, previous in merge_join(live_files, store.items_under(relative_path)):
+                signature = live[2] if live else None
+                if live is None or signature["size"] == 0:
+                    if previous is not None:
+                        deletes.append(joined_path)  # Gone, or emptied (empty files are never baselined)
+                elif signature_matches(previous, signature):
+                    continue
+                else:
+                    to_hash[live[1]] = (joined_path, signature)
+
+        for file_path, file_hash in hash_files(to_hash):
+            joined_path, signature = to_hash[file_path]
+            if file_hash:
+                upserts[joined_path] = dict(signature, sha256=file_hash)
+            else:
+                fim_logger.warning(f"Skipping file with invalid hash: {file_path}")
+        store.update(upserts, deletes)
+        generation = store.get_generation()
+    finally:
+        store.close()
+    return {"updated": len(upserts), "removed": len(deletes), "generation": generation}
+
+def update_baseline(user_role, paths=None, directory=MONITOR_DIR):
+    """Update baseline when admin makes changes.
+
+    With `paths` (relative to the root) only those files and folders are re-hashed;
+    without them the whole baseline is rebuilt.
+    """
     if user_role == "admin":
         fim_logger.info("🛠 Admin is updating the baseline...")
-        create_baseline(MONITOR_DIR)
-
-        # 🚨 **Force reload baseline after update**
-        global baseline
-        baseline = load_baseline()
+        if paths is None:
+            create_baseline(directory)
+        else:
+            result = refresh_baseline_paths(directory, paths)
+            fim_logger.info(
+                f"INFO | Baseline generation {result['generation']}: "
+                f"{result['updated']} updated, {result['removed']} removed"
+            )
 
         fim_logger.info("✅ Baseline updated successfully by admin.")
 
-def compare_with_baseline(directory, recipients):
+def compare_with_baseline(directory, recipients, mode=None):
     """Compare current state with baseline and send email alerts if discrepancies are found."""
-    baseline = load_baseline()
-    current_files = {}
-
-    for root, _, files in os.walk(directory):
-        for file in files:
-            file_path = os.path.join(root, file)
-            relative_path = os.path.relpath(file_path, directory)
+    added_files = set()
+    deleted_files = set()
+    modified_files = []
+    changes = {"added": added_files.add, "deleted": deleted_files.add, "modified": modified_files.append}
 
-            if is_critical(file_path):
-                current_files[relative_path] = calculate_sha256(file_path)
-
-    added_files = set(current_files.keys()) - set(baseline.keys())
-    deleted_files = set(baseline.keys()) - set(current_files.keys())
-    modified_files = [f for f in current_files if f in baseline and baseline[f] != current_files[f]]
+    root = root_registry.for_path(directory)
+    store = root.open_baseline()
+    try:
+        # Streaming merge-join: neither the tree nor the baseline is held in memory
+        for change, relative_path, _, _ in iter_diff(directory, store, resolve_scan_mode(mode)):
+            changes[change](relative_path)
+    finally:
+        store.close()
 
     # 🚨 **Detect unauthorized files that should NOT be in monitored directories**
-    unauthorized_files = [f for f in added_files if not is_critical(os.path.join(directory, f))]
+    unauthorized_files = [f for f in added_files if not root.is_critical(os.path.join(directory, f))]
 
     # Check if there are discrepancies to alert
     if added_files or deleted_files or modified_files or unauthorized_files:
         fim_logger.warning("🚨 Baseline mismatch detected!")
 
         # Accumulate changes for batch email alert if the threshold is exceeded
-        email_batch[recipients].append({
-            "added": list(added_files),
-            "deleted": list(deleted_files),
-            "modified": list(modified_files),
-            "unauthorized": list(unauthorized_files)
-        })
-
-        # If batch reaches the threshold, send the email and reset the batch
-        if len(email_batch[recipients]) >= ALERT_THRESHOLD:
+        window = email_batch.window(recipients)
+        window.record(added=added_files, deleted=deleted_files, modified=modified_files, unauthorized=unauthorized_files)
+
+        # If batch reaches the threshold, send the email (which resets the batch)
+        if window.rounds >= ALERT_THRESHOLD:
             fim_logger.info(f"Sending batch email alert for {recipients}")
             send_batch_email_alert(recipients)
-            email_batch[recipients] = []  # Reset batch after sending
 
     return added_files, deleted_files, modified_files, unauthorized_files
 
 def send_batch_email_alert(recipients):
-    """Send a batch email alert to admins."""
-    all_added_files = []
-    all_deleted_files = []
-    all_modified_files = []
-    all_unauthorized_files = []
-
-    for alert in email_batch[recipients]:
-        all_added_files.extend(alert['added'])
-        all_deleted_files.extend(alert['deleted'])
-        all_modified_files.extend(alert['modified'])
-        all_unauthorized_files.extend(alert['unauthorized'])
+    """Send a batch email alert to admins and roll the batch over."""
+    window = email_batch.pop(recipients)
+    if window is None:
+        return
+    changes = window.rollover()
+    alert_batches.inc()
 
     send_critical_alert(
         recipients=recipients,
-        added_files=all_added_files,
-        deleted_files=all_deleted_files,
-        modified_files=all_modified_files,
-        unauthorized_files=all_unauthorized_files
+        added_files=alert_paths(changes, "added"),
+        deleted_files=alert_paths(changes, "deleted"),
+        modified_files=alert_paths(changes, "modified"),
+        unauthorized_files=alert_paths(changes, "unauthorized")
     )
     fim_logger.info(f"Batch email sent to {recipients}")
 
-def create_backup(file_path):
-    """Create a backup of a file."""
+def create_backup(file_path, directory=MONITOR_DIR, file_hash=None):
+    """Create a backup of a file (content-addressed, so unchanged files cost nothing)."""
     if not os.path.exists(file_path):
         fim_logger.warning(f"WARNING | File not found, cannot back up: {file_path}")
         return
 
-    os.makedirs(BACKUP_DIR, exist_ok=True)
-    timestamp = time.strftime('%Y-%m-%d_%H-%M-%S')
-    backup_name = f"{os.path.basename(file_path)}_{timestamp}"
-    backup_path = os.path.join(BACKUP_DIR, backup_name)
-    shutil.copy2(file_path, backup_path)
-    fim_logger.info(f"INFO | Backup created for: {file_path}")
+    relative_path = os.path.relpath(file_path, directory)
+    record, created = root_registry.for_path(directory).backups().backup(file_path, relative_path, file_hash)
+    if record is None:
+        fim_logger.error(f"ERROR | Backup failed for: {file_path}")
+    elif created:
+        fim_logger.info(f"INFO | Backup created for: {file_path} (version {record['version']})")
+    return record
+
+def restore_backup(backup_name, user_role, version=None):
+    """Restore a file from backup (Admins only).
 
-def restore_backup(backup_name, user_role):
-    """Restore a file from backup (Admins only)."""
+    backup_name is the file's path relative to MONITOR_DIR (latest version unless
+    one is given); old "<name>_<timestamp>" copies in BACKUP_DIR are still accepted.
+    """
     if user_role != "admin":
         fim_logger.warning("WARNING | Unauthorized restore attempt.")
         return "Permission denied"
 
+    record = get_backup_store().restore(backup_name, os.path.join(MONITOR_DIR, backup_name), version)
+    if record:
+        fim_logger.info(f"INFO | File restored from backup: {backup_name} (version {record['version']})")
+        return "File restored successfully"
+
     backup_path = os.path.join(BACKUP_DIR, backup_name)
-    if os.path.exists(backup_path):
-        original_name = "_".join(backup_name.split("_")[:-1])  # Extract original name without timestamp
+    if os.path.isfile(backup_path):
+        original_name = backup_name.rsplit("_", 2)[0]  # Extract original name without timestamp
         original_path = os.path.join(MONITOR_DIR, original_name)
         shutil.copy2(backup_path, original_path)
         fim_logger.info(f"INFO | File restored from backup: {backup_name}")
@@ -178,39 +396,96 @@ def restore_backup(backup_name, user_role):
         fim_logger.error(f"ERROR | Backup file {backup_name} not found.")
         return "Backup file not found."
 
-def start_fim_monitor(directory, user_role, username):
-    """Start monitoring files with Watchdog and create backups for all critical files."""
-    fim_logger.info(f"INFO | Starting FIM monitoring on: {directory}")
+def ingest_directory(directory):
+    """Back up all critical files and record the baseline, reading each file at most once.
+
+    Files whose stat tuple matches the baseline reuse the stored hash and are not
+    read at all if the backup store already has that content. Everything else is
+    read once by the backup store, and the same hash seeds the baseline when none
+    exists yet (an existing baseline is only refreshed for unchanged content).
+    """
+    reads_before = dict(io_counters)
+    started = time.monotonic()
+    report = {"files": 0, "bytes": 0, "read": 0, "stat_skipped": 0}
+    root = root_registry.for_path(directory)
+    backups = root.backups()
+    store = root.open_baseline()
+    writer = root.open_baseline()  # Batches are committed on their own connection, never under the open items() walk
+    try:
+        creating = not store.exists()
+        upserts = {}
+        for relative_path, live, previous in merge_join(iter_sorted_files(directory), store.items()):
+            if live is None:
+                continue
+            _, file_path, signature = live
+            report["files"] += 1
+            report["bytes"] += signature["size"]
+
+            try:
+                if signature_matches(previous, signature):
+                    report["stat_skipped"] += 1
+                    backups.backup(file_path, relative_path, entry_hash(previous))
+                    continue
+
+                record, _, file_hash = backups.ingest(file_path, relative_path)
+                report["read"] += 1
+            except OSError as e:
+                fim_logger.error(f"ERROR | Backup failed for: {file_path} | {e}")
+                continue
+
+            if signature["size"] == 0:
+                continue  # Empty files are backed up but never baselined
+            if creating or entry_hash(previous) == file_hash:
+                upserts[relative_path] = dict(signature, sha256=file_hash)
+                if len(upserts) >= SCAN_HASH_WINDOW:
+                    writer.update(upserts)
+                    upserts = {}
+        writer.update(upserts)
+    finally:
+        store.close()
+        writer.close()
+
+    scan_seconds.observe(time.monotonic() - started, "ingest")
+    bytes_read = report["bytes_read"] = io_counters["bytes_read"] - reads_before["bytes_read"]
+    fim_logger.info(
+        f"INFO | Ingest of {directory}: {report['files']} critical files ({report['bytes']} bytes), "
+        f"{report['read']} read once, {report['stat_skipped']} stat-skipped, "
+        f"{bytes_read} bytes read ({bytes_read / report['bytes'] if report['bytes'] else 0:.2f}x the tree)"
+    )
+    return report
 
-    # Create backups for all critical files before starting monitoring
-    for root, _, files in os.walk(directory):
-        for file in files:
-            file_path = os.path.join(root, file)
-            if is_critical(file_path):
-                create_backup(file_path)  # Create backup for each critical file
+def subscribe(directory, user_role, username, reuse=False):
+    """Add a monitoring reference for a user on the root's observer (atomic, see MonitorService.acquire).
 
-    # Create baseline if it does not exist
-    if not os.path.exists(BASELINE_FILE):
-        create_baseline(directory)
+    Returns (references, new), `new` being True if this call created the subscription.
+    """
+    root = root_registry.for_path(directory)
+    handler_class = get_fim_handler()
+    created = []
 
-    # Avoid duplicate monitoring for the same user
-    if username in user_fim_handlers:
-        fim_logger.warning(f"WARNING | FIM monitoring already running for {username}")
-        return
+    def make_handler():
+        created.append(True)
+        return handler_class(user_role, username, root)
 
-    # Create the correct handler for each role
-    fim_handler = get_fim_handler()(user_role, username)  # Use the function to get FIMHandler
+    references = root.service.acquire(directory, username, make_handler, lambda: handler_class.watcher(root), reuse)
+    return references, bool(created)
 
-    # Ensure the observer is created with the correct handler
-    observer = Observer()
-    observer.schedule(fim_handler, directory, recursive=True)
-    observer.start()
-
-    # Keep track of the observer for each user
-    user_fim_handlers[username] = observer
+def start_fim_monitor(directory, user_role, username, reuse=False):
+    """Subscribe a user to the root's observer; a new subscription then backs up every critical file."""
+    fim_logger.info(f"INFO | Starting FIM monitoring on: {directory}")
 
-    try:
-        observer.join()
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
+    # One watch per directory, reference-counted per user (reuse=True: at most one reference)
+    references, new = subscribe(directory, user_role, username, reuse)
+    if new:
+        # Back up every critical file and create the baseline (if missing) in one read per file
+        ingest_directory(directory)
+    elif references > 1:
+        fim_logger.warning(f"WARNING | FIM monitoring already running for {username} ({references} references)")
+    return references
+
+def stop_fim_monitor(username, directory=MONITOR_DIR):
+    """Drop one monitoring reference for a user; returns the remaining count (None if not monitoring)."""
+    remaining = root_registry.for_path(directory).service.release(username)
+    if remaining == 0:
+        fim_logger.info(f"INFO | Stopped FIM monitoring for {username}")
+    return remaining
@@ -1,29 +1,23 @@
 # fim_utils.py
-import os
-import hashlib
 import logging
+from website.policy import default_policy
+from website.log_store import LOG_FILE, ArchivingFileHandler, BatchingLogWriter, BoundedQueueHandler
 
 # Logging Setup
 fim_logger = logging.getLogger("FIMLogger")
 fim_logger.setLevel(logging.INFO)
-file_handler = logging.FileHandler("fim.log")
+file_handler = ArchivingFileHandler(LOG_FILE)  # Rotates into fim.log.<n>.gz archives
 formatter = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
 file_handler.setFormatter(formatter)
-fim_logger.addHandler(file_handler)
+log_writer = BatchingLogWriter(file_handler)  # Writes fim.log from one background thread
+fim_logger.addHandler(BoundedQueueHandler(log_writer.queue))  # Log calls never touch the file
+fim_logger.propagate = False  # Not also to the root logger's handlers (stderr), which write on the calling thread
 
 def calculate_sha256(file_path):
-    """Compute SHA-256 hash of a file."""
-    try:
-        with open(file_path, "rb") as f:
-            sha256 = hashlib.sha256()
-            while chunk := f.read(4096):
-                sha256.update(chunk)
-            return sha256.hexdigest()
-    except Exception as e:
-        fim_logger.error(f"Hashing failed for {file_path} | {e}")
-        return None
+    """Compute SHA-256 hash of a file (the hash engine picks the read strategy by size)."""
+    from website.hash_engine import hash_file  # hash_engine imports fim_logger from here
+    return hash_file(file_path)
 
 def is_critical(file_path):
-    """Check if a file is critical based on its extension."""
-    CRITICAL_EXTENSIONS = ['.conf', '.xml', '.json', '.dll']
-    return os.path.splitext(file_path)[1] in CRITICAL_EXTENSIONS
+    """Check if a file is critical according to the monitoring policy (cached per path)."""
+    return default_policy.is_critical(file_path)
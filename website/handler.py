@@ -1,66 +1,577 @@
 from watchdog.events import FileSystemEventHandler, FileSystemEvent
-from website.fim_utils import fim_logger, is_critical
+from website.fim_utils import fim_logger
 from website.send_email import send_critical_alert  # Assuming send_critical_alert is already defined
-from website.models import User  # Assuming you have a User model with a 'role' field in your ORM
 from website import db  # Assuming 'db' is the SQLAlchemy instance
+from website.dir_cache import directory_cache
+from website.recipients import admin_recipients
+from website.accumulator import ChangeWindow, alert_paths
+from website.event_store import get_event_store, make_event
+from website.roots import root_registry
+from website.hash_engine import hash_file
+from website.fim_monitor import update_baseline
+from website.metrics import registry, BATCH_BUCKETS
 
 import os
 import time
+import queue
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict, namedtuple
 
-MONITOR_DIR = "Monitor"  # Directory to monitor
+
+# Event pipeline settings
+DEBOUNCE_SECONDS = 0.5  # Quiet period before a path's coalesced event is released
+MAX_DELAY_SECONDS = 5.0  # Upper bound on how long a busy path can be held back
+MAX_BATCH_SIZE = 500  # Coalesced events handed to a consumer per call
+UNKNOWN_ACTOR = "unknown"  # Shown for changes no user made through the app (seen only by the watcher)
+CLAIM_SECONDS = 5.0  # How long a bulk operation's own watcher events are waited for and dropped
+EXPANDED_EVENT_TYPES = ("deleted", "moved")  # Folder events expanded into one record per baselined file
+RECENT_RECORDS = 4096  # Per-file deletes/moves remembered so a folder expansion and the watcher don't both record them
+RECENT_SECONDS = 10.0
+TEMP_SUFFIXES = ("~", ".swp", ".swx", ".swpx", ".tmp", ".temp", ".part", ".crdownload", ".bak")
+TEMP_PREFIXES = (".#", "~$", ".goutputstream-")
+TEMP_NAMES = ("4913",)  # vim's write-permission probe
+
+# Event metrics (counted on the pipeline thread, never on the observer's)
+events_received = registry.counter("fim_events_received_total", "Raw file system events taken off the queue, by type", "type")
+events_coalesced = registry.counter("fim_events_coalesced_total", "Events released to handlers after coalescing, by type", "type")
+event_records = registry.counter("fim_event_records_total", "Integrity records written to the event store")
+batch_seconds = registry.histogram("fim_event_batch_seconds", "Time to record one coalesced batch", BATCH_BUCKETS)
+
+# A watchdog-compatible record for one path after coalescing
+CoalescedEvent = namedtuple("CoalescedEvent", "event_type src_path dest_path is_directory count")
+
+
+def is_temp_file(path):
+    """Check whether a path looks like an editor/download temp file."""
+    name = os.path.basename(path)
+    return name in TEMP_NAMES or name.endswith(TEMP_SUFFIXES) or name.startswith(TEMP_PREFIXES)
+
+
+def is_ignored_temp_file(path):
+    """Temp files are coalesced away, unless the policy calls them critical (e.g. "~$evil.dll")."""
+    return is_temp_file(path) and not root_registry.for_path(path).is_critical(path)
+
+
+def needs_baseline(event, root):
+    """Whether handling an event reads the baseline (critical files, or folders that may hold some)."""
+    if event.is_directory:
+        return event.event_type in EXPANDED_EVENT_TYPES
+    dest_path = getattr(event, "dest_path", "")
+    return root.is_critical(event.src_path) or bool(dest_path and root.is_critical(dest_path))
+
+
+def merge_event_types(previous, new):
+    """Fold a new event type into a path's pending type; None means the path nets out to nothing."""
+    if previous is None:
+        return new
+    if new == "deleted":
+        return None if previous == "created" else "deleted"
+    if new == "created":
+        return "modified" if previous == "deleted" else previous
+    if previous == "deleted":  # modified after delete means it came back
+        return "modified"
+    return previous  # created/modified/moved absorb later modifications
+
+
+def acting_consumer(current, new):
+    """Which of two consumers a path's coalesced event is recorded by.
+
+    A handler with a known user (an operation made through the app) wins over the
+    watcher's; between two users the non-admin wins, so an admin's edit never makes
+    someone else's change to the same path look authorized.
+    """
+    if new is current or new.username is None:
+        return current
+    if current.username is None or (current.user_role == "admin" and new.user_role != "admin"):
+        return new
+    return current
+
+
+class EventPipeline:
+    """Queue raw watchdog events, coalesce them per path and hand batches to consumers.
+
+    Observer threads only append to a queue; coalescing, logging, DB lookups and
+    email all happen on the pipeline's own worker thread. Each path is recorded once,
+    by the handler of the user who changed it if known (see acting_consumer).
+    """
+
+    def __init__(self, debounce=None, max_delay=None, max_batch=None):
+        self.debounce = debounce if debounce is not None else DEBOUNCE_SECONDS
+        self.max_delay = max_delay if max_delay is not None else MAX_DELAY_SECONDS
+        self.max_batch = max_batch or MAX_BATCH_SIZE
+        self.queue = queue.SimpleQueue()
+        self.pending = {}  # path -> [event_type, src_path, is_directory, count, first_seen, last_seen, consumer]
+        self.claims = {}  # path -> (consumer, event_type, since, deadline) for changes reported in bulk
+        self.operations = {}  # folder -> (consumer, deadline or None while running) for users' folder deletes/renames
+        self.last_event = None  # An event queued for several consumers has its side effects run once
+        self.recent = OrderedDict()  # (event_type, src_path) -> (seen, expanded) for per-file deletes/moves
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, consumer, event):
+        """Enqueue a raw event for a consumer (never blocks)."""
+        if self.thread is None:
+            self.start()
+        self.queue.put((time.monotonic(), consumer, event))
+
+    def claim(self, consumer, changes, since, seconds=None):
+        """Drop the watcher's copies of changes a consumer already reported in bulk.
+
+        `changes` holds the exact (event_type, path) pairs an operation made, `path` being
+        the destination of a move. Each claim drops at most one coalesced event of that
+        type first seen after `since`, and expires after CLAIM_SECONDS.
+        """
+        now = time.monotonic()
+        deadline = now + (seconds if seconds is not None else CLAIM_SECONDS)
+        with self.lock:
+            if len(self.claims) > 1024:
+                self.claims = {path: claim for path, claim in self.claims.items() if claim[3] > now}
+            for event_type, path in changes:
+                self.claims[os.path.abspath(path)] = (consumer, event_type, since, deadline)
+
+    def begin_operation(self, consumer, folder):
+        """Attribute the watcher's events under a folder to the user deleting or renaming it."""
+        with self.lock:
+            self.operations[os.path.abspath(folder)] = (consumer, None)
+
+    def end_operation(self, folder, seconds=None):
+        """Stop attributing after CLAIM_SECONDS (the watcher's last events are still on their way)."""
+        deadline = time.monotonic() + (seconds if seconds is not None else CLAIM_SECONDS)
+        with self.lock:
+            operation = self.operations.get(os.path.abspath(folder))
+            if operation is not None:
+                self.operations[os.path.abspath(folder)] = (operation[0], deadline)
+
+    def operator(self, consumer, event, seen):
+        """The user whose folder operation a watcher event falls under (`consumer` if none)."""
+        if not self.operations or consumer.username is not None:
+            return consumer
+        paths = [path for path in (event.src_path, getattr(event, "dest_path", "")) if path]
+        with self.lock:
+            for folder, (user, deadline) in list(self.operations.items()):
+                if deadline is not None and seen > deadline:
+                    del self.operations[folder]
+                elif any(path == folder or path.startswith(folder + os.sep) for path in paths):
+                    return user
+        return consumer
+
+    def take_claim(self, consumer, path, event_type, first_seen, now):
+        """Whether a coalesced event was claimed (the claim is used up if so).
+
+        Only the watcher's copy or the claiming consumer's own event matches; a change
+        another user made through the app is always recorded.
+        """
+        if not self.claims:
+            return False
+        with self.lock:
+            claim = self.claims.get(path)
+            if claim is None or (consumer is not claim[0] and consumer.username is not None):
+                return False
+            if claim[1] != event_type or first_seen < claim[2] or now > claim[3]:
+                return False
+            del self.claims[path]
+        return True
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="fim-event-pipeline", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._coalesce(*self.queue.get(timeout=self._wait_time()))
+                while True:  # Drain everything already queued before checking deadlines
+                    self._coalesce(*self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            self._flush(time.monotonic())
+
+    def _wait_time(self):
+        if not self.pending:
+            return None
+        now = time.monotonic()
+        deadlines = [min(p[5] + self.debounce, p[4] + self.max_delay) for p in self.pending.values()]
+        return max(0.0, min(deadlines) - now)
+
+    def _coalesce(self, seen, consumer, event):
+        if event is not self.last_event:
+            self.last_event = event
+            events_received.inc(event.event_type)
+            # Listings are cheap to drop, so stale folders are invalidated before the debounce
+            directory_cache.invalidate(event.src_path, event.is_directory)
+            if getattr(event, "dest_path", ""):
+                directory_cache.invalidate(event.dest_path, event.is_directory)
+        if event.event_type in ("opened", "closed", "closed_no_write"):
+            return
+        consumer = self.operator(consumer, event, seen)
+
+        if event.event_type != "moved":
+            self._apply(consumer, event.src_path, event.event_type, event.src_path, event.is_directory, seen)
+            return
+
+        if is_ignored_temp_file(event.dest_path):
+            # Backup-style save (file -> file~): the real path is gone until it is recreated
+            self._apply(consumer, event.src_path, "deleted", event.src_path, event.is_directory, seen)
+            return
+        source = self.pending.pop(event.src_path, None)
+        if is_ignored_temp_file(event.src_path):
+            # Atomic save: temp file renamed over the real one
+            self._apply(consumer, event.dest_path, "modified", event.dest_path, event.is_directory, seen)
+            return
+
+        target = self.pending.get(event.dest_path)
+        if source is None and target is not None and target[0] == "moved" and target[1] == event.src_path:
+            # The same move reported again (by the watcher and by the handler of the user who made it)
+            target[5] = seen
+            target[6] = acting_consumer(target[6], consumer)
+            return
+
+        moved = ["moved", event.src_path, event.is_directory, 1, seen, seen, consumer]
+        if source is not None:
+            # The source's pending change travels with it
+            if source[0] == "created":
+                moved[0], moved[1] = "created", event.dest_path  # Created and renamed inside one window
+            elif source[0] == "moved":
+                moved[1] = source[1]  # Renamed twice: one move from the original path
+            self._absorb(moved, source)
+        target = self.pending.pop(event.dest_path, None)
+        if target is not None:
+            # The moved file replaces whatever was pending at the destination
+            if target[0] == "moved":
+                self._apply(target[6], target[1], "deleted", target[1], target[2], seen)  # Its source is still gone
+            self._absorb(moved, target)
+        if moved[0] == "moved" and moved[1] == event.dest_path:
+            moved[0] = "modified"  # Renamed back to its original path
+        elif moved[0] == "created" and target is not None and target[0] in ("deleted", "modified"):
+            moved[0] = "modified"  # A new file over a baselined one
+        self.pending[event.dest_path] = moved
+
+    @staticmethod
+    def _absorb(state, other):
+        """Fold another path's pending state (count, first sighting, actor) into `state`."""
+        state[3] += other[3]
+        state[4] = min(state[4], other[4])
+        state[6] = acting_consumer(other[6], state[6])
+
+    def _apply(self, consumer, path, event_type, src_path, is_directory, seen):
+        current = self.pending.get(path)
+        if current is None:
+            self.pending[path] = [event_type, src_path, is_directory, 1, seen, seen, consumer]
+            return
+
+        merged = merge_event_types(current[0], event_type)
+        if merged is None:
+            del self.pending[path]  # Created and deleted inside one window
+            return
+        current[0] = merged
+        current[3] += 1
+        current[5] = seen
+        current[6] = acting_consumer(current[6], consumer)
+
+    def _flush(self, now):
+        batches = {}
+        for path, (event_type, src_path, is_directory, count, first_seen, last_seen, consumer) in list(self.pending.items()):
+            if now - last_seen < self.debounce and now - first_seen < self.max_delay:
+                continue
+            del self.pending[path]
+            if is_ignored_temp_file(path):
+                continue  # Temp files never surface on their own
+            if self.take_claim(consumer, path, event_type, first_seen, now):
+                continue  # Already recorded by the consumer's bulk event
+            dest_path = path if event_type == "moved" else None
+            events_coalesced.inc(event_type)
+            batches.setdefault(consumer, []).append(
+                CoalescedEvent(event_type, src_path, dest_path, is_directory, count)
+            )
+
+        # Users' batches first: their folder expansions claim per-file records before the watcher's copies
+        for consumer, events in sorted(batches.items(), key=lambda batch: batch[0].username is None):
+            for start in range(0, len(events), self.max_batch):
+                try:
+                    consumer.handle_batch(events[start:start + self.max_batch])
+                except Exception as e:
+                    fim_logger.error(f"ERROR | FIM event batch failed for {consumer.actor} | {e}")
+
+
+event_pipeline = EventPipeline()  # Shared by every handler in the process
+registry.sampled("fim_event_queue_depth", "Raw events waiting for the pipeline thread", lambda: event_pipeline.queue.qsize())
+registry.sampled("fim_events_pending", "Paths held back by the debounce window", lambda: len(event_pipeline.pending))
 
 class FIMHandler(FileSystemEventHandler):
-    """Watchdog event handler to monitor file changes."""
-    def __init__(self, user_role, username):
+    """Watchdog event handler to monitor file changes.
+
+    A handler with a user records what that user does through the app; the watcher's
+    handler of a root (user_role and username None) records everything else.
+    """
+    def __init__(self, user_role, username, root=None):
         self.user_role = user_role
         self.username = username
-        self.added_files = []
-        self.deleted_files = []
-        self.modified_files = []
+        self.root = root or root_registry.default  # Monitored root whose policy and baseline apply
+        self.changes = ChangeWindow()  # Critical changes since the last alert (bounded)
+        self.recent = event_pipeline.recent  # Shared: each per-file delete/move is recorded by one handler
+
+    @classmethod
+    def watcher(cls, root=None):
+        """Handler for changes made outside the app (the actor is unknown)."""
+        return cls(None, None, root)
+
+    @property
+    def actor(self):
+        return f"{self.username} ({self.user_role})" if self.username is not None else UNKNOWN_ACTOR
 
     def get_admin_emails(self):
-        """Retrieve all admin email addresses from the database."""
-        # Query the database for all users with role 'admin'
-        admins = User.query.filter_by(role="admin").all()
-        return [admin.email for admin in admins]  # Return a list of admin emails
+        """Retrieve all admin email addresses (cached; safe without an app context)."""
+        return admin_recipients.admin_emails()
 
     def on_any_event(self, event):
-        """Handle file system events."""
+        """Queue a file system event; the pipeline coalesces it and calls handle_batch."""
         if not isinstance(event, FileSystemEvent):
             return
+        event_pipeline.submit(self, event)
+
+    @contextmanager
+    def operating_on(self, *folders):
+        """Record the watcher's events under these folders as this user's while the block runs.
+
+        A folder delete or rename is reported by the watcher file by file while it runs, well
+        before the operation's own folder event; those records belong to the user too.
+        """
+        for folder in folders:
+            event_pipeline.begin_operation(self, folder)
+        try:
+            yield
+        finally:
+            for folder in folders:
+                event_pipeline.end_operation(folder)
+
+    def handle_batch(self, events):
+        """Record a batch of coalesced events and send at most one alert for it."""
+        started = time.perf_counter()
+        # Baseline hashes are only looked up when the batch touches critical files or folders
+        baseline = self.root.open_baseline() if any(needs_baseline(event, self.root) for event in events) else None
+        try:
+            records = []
+            for event in events:
+                if not self.first_record(event, expanded=False):
+                    continue
+                records.append(self.process_event(event, baseline))
+                for child in self.expand_event(event, baseline):
+                    if self.first_record(child, expanded=True):
+                        records.append(self.process_event(child, baseline, rehash=False))
+            if baseline is not None and self.user_role == "admin":
+                self.rekey_baseline(events, baseline)
+        finally:
+            if baseline is not None:
+                baseline.close()
+
+        # The whole batch is one transaction in the event store
+        try:
+            get_event_store().append(records)
+            event_records.inc(amount=len(records))
+        except Exception as e:
+            fim_logger.error(f"ERROR | Event store write failed for {self.actor} | {e}")
+        batch_seconds.observe(time.perf_counter() - started)
+        if self.user_role == "admin":
+            self.refresh_baseline(events)
+
+        unauthorized = any(record["unauthorized"] for record in records)
+
+        # If it's a critical file access by non-admin, send the email alert
+        if unauthorized:
+            # Get the list of admin emails
+            admin_emails = self.get_admin_emails()
+
+            # Send the changes accumulated since the last alert, then start a new window
+            changes = self.changes.rollover()
+            send_critical_alert(
+                recipients=admin_emails,  # Get all admin emails dynamically
+                added_files=alert_paths(changes, "added"),
+                deleted_files=alert_paths(changes, "deleted"),
+                modified_files=alert_paths(changes, "modified")
+            )
+
+    def expand_event(self, event, baseline):
+        """Per-file events for the baselined files under a deleted or moved folder.
+
+        Comes from the baseline's prefix index rather than a walk of the disk (a deleted
+        folder is already gone, and a moved one holds exactly what the baseline recorded).
+        """
+        if baseline is None or not event.is_directory or event.event_type not in EXPANDED_EVENT_TYPES:
+            return
+        relative_folder = os.path.relpath(event.src_path, self.root.path)
+        for relative_path, _ in baseline.items_under(relative_folder):
+            src_path = os.path.join(self.root.path, relative_path)
+            dest_path = event.dest_path + relative_path[len(relative_folder):] if event.event_type == "moved" else None
+            yield CoalescedEvent(event.event_type, src_path, dest_path, False, 1)
+
+    def first_record(self, event, expanded):
+        """False if a per-file delete/move was already recorded by the other source (watcher vs folder expansion)."""
+        appeared = event.dest_path if event.event_type == "moved" else event.src_path if event.event_type == "created" else None
+        if appeared:
+            # The path exists again, so its next delete or move is a new change
+            self.recent.pop(("deleted", appeared), None)
+            self.recent.pop(("moved", appeared), None)
+        if event.is_directory or event.event_type not in EXPANDED_EVENT_TYPES:
+            return True
+        key = (event.event_type, event.src_path)
+        now = time.monotonic()
+        previous = self.recent.get(key)
+        if previous is not None and now - previous[0] < RECENT_SECONDS and previous[1] != expanded:
+            return False
+        self.recent[key] = (now, expanded)
+        self.recent.move_to_end(key)
+        while len(self.recent) > RECENT_RECORDS:
+            self.recent.popitem(last=False)
+        return True
+
+    def rekey_baseline(self, events, baseline):
+        """Follow an admin's renames in the baseline; entries keep their hashes, nothing is re-read."""
+        for event in events:
+            if event.event_type != "moved" or not event.dest_path:
+                continue
+            if not event.is_directory and not self.root.is_critical(event.dest_path):
+                continue  # Renamed out of monitoring: the next scan reports it as deleted
+            old_path = os.path.relpath(event.src_path, self.root.path)
+            new_path = os.path.relpath(event.dest_path, self.root.path)
+            moved = baseline.rename(old_path, new_path)
+            if moved:
+                fim_logger.info(f"INFO | Baseline re-keyed {old_path} -> {new_path} ({moved} entries)")
+
+    def claim_bulk_change(self, change, baseline, since):
+        """Keep the watcher's copies of one succeeded bulk item out of this handler's records.
+
+        `change` is the (event_type, src_path, dest_path, is_directory) item later passed to
+        handle_bulk and `since` when its operation started; a deleted or moved folder also
+        claims the baselined files under it.
+        """
+        event = CoalescedEvent(*change, 1)
+        changes = [(file_event.event_type, file_event.dest_path or file_event.src_path)
+                   for file_event in [event, *self.expand_event(event, baseline)]]
+        event_pipeline.claim(self, changes, since)
+
+    def refresh_baseline(self, events):
+        """Re-hash the files and folders an admin touched into the baseline (after their events are recorded)."""
+        paths = {
+            os.path.relpath(path, self.root.path)
+            for event in events
+            if not (event.is_directory and event.event_type == "modified")  # Only a listing changed
+            for path in (event.src_path, event.dest_path) if path
+        }
+        if not paths:
+            return
+        try:
+            update_baseline(self.user_role, sorted(paths), self.root.path)
+        except Exception as e:
+            fim_logger.error(f"ERROR | Baseline update failed for {self.actor} | {e}")
+
+    def handle_bulk(self, items, folder):
+        """Record a bulk file operation as one aggregated event and send at most one alert.
+
+        `items` holds (event_type, src_path, dest_path, is_directory) for each item that
+        succeeded; `folder` is the common folder the batch worked in.
+        """
+        events = [CoalescedEvent(event_type, src_path, dest_path, is_directory, 1)
+                  for event_type, src_path, dest_path, is_directory in items]
+        baseline = self.root.open_baseline() if any(needs_baseline(event, self.root) for event in events) else None
+        critical = False
+        try:
+            for event in events:
+                directory_cache.invalidate(event.src_path, event.is_directory)
+                if event.dest_path:
+                    directory_cache.invalidate(event.dest_path, event.is_directory)
+                # Files inside deleted or moved folders come from the baseline index
+                for file_event in [event, *self.expand_event(event, baseline)]:
+                    if file_event.event_type == "moved":
+                        kinds = [("deleted", file_event.src_path), ("added", file_event.dest_path)]
+                    else:
+                        kinds = [({"created": "added"}.get(file_event.event_type, file_event.event_type), file_event.src_path)]
+                    for kind, path in kinds:
+                        if not file_event.is_directory and self.root.is_critical(path):
+                            critical = True
+                            self.changes.add(kind, os.path.relpath(path, self.root.path))
+            if baseline is not None and self.user_role == "admin":
+                self.rekey_baseline(events, baseline)
+        finally:
+            if baseline is not None:
+                baseline.close()
+        unauthorized = critical and self.user_role != "admin"
+
+        relative_folder = os.path.relpath(folder, self.root.path)
+        fim_logger.info(f"INFO | {self.actor} ran a bulk operation of {len(items)} items in {relative_folder}")
+        if unauthorized:
+            fim_logger.warning(f"WARNING | Unauthorized bulk change of critical files by {self.actor}: {relative_folder}")
 
-        relative_path = os.path.relpath(event.src_path, MONITOR_DIR)
-        fim_logger.info(f"{time.strftime('%Y-%m-%d %H:%M:%S')} | INFO | {self.username} ({self.user_role}) triggered {event.event_type} on {relative_path}")
+        try:
+            get_event_store().append([make_event(
+                self.username, self.user_role, "bulk", relative_folder,
+                critical=critical, unauthorized=unauthorized, count=len(items), root=self.root.name,
+            )])
+        except Exception as e:
+            fim_logger.error(f"ERROR | Event store write failed for {self.actor} | {e}")
+        if self.user_role == "admin":
+            self.refresh_baseline(events)
+
+        if unauthorized:
+            changes = self.changes.rollover()
+            send_critical_alert(
+                recipients=self.get_admin_emails(),
+                added_files=alert_paths(changes, "added"),
+                deleted_files=alert_paths(changes, "deleted"),
+                modified_files=alert_paths(changes, "modified")
+            )
+
+    def process_event(self, event, baseline=None, rehash=True):
+        """Log one coalesced event and return its event-store record (rehash=False skips hashing the new content)."""
+        relative_path = os.path.relpath(event.src_path, self.root.path)
+        dest_path = getattr(event, "dest_path", "")
+        relative_dest = os.path.relpath(dest_path, self.root.path) if dest_path else None
+        critical = self.root.is_critical(event.src_path) or bool(dest_path and self.root.is_critical(dest_path))
+        unauthorized = critical and self.user_role != "admin"
+        fim_logger.info(f"INFO | {self.actor} triggered {event.event_type} on {relative_path}")
 
         # Handle added files
         if event.event_type == "created":
-            if is_critical(event.src_path):
-                self.added_files.append(relative_path)
-                fim_logger.info(f"{time.strftime('%Y-%m-%d %H:%M:%S')} | INFO | Critical file added: {relative_path}")
+            if critical:
+                self.changes.add("added", relative_path)
+                fim_logger.info(f"INFO | Critical file added: {relative_path}")
         
         # Handle deleted files
         elif event.event_type == "deleted":
-            if is_critical(event.src_path):
-                self.deleted_files.append(relative_path)
-                fim_logger.info(f"{time.strftime('%Y-%m-%d %H:%M:%S')} | INFO | Critical file deleted: {relative_path}")
+            if critical:
+                self.changes.add("deleted", relative_path)
+                fim_logger.info(f"INFO | Critical file deleted: {relative_path}")
         
         # Handle modified files
         elif event.event_type == "modified":
-            if is_critical(event.src_path):
-                self.modified_files.append(relative_path)
-                fim_logger.info(f"{time.strftime('%Y-%m-%d %H:%M:%S')} | INFO | Critical file modified: {relative_path}")
+            if critical:
+                self.changes.add("modified", relative_path)
+                fim_logger.info(f"INFO | Critical file modified: {relative_path}")
 
-        # If it's a critical file access by non-admin, send the email alert
-        if is_critical(event.src_path) and self.user_role != "admin":
-            fim_logger.warning(f"{time.strftime('%Y-%m-%d %H:%M:%S')} | WARNING | Unauthorized critical file {event.event_type} by {self.username}: {relative_path}")
+        # Handle moved/renamed files (the old path is gone, the new one appears)
+        elif event.event_type == "moved":
+            if critical and not event.is_directory:
+                self.changes.add("deleted", relative_path)
+                self.changes.add("added", relative_dest)
+                fim_logger.info(f"INFO | Critical file moved: {relative_path} -> {relative_dest}")
 
-            # Get the list of admin emails
-            admin_emails = self.get_admin_emails()
+        if unauthorized:
+            fim_logger.warning(f"WARNING | Unauthorized critical file {event.event_type} by {self.actor}: {relative_path}")
 
-            # Send email alert with the accumulated lists of modified, added, and deleted files
-            send_critical_alert(
-                recipients=admin_emails,  # Get all admin emails dynamically
-                added_files=self.added_files,
-                deleted_files=self.deleted_files,
-                modified_files=self.modified_files
-            )
+        sha256_before = sha256_after = None
+        if critical and not event.is_directory:
+            entry = baseline.get(relative_path) if baseline is not None else None
+            sha256_before = entry["sha256"] if entry else None
+            current_path = dest_path or event.src_path
+            if rehash and event.event_type != "deleted" and os.path.isfile(current_path):
+                sha256_after = hash_file(current_path)
+
+        return make_event(
+            self.username, self.user_role, event.event_type, relative_path,
+            dest_path=relative_dest,
+            critical=critical, unauthorized=unauthorized,
+            sha256_before=sha256_before, sha256_after=sha256_after,
+            count=getattr(event, "count", 1), root=self.root.name,
+        )
@@ -0,0 +1,177 @@
+# hash_engine.py
+import os
+import mmap
+import time
+import atexit
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from website.fim_utils import fim_logger
+from website.metrics import registry, HASH_BUCKETS
+
+# Engine settings (hashlib releases the GIL on large updates, so threads scale with cores)
+HASH_MODE = "thread"  # "serial", "thread" or "process" (process suits trees with many tiny files)
+HASH_WORKERS = os.cpu_count() or 4
+HASH_CHUNK_SIZE = 1024 * 1024  # 1 MiB reads keep the GIL released for most of the hashing
+PROCESS_BATCH_SIZE = 64  # Paths handed to a worker process per round-trip
+SUBMIT_WINDOW = 1024  # Max paths in flight per thread pool window (bounds queued futures)
+
+# Read strategy by file size (no per-chunk allocation on any path)
+HASH_STRATEGY = "auto"  # "auto" picks by size; "oneshot", "readinto" or "mmap" force one (benchmarks)
+ONE_SHOT_LIMIT = 256 * 1024  # Up to this size a file is read with a single read() call
+# From this size a file is hashed straight from a memory map. Off by default (0): a monitored
+# file truncated by another process while it is mapped raises SIGBUS and kills the server.
+MMAP_THRESHOLD = 0
+
+_buffers = threading.local()  # One reusable read buffer per thread (and per worker process)
+_pools = {}  # (mode, workers) -> executor, started on first use and shared by every later call
+_pools_lock = threading.Lock()
+
+# Bytes read from monitored files by hashing and backup ingest (process-wide)
+io_counters = {"files_read": 0, "bytes_read": 0}
+_io_lock = threading.Lock()
+hash_seconds = registry.histogram("fim_hash_seconds", "Time to read and hash one file", HASH_BUCKETS)
+registry.sampled("fim_hashed_bytes_total", "Bytes read and hashed from monitored files", lambda: io_counters["bytes_read"], kind="counter")
+registry.sampled("fim_hashed_files_total", "Files read and hashed", lambda: io_counters["files_read"], kind="counter")
+
+
+def record_read(nbytes, files=1):
+    """Add completed file reads to the I/O counters."""
+    with _io_lock:
+        io_counters["files_read"] += files
+        io_counters["bytes_read"] += nbytes
+
+
+def choose_strategy(size):
+    """Pick how to read a file of `size` bytes."""
+    if size <= ONE_SHOT_LIMIT:
+        return "oneshot"
+    if MMAP_THRESHOLD and size >= MMAP_THRESHOLD:
+        return "mmap"
+    return "readinto"
+
+
+def _read_buffer(chunk_size):
+    """This thread's reusable buffer as a memoryview of exactly chunk_size bytes."""
+    view = getattr(_buffers, "view", None)
+    if view is None or len(view) != chunk_size:
+        view = _buffers.view = memoryview(bytearray(chunk_size))
+    return view
+
+
+def _read_and_hash(file_path, chunk_size, strategy=None):
+    """Return (sha256, bytes read) for a file, or (None, 0) if it cannot be read."""
+    try:
+        with open(file_path, "rb") as f:
+            strategy = strategy or HASH_STRATEGY
+            sha256 = hashlib.sha256()
+            nbytes = 0
+            if strategy == "auto":
+                # Small files are done after this one read, without even a stat call
+                data = f.read(ONE_SHOT_LIMIT + 1)
+                if len(data) <= ONE_SHOT_LIMIT:
+                    return hashlib.sha256(data).hexdigest(), len(data)
+                # Past the one-shot limit: keep this read even if the file shrank since
+                strategy = "mmap" if choose_strategy(os.fstat(f.fileno()).st_size) == "mmap" else "readinto"
+                if strategy == "readinto":
+                    sha256.update(data)
+                    nbytes = len(data)
+
+            if strategy == "oneshot":
+                data = f.read()
+                return hashlib.sha256(data).hexdigest(), len(data)
+
+            if strategy == "mmap":
+                if os.fstat(f.fileno()).st_size:  # Empty files cannot be mapped
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        return hashlib.sha256(mapped).hexdigest(), len(mapped)
+                f.seek(0)  # Emptied since it was sized: read whatever is there from the start
+
+            # readinto: refill one buffer; only a short final read creates a slice
+            view = _read_buffer(chunk_size)
+            while n := f.readinto(view):
+                sha256.update(view if n == chunk_size else view[:n])
+                nbytes += n
+            return sha256.hexdigest(), nbytes
+    except Exception as e:
+        fim_logger.error(f"ERROR | Hashing failed for {file_path} | {e}")
+        return None, 0
+
+
+def hash_file(file_path, chunk_size=None):
+    """Compute the SHA-256 of a file, returning None if it cannot be read."""
+    started = time.perf_counter()
+    digest, nbytes = _read_and_hash(file_path, chunk_size or HASH_CHUNK_SIZE)
+    if digest is not None:
+        hash_seconds.observe(time.perf_counter() - started)
+        record_read(nbytes)
+    return digest
+
+
+def _hash_entry(args):
+    """Worker entry point: hash one (path, chunk_size) pair, returning (digest, bytes, seconds)."""
+    file_path, chunk_size = args
+    started = time.perf_counter()
+    digest, nbytes = _read_and_hash(file_path, chunk_size)
+    return digest, nbytes, time.perf_counter() - started
+
+
+def get_pool(mode, workers):
+    """The shared thread or process pool for a mode and size (scans call hash_files once per window)."""
+    with _pools_lock:
+        pool = _pools.get((mode, workers))
+        if pool is None:
+            if mode == "process":
+                pool = ProcessPoolExecutor(max_workers=workers)
+            else:
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fim-hash")
+            _pools[(mode, workers)] = pool
+        return pool
+
+
+def shutdown_pools():
+    """Stop the shared pools (run at interpreter exit)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+atexit.register(shutdown_pools)
+
+
+def hash_files(paths, workers=None, chunk_size=None, mode=None):
+    """Hash many files and return [(path, sha256)] ordered by path."""
+    paths = sorted(paths)
+    workers = workers or HASH_WORKERS
+    chunk_size = chunk_size or HASH_CHUNK_SIZE
+    mode = mode or HASH_MODE
+    jobs = [(path, chunk_size) for path in paths]
+
+    if mode == "serial" or workers <= 1 or len(paths) <= 1:
+        results = list(map(_hash_entry, jobs))
+    elif mode == "process":
+        pool = get_pool(mode, workers)
+        try:
+            results = list(pool.map(_hash_entry, jobs, chunksize=PROCESS_BATCH_SIZE))
+        except BrokenProcessPool:
+            with _pools_lock:  # A worker died: the next call starts a fresh pool
+                if _pools.get((mode, workers)) is pool:
+                    del _pools[(mode, workers)]
+            raise
+    elif mode == "thread":
+        pool = get_pool(mode, workers)
+        results = []
+        for start in range(0, len(jobs), SUBMIT_WINDOW):
+            results.extend(pool.map(_hash_entry, jobs[start:start + SUBMIT_WINDOW]))
+    else:
+        raise ValueError(f"Unknown hash mode: {mode}")
+
+    # Counted here so reads done in worker processes are not lost
+    record_read(sum(nbytes for _, nbytes, _ in results), sum(1 for digest, _, _ in results if digest))
+    for digest, _, seconds in results:
+        if digest is not None:
+            hash_seconds.observe(seconds)
+    return [(path, digest) for path, (digest, _, _) in zip(paths, results)]
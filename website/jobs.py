@@ -0,0 +1,118 @@
+# jobs.py
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from website.fim_utils import fim_logger
+from website.metrics import registry
+
+# Background file operations
+JOB_WORKERS = 2  # Folder deletes/renames running at once
+MAX_TRACKED_JOBS = 1000  # Jobs kept for the status endpoint (oldest finished ones dropped first)
+JOB_STATES = ("queued", "running", "done", "failed")
+
+
+def _public(job):
+    """Status record without the absolute paths the job locks."""
+    return {key: value for key, value in job.items() if key != "paths"}
+
+
+class JobTracker:
+    """Run slow file operations on a small thread pool and keep their status for polling.
+
+    Each job names the paths it works on; a new job (or inline operation) touching
+    a path inside or above a pending one is refused instead of racing it.
+    """
+
+    def __init__(self, workers=None, max_jobs=None):
+        self.workers = workers or JOB_WORKERS
+        self.max_jobs = max_jobs or MAX_TRACKED_JOBS
+        self.jobs = OrderedDict()  # id -> job dict, oldest first
+        self.lock = threading.Lock()
+        self.executor = None
+        self.counters = dict.fromkeys(JOB_STATES[2:], 0)
+
+    def submit(self, kind, owner, target, paths, fn, *args):
+        """Queue fn(*args) as a job working on `paths`; returns its status record.
+
+        `target` is what the user asked for (shown in the status), `paths` the absolute
+        paths the job locks.
+        """
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "owner": owner,
+            "target": target,
+            "paths": [os.path.abspath(path) for path in paths],
+            "status": "queued",
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "error": None,
+            "result": None,  # Whatever fn returned (e.g. per-item results of a bulk job)
+        }
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fim-job")
+            self.jobs[job["id"]] = job
+            self._prune()
+            self.executor.submit(self._run, job, fn, args)
+            return _public(job)
+
+    def _run(self, job, fn, args):
+        job["started"] = time.time()
+        job["status"] = "running"
+        try:
+            job["result"] = fn(*args)
+            job["status"] = "done"
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "failed"
+            fim_logger.error(f"ERROR | Background {job['kind']} of {job['target']} failed | {e}")
+        finally:
+            job["finished"] = time.time()
+            with self.lock:
+                self.counters[job["status"]] += 1
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["finished"] is not None]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+
+    def busy(self, *paths):
+        """Return a pending job working on any of the paths, inside them or above them (None if there is none)."""
+        paths = [os.path.abspath(path) for path in paths]
+        with self.lock:
+            for job in self.jobs.values():
+                if job["finished"] is not None:
+                    continue
+                for job_path in job["paths"]:
+                    for path in paths:
+                        if os.path.commonpath([path, job_path]) in (path, job_path):
+                            return _public(job)
+        return None
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        return _public(job) if job else None
+
+    def list(self, owner=None):
+        """Status records, newest first (only one owner's if given)."""
+        with self.lock:
+            jobs = [_public(job) for job in reversed(self.jobs.values()) if owner is None or job["owner"] == owner]
+        return jobs
+
+    def stats(self):
+        with self.lock:
+            pending = sum(1 for job in self.jobs.values() if job["finished"] is None)
+            return dict(self.counters, pending=pending, tracked=len(self.jobs))
+
+
+job_tracker = JobTracker()  # Shared by every request in the process
+registry.sampled(
+    "fim_jobs_total", "Finished background file operations by status",
+    lambda: {status: count for status, count in job_tracker.stats().items() if status in JOB_STATES}, "status", kind="counter",
+)
+registry.sampled("fim_jobs_pending", "Background file operations queued or running", lambda: job_tracker.stats()["pending"])
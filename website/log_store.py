@@ -0,0 +1,359 @@
+# log_store.py
+import os
+import re
+import gzip
+import time
+import queue
+import atexit
+import shutil
+import logging
+import threading
+from collections import deque
+from logging.handlers import QueueHandler, RotatingFileHandler
+from website.metrics import registry
+
+# Log file and rotation settings
+LOG_FILE = "fim.log"
+LOG_MAX_BYTES = 10 * 1024 * 1024  # Rotate the live log once it reaches this size
+LOG_MAX_AGE_SECONDS = 24 * 60 * 60  # ...or once it has been written to for this long (0 disables)
+LOG_BACKUP_COUNT = 20  # Compressed archives kept (fim.log.<segment>.gz)
+LOG_ENCODING = "utf-8"
+
+# Reader settings
+LOG_TAIL_LINES = 200  # Lines returned when no cursor is given
+MAX_LOG_LINES = 5000  # Max lines per read
+TAIL_BLOCK_SIZE = 64 * 1024  # Bytes read per step when scanning the live log backwards
+
+# Background writer settings (log calls only enqueue; one thread writes the file)
+LOG_QUEUE_SIZE = 10000  # Records buffered before the overflow policy applies
+LOG_OVERFLOW_POLICY = "sample"  # "drop" (discard new records), "block" (wait for room) or "sample"
+LOG_BLOCK_TIMEOUT = 1.0  # Longest wait under "block" before a record is dropped
+LOG_SAMPLE_THRESHOLD = 0.8  # Queue fill level at which "sample" starts thinning INFO/DEBUG records
+LOG_SAMPLE_RATE = 10  # ...keeping one in this many of them (warnings and errors are always kept)
+LOG_BATCH_SIZE = 256  # Records written per flush
+
+# Background writer counters (process-wide)
+log_counters = {"queued": 0, "written": 0, "dropped": 0, "sampled_out": 0}
+_log_counters_lock = threading.Lock()
+registry.sampled("fim_log_records_total", "Log records by state (queued, written, dropped, sampled_out)", lambda: dict(log_counters), "state", kind="counter")
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+
+def archive_name(log_file, segment, compressed=True):
+    return f"{log_file}.{segment}.gz" if compressed else f"{log_file}.{segment}"
+
+
+def list_segments(log_file=LOG_FILE):
+    """Return [(segment, path, compressed)] oldest first; the live log is the last segment.
+
+    Segment numbers never change once assigned, so a "<segment>:<offset>" cursor stays
+    valid after the live file it points into has been rotated and compressed.
+    """
+    directory = os.path.dirname(os.path.abspath(log_file))
+    pattern = re.compile(re.escape(os.path.basename(log_file)) + r"\.(\d+)(\.gz)?\Z")
+    archives = {}
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            segment, compressed = int(match.group(1)), bool(match.group(2))
+            # A plain archive is the rename done before compression finishes; prefer it
+            if segment not in archives or not compressed:
+                archives[segment] = (os.path.join(directory, name), compressed)
+    segments = [(segment, path, compressed) for segment, (path, compressed) in sorted(archives.items())]
+    live_segment = segments[-1][0] + 1 if segments else 1
+    segments.append((live_segment, os.path.abspath(log_file), False))
+    return segments
+
+
+class ArchivingFileHandler(RotatingFileHandler):
+    """Size/age based rotation into gzip archives numbered by segment."""
+
+    def __init__(self, filename=LOG_FILE, max_bytes=None, max_age=None, backup_count=None):
+        super().__init__(
+            filename,
+            maxBytes=max_bytes or LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT if backup_count is None else backup_count,
+            encoding=LOG_ENCODING,
+        )
+        self.max_age = LOG_MAX_AGE_SECONDS if max_age is None else max_age
+        self.opened_at = time.time()
+        self.batching = False  # Set by BatchingLogWriter: flush once per batch, not per record
+
+    def flush(self):
+        if not self.batching:
+            super().flush()
+
+    def flush_batch(self):
+        with self.lock:
+            super().flush()
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        if self.max_age and time.time() - self.opened_at >= self.max_age:
+            return bool(self.stream) and self.stream.tell() > 0
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        segments = list_segments(self.baseFilename)
+        live_segment = segments[-1][0]
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            # Rename first (atomic), then compress, so readers always see the segment once
+            plain = archive_name(self.baseFilename, live_segment, compressed=False)
+            os.replace(self.baseFilename, plain)
+            compress_archive(plain)
+
+        archives = list_segments(self.baseFilename)[:-1]
+        for _, path, _ in archives[:max(0, len(archives) - self.backupCount)]:
+            os.remove(path)
+
+        self.opened_at = time.time()
+        if not self.delay:
+            self.stream = self._open()
+
+
+def _count(name, amount=1):
+    with _log_counters_lock:
+        log_counters[name] += amount
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Hand records to the background writer, applying the overflow policy when full."""
+
+    def __init__(self, log_queue, policy=None):
+        super().__init__(log_queue)
+        self.policy = policy or LOG_OVERFLOW_POLICY
+        if self.policy not in ("drop", "block", "sample"):
+            raise ValueError(f"Unknown log overflow policy: {self.policy}")
+        self.sample_counter = 0
+
+    def enqueue(self, record):
+        try:
+            if self.policy == "block":
+                self.queue.put(record, timeout=LOG_BLOCK_TIMEOUT)
+            else:
+                if self.policy == "sample" and record.levelno < logging.WARNING and self._over_threshold():
+                    self.sample_counter += 1
+                    if self.sample_counter % LOG_SAMPLE_RATE:
+                        _count("sampled_out")
+                        return
+                self.queue.put_nowait(record)
+        except queue.Full:
+            _count("dropped")
+            return
+        _count("queued")
+
+    def _over_threshold(self):
+        return self.queue.qsize() >= self.queue.maxsize * LOG_SAMPLE_THRESHOLD
+
+
+class BatchingLogWriter:
+    """Single background thread that drains the log queue into a file handler in batches."""
+
+    _stop = object()
+
+    def __init__(self, handler, queue_size=None, batch_size=None):
+        self.handler = handler
+        self.handler.batching = True
+        self.queue = queue.Queue(maxsize=queue_size or LOG_QUEUE_SIZE)
+        self.batch_size = batch_size or LOG_BATCH_SIZE
+        self.thread = threading.Thread(target=self._run, name="fim-log-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)  # Drain what is queued before the interpreter exits
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = False
+            for record in batch:
+                if record is self._stop:
+                    stopping = True
+                    continue
+                self.handler.handle(record)
+            self.handler.flush_batch()
+            _count("written", len(batch) - stopping)
+            if stopping:
+                return
+
+    def stop(self, timeout=5):
+        if self.thread.is_alive():
+            self.queue.put(self._stop)
+            self.thread.join(timeout)
+
+
+def log_stats():
+    """Writer counters plus the number of records still waiting to be written."""
+    with _log_counters_lock:
+        stats = dict(log_counters)
+    stats["pending"] = stats["queued"] - stats["written"]
+    return stats
+
+
+def compress_archive(plain_path):
+    """Gzip a rotated segment and remove the plain copy."""
+    temp_path = plain_path + ".gz.tmp"
+    with open(plain_path, "rb") as src, gzip.open(temp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(temp_path, plain_path + ".gz")
+    os.remove(plain_path)
+
+
+def parse_line(line):
+    """Split "timestamp | LEVEL | message" into a dict (None for continuation lines)."""
+    parts = line.split(" | ", 2)
+    if len(parts) < 3:
+        return None
+    return {"timestamp": parts[0], "level": parts[1], "message": parts[2]}
+
+
+def make_filter(level=None, user=None):
+    """Build a line predicate: minimum level (e.g. "WARNING") and/or a user name.
+
+    The user name must appear as a whole word, so "Tom" does not match lines about "Tommy".
+    """
+    min_level = LEVELS.get(level.upper(), 0) if level else 0
+    if not min_level and not user:
+        return None
+    user_pattern = re.compile(rf"(?<!\w){re.escape(user)}(?!\w)") if user else None
+
+    def matches(line):
+        entry = parse_line(line)
+        if entry is None:
+            return False
+        if min_level and LEVELS.get(entry["level"], 0) < min_level:
+            return False
+        return user_pattern is None or user_pattern.search(entry["message"]) is not None
+
+    return matches
+
+
+def parse_cursor(cursor):
+    segment, _, offset = cursor.partition(":")
+    return int(segment), int(offset or 0)
+
+
+def _open_segment(path, compressed):
+    return gzip.open(path, "rb") if compressed else open(path, "rb")
+
+
+def read_after(cursor, log_file=LOG_FILE, limit=None, line_filter=None):
+    """Read complete lines after a cursor, crossing into newer segments.
+
+    Returns (lines, next_cursor). If the cursor's segment has been pruned,
+    reading restarts at the oldest archive that is still on disk. Segments are
+    listed again whenever one is rotated, compressed or pruned mid-read.
+    """
+    limit = min(limit or MAX_LOG_LINES, MAX_LOG_LINES)
+    segment, offset = parse_cursor(cursor)
+    lines = []
+    while True:
+        segments = list_segments(log_file)
+        live_segment = segments[-1][0]
+        if segment > live_segment:
+            segment, offset = live_segment, 0  # Log files were reset; start over
+        number, path, compressed = next(entry for entry in segments if entry[0] >= segment)
+        start = offset if number == segment else 0
+        try:
+            f = _open_segment(path, compressed)
+        except FileNotFoundError:
+            if number == live_segment:
+                return lines, f"{number}:{start}"  # No live log yet
+            continue  # Compressed or pruned since the listing
+        with f:
+            if number == live_segment and list_segments(log_file)[-1][0] != live_segment:
+                continue  # Rotated before it was opened: this file holds the next segment
+            if not compressed and start > os.fstat(f.fileno()).st_size:
+                start = 0  # Truncated behind our back
+            f.seek(start)  # gzip seeks by decompressing forward
+            position = start
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # Partial line still being written
+                position += len(raw)
+                line = raw.decode(LOG_ENCODING, errors="replace").rstrip("\r\n")
+                if line_filter is None or line_filter(line):
+                    lines.append(line)
+                    if len(lines) >= limit:
+                        return lines, f"{number}:{position}"
+        if number == live_segment:
+            return lines, f"{number}:{position}"
+        segment, offset = number + 1, 0
+
+
+def _reverse_lines(path, end, block_size=TAIL_BLOCK_SIZE):
+    """Yield the lines of a plain file before `end`, last first, reading it backwards.
+
+    The first item is whatever follows the last newline ("" or a partial line).
+    """
+    with open(path, "rb") as f:
+        position = end
+        remainder = b""
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + remainder).split(b"\n")
+            remainder = lines.pop(0)
+            yield from reversed(lines)
+        yield remainder
+
+
+def read_tail(count=None, log_file=LOG_FILE, line_filter=None):
+    """Return (last lines, cursor just after them), oldest line first."""
+    count = min(count or LOG_TAIL_LINES, MAX_LOG_LINES)
+    segments = list_segments(log_file)
+    live_segment, live_path, _ = segments[-1]
+    collected = []
+
+    try:
+        end = os.path.getsize(live_path)
+        lines = _reverse_lines(live_path, end)
+        end -= len(next(lines))  # A partial last line is left for the next cursor read
+        for raw in lines:
+            line = raw.decode(LOG_ENCODING, errors="replace").rstrip("\r")
+            if line_filter is None or line_filter(line):
+                collected.append(line)
+                if len(collected) >= count:
+                    break
+    except FileNotFoundError:
+        end = 0
+    cursor = f"{live_segment}:{end}"
+
+    for number, path, compressed in reversed(segments[:-1]):
+        needed = count - len(collected)
+        if needed <= 0:
+            break
+        try:
+            with _open_segment(path, compressed) as f:
+                recent = deque(maxlen=needed)
+                for raw in f:
+                    line = raw.decode(LOG_ENCODING, errors="replace").rstrip("\r\n")
+                    if line_filter is None or line_filter(line):
+                        recent.append(line)
+            collected.extend(reversed(recent))
+        except FileNotFoundError:
+            continue
+
+    collected.reverse()
+    return collected, cursor
+
+
+def wait_for_lines(cursor, timeout, log_file=LOG_FILE, line_filter=None, limit=None, poll_interval=0.5):
+    """Long-poll: block up to `timeout` seconds until lines after `cursor` appear."""
+    deadline = time.monotonic() + timeout
+    while True:
+        lines, next_cursor = read_after(cursor, log_file, limit, line_filter)
+        if lines or time.monotonic() >= deadline:
+            return lines, next_cursor
+        cursor = next_cursor  # Skip lines the filter rejected
+        time.sleep(poll_interval)
@@ -0,0 +1,172 @@
+# metrics.py
+import bisect
+import logging
+import threading
+
+# Histogram buckets in seconds (upper bounds; +Inf is implied)
+HASH_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+BATCH_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+SCAN_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+SMTP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _labels(label, value):
+    return f'{{{label}="{value}"}}' if label else ""
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """Per-thread values merged at scrape time, so recording takes no lock.
+
+    Each thread writes only to its own dict; the scrape copies every shard (a
+    dict copy is atomic under the GIL) and folds shards of finished threads into
+    a retired total so short-lived threads don't accumulate.
+    """
+
+    def __init__(self, name, help, label=None):
+        self.name, self.help, self.label = name, help, label
+        self._local = threading.local()
+        self._shards = []  # (thread, values) for every thread that recorded something
+        self._retired = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        values = getattr(self._local, "values", None)
+        if values is None:
+            values = self._local.values = {}
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), values))
+        return values
+
+    def _merged(self):
+        with self._shards_lock:
+            live = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    live.append((thread, values))
+                else:
+                    self._merge(self._retired, values)
+            self._shards = live
+            merged = self._merge({}, self._retired)
+            for _, values in live:
+                self._merge(merged, dict(values))
+        return merged
+
+
+class Counter(_Sharded):
+    """Monotonic counter, optionally split by one label."""
+
+    kind = "counter"
+
+    def inc(self, value="", amount=1):
+        values = getattr(self._local, "values", None) or self._shard()
+        values[value] = values.get(value, 0) + amount
+
+    @staticmethod
+    def _merge(target, values):
+        for value, count in values.items():
+            target[value] = target.get(value, 0) + count
+        return target
+
+    def samples(self):
+        for value, count in sorted(self._merged().items()):
+            yield f"{self.name}{_labels(self.label, value)} {_format(count)}"
+
+
+class Histogram(_Sharded):
+    """Cumulative-bucket histogram, optionally split by one label."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, label=None):
+        super().__init__(name, help, label)
+        self.buckets = tuple(buckets)
+
+    def observe(self, amount, value=""):
+        series = getattr(self._local, "values", None) or self._shard()
+        counts = series.get(value)
+        if counts is None:
+            counts = series[value] = [0] * (len(self.buckets) + 1) + [0.0]  # Buckets, +Inf, sum
+        counts[bisect.bisect_left(self.buckets, amount)] += 1
+        counts[-1] += amount
+
+    @staticmethod
+    def _merge(target, series):
+        for value, counts in series.items():
+            counts = list(counts)
+            total = target.get(value)
+            target[value] = counts if total is None else [a + b for a, b in zip(total, counts)]
+        return target
+
+    def samples(self):
+        for value, counts in sorted(self._merged().items()):
+            prefix = f'{self.label}="{value}",' if self.label else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+            yield f"{self.name}_sum{_labels(self.label, value)} {_format(counts[-1])}"
+            yield f"{self.name}_count{_labels(self.label, value)} {cumulative}"
+
+
+class Sampled:
+    """Gauge or counter read from existing state at scrape time (nothing runs per event).
+
+    `collect` returns a number, or a {label value: number} dict when `label` is set.
+    """
+
+    def __init__(self, name, help, collect, label=None, kind="gauge"):
+        self.name, self.help, self.label, self.kind = name, help, label, kind
+        self.collect = collect
+
+    def samples(self):
+        values = self.collect()
+        if self.label is None:
+            values = {"": values}
+        for value, number in sorted(values.items()):
+            if number is not None:
+                yield f"{self.name}{_labels(self.label, value)} {_format(number)}"
+
+
+class Registry:
+    """All metrics of the process, rendered in the Prometheus text format (version 0.0.4)."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, label=None):
+        return self.register(Counter(name, help, label))
+
+    def histogram(self, name, help, buckets, label=None):
+        return self.register(Histogram(name, help, buckets, label))
+
+    def sampled(self, name, help, collect, label=None, kind="gauge"):
+        return self.register(Sampled(name, help, collect, label, kind))
+
+    def render(self):
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            try:
+                samples = list(metric.samples())
+            except Exception as e:  # One broken collector must not fail the whole scrape
+                # log_store registers metrics before fim_utils exists, so no import of fim_logger here
+                logging.getLogger("FIMLogger").error(f"ERROR | Metric {name} could not be collected | {e}")
+                continue
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()  # Every metric in this process (served at /metrics)
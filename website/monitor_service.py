@@ -0,0 +1,110 @@
+# monitor_service.py
+import os
+import threading
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+from website.fim_utils import fim_logger
+
+
+class FanOutHandler(FileSystemEventHandler):
+    """Forward every event from one watched directory once, to the directory's recorder.
+
+    Without a recorder each event goes to every subscribed handler.
+    """
+
+    def __init__(self, recorder=None):
+        self.subscribers = {}  # username -> FIMHandler
+        self.recorder = recorder  # Handler that records changes made outside the app
+
+    def on_any_event(self, event):
+        if self.recorder is not None:
+            self.recorder.on_any_event(event)
+            return
+        for handler in list(self.subscribers.values()):
+            handler.on_any_event(event)
+
+
+class MonitorService:
+    """One process-wide watchdog Observer that watches each directory once.
+
+    Users subscribe with reference counting: every start adds a reference,
+    every stop drops one, and the user's handler is detached when the count
+    reaches zero. A directory is unscheduled once nobody subscribes to it.
+    """
+
+    def __init__(self):
+        self.observer = None
+        self.watches = {}  # directory -> (ObservedWatch, FanOutHandler)
+        self.handlers = {}  # username -> FIMHandler
+        self.refcounts = {}  # username -> number of active starts
+        self.directories = {}  # username -> directory the user is subscribed to
+        self.lock = threading.RLock()
+
+    def acquire(self, directory, username, handler_factory, recorder_factory=None, reuse=False):
+        """Add a monitoring reference for a user; returns the new reference count.
+
+        The check and the subscription happen under one lock: handler_factory is only
+        called (once) when the user has no subscription yet. With reuse=True an existing
+        subscription is left at its count instead of gaining a reference (login).
+        `recorder_factory` builds the handler that receives the directory's events when
+        it is first watched (by default each subscriber gets every event).
+        """
+        directory = os.path.abspath(directory)
+        with self.lock:
+            if username in self.refcounts:
+                if not reuse:
+                    self.refcounts[username] += 1
+                return self.refcounts[username]
+
+            if self.observer is None:
+                self.observer = Observer()
+                self.observer.start()
+
+            if directory not in self.watches:
+                fan_out = FanOutHandler(recorder_factory() if recorder_factory else None)
+                watch = self.observer.schedule(fan_out, directory, recursive=True)
+                self.watches[directory] = (watch, fan_out)
+                fim_logger.info(f"INFO | Watching {directory}")
+
+            handler = handler_factory()
+            self.watches[directory][1].subscribers[username] = handler
+            self.handlers[username] = handler
+            self.directories[username] = directory
+            self.refcounts[username] = 1
+            return 1
+
+    def release(self, username, force=False):
+        """Drop a monitoring reference; returns the remaining count (None if not monitoring)."""
+        with self.lock:
+            if username not in self.refcounts:
+                return None
+
+            self.refcounts[username] = 0 if force else self.refcounts[username] - 1
+            if self.refcounts[username] > 0:
+                return self.refcounts[username]
+
+            del self.refcounts[username]
+            del self.handlers[username]
+            directory = self.directories.pop(username)
+            watch, fan_out = self.watches[directory]
+            fan_out.subscribers.pop(username, None)
+
+            if not fan_out.subscribers:
+                self.observer.unschedule(watch)
+                del self.watches[directory]
+                fim_logger.info(f"INFO | Stopped watching {directory}")
+
+            if not self.watches:
+                self.observer.stop()
+                self.observer.join()
+                self.observer = None
+            return 0
+
+    def is_monitoring(self, username):
+        return username in self.refcounts
+
+    def observer_count(self):
+        return 1 if self.observer is not None else 0
+
+
+monitor_service = MonitorService()  # The single observer shared by every user
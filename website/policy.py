@@ -0,0 +1,64 @@
+# policy.py
+import os
+import re
+import fnmatch
+from functools import lru_cache
+from website import MONITOR_DIR
+
+# Critical-file rules: ("extension", ".conf"), ("glob", "*.ini" or "etc/*.cfg"),
+# ("regex", r"secrets?/"), ("prefix", "CustomerInfo") -- paths are relative to the root.
+CRITICAL_EXTENSIONS = ['.conf', '.xml', '.json', '.dll']
+CRITICAL_RULES = [("extension", extension) for extension in CRITICAL_EXTENSIONS]
+POLICY_CACHE_SIZE = 65536  # Path decisions kept in the LRU cache
+
+
+def rule_to_regex(kind, pattern):
+    """Translate one rule into a regex matched against the whole relative path."""
+    if kind == "glob":
+        translated = fnmatch.translate(pattern)
+        # A glob without a slash matches the file name in any directory
+        return translated if "/" in pattern else r"(?:.*/)?" + translated
+    if kind == "regex":
+        return r".*?(?:" + pattern + r")"
+    if kind == "prefix":
+        return re.escape(pattern.strip("/")) + r"(?:/.*)?\Z"
+    raise ValueError(f"Unknown policy rule type: {kind}")
+
+
+class CriticalPolicy:
+    """Classify paths as critical with an LRU cache of decisions.
+
+    Extension rules become a set lookup on the file suffix; every other rule is
+    folded into one compiled regex that only runs when the suffix doesn't match.
+    """
+
+    def __init__(self, rules=None, root=None, cache_size=None):
+        self.rules = list(CRITICAL_RULES if rules is None else rules)
+        self.root = os.path.abspath(root or MONITOR_DIR)
+        self.root_prefix = self.root + os.sep
+        self.extensions = frozenset(pattern for kind, pattern in self.rules if kind == "extension")
+        patterns = [rule_to_regex(kind, pattern) for kind, pattern in self.rules if kind != "extension"]
+        self.matcher = re.compile("|".join(f"(?:{p})" for p in patterns), re.S) if patterns else None
+        self.is_critical = lru_cache(maxsize=cache_size or POLICY_CACHE_SIZE)(self._classify)
+
+    def relative(self, path):
+        """Path relative to the policy root with '/' separators."""
+        path = os.path.abspath(path)
+        if path.startswith(self.root_prefix):
+            path = path[len(self.root_prefix):]
+        return path.replace(os.sep, "/")
+
+    def _classify(self, path):
+        name = path.rpartition(os.sep)[2]
+        dot = name.rfind(".")
+        if dot > 0 and name[dot:] in self.extensions:  # Same suffix rule as os.path.splitext
+            return True
+        if self.matcher is None:
+            return False
+        return self.matcher.match(self.relative(path)) is not None
+
+    def cache_info(self):
+        return self.is_critical.cache_info()
+
+
+default_policy = CriticalPolicy()  # Policy for MONITOR_DIR used by the walker, handler and views
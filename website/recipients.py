@@ -0,0 +1,86 @@
+# recipients.py
+import time
+import threading
+from flask import has_app_context
+from website.fim_utils import fim_logger
+from website.metrics import registry
+
+RECIPIENT_TTL_SECONDS = 300  # Admin e-mail list is re-read at most this often (sign-up invalidates it early)
+
+
+class RecipientCache:
+    """Admin alert recipients cached with a TTL, readable from any thread.
+
+    Observer and pipeline threads have no Flask app context, so a miss pushes one
+    for the app registered with init_app(). Concurrent misses share one query, and
+    a query that overlapped an invalidation is run again rather than cached.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = RECIPIENT_TTL_SECONDS if ttl is None else ttl
+        self.app = None
+        self.emails = None  # Last loaded list (kept after invalidation as a fallback)
+        self.expires_at = 0.0
+        self.generation = 0  # Bumped by invalidate(); a load only caches if it didn't change
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "loads": 0, "errors": 0, "invalidations": 0}
+
+    def init_app(self, app):
+        self.app = app
+
+    def admin_emails(self):
+        """Return the admin e-mail addresses, querying the database only when stale."""
+        with self.lock:
+            if self._fresh():
+                self.counters["hits"] += 1
+                return list(self.emails)
+            self.counters["misses"] += 1
+
+        with self.load_lock:
+            with self.lock:
+                if self._fresh():  # Another thread reloaded while we waited
+                    return list(self.emails)
+            while True:
+                with self.lock:
+                    generation = self.generation
+                try:
+                    emails = self._load()
+                except Exception as e:
+                    with self.lock:
+                        self.counters["errors"] += 1
+                    fim_logger.error(f"ERROR | Could not load admin recipients | {e}")
+                    return list(self.emails or [])  # Stale beats nothing for an alert
+                with self.lock:
+                    self.counters["loads"] += 1
+                    if generation == self.generation:  # Else it may predate a sign-up: load again
+                        self.emails = emails
+                        self.expires_at = time.monotonic() + self.ttl
+                        return list(emails)
+
+    def invalidate(self):
+        """Expire the cached list (call after an admin account is created or changed)."""
+        with self.lock:
+            self.generation += 1
+            self.expires_at = 0.0
+            self.counters["invalidations"] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def _fresh(self):
+        return self.emails is not None and time.monotonic() < self.expires_at
+
+    def _load(self):
+        from website.models import User  # Imported late: models depends on the app package
+        if has_app_context():
+            return [admin.email for admin in User.query.filter_by(role="admin").all()]
+        if self.app is None:
+            raise RuntimeError("RecipientCache.init_app() was not called")
+        with self.app.app_context():
+            return [admin.email for admin in User.query.filter_by(role="admin").all()]
+
+
+admin_recipients = RecipientCache()  # Shared by every FIMHandler
+registry.sampled("fim_recipient_cache_total", "Admin recipient cache lookups and reloads", admin_recipients.stats, "outcome", kind="counter")
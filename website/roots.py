@@ -0,0 +1,214 @@
+# roots.py
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from website import MONITOR_DIR
+from website.fim_utils import fim_logger
+from website.policy import CriticalPolicy, default_policy
+from website.baseline_store import open_baseline_store
+from website.backup_store import get_backup_store
+from website.monitor_service import MonitorService, monitor_service
+from website.verification import checkpoints, run_sweep, sweep_progress
+from website.metrics import registry
+
+# Monitored roots: name -> settings. "rules" uses the policy.CRITICAL_RULES format
+# (None = the default rules); "scan_interval" is seconds between verification sweeps (0 = never).
+# Example: "etc": {"path": "/etc", "rules": [("glob", "*.conf")], "scan_interval": 900}
+DEFAULT_ROOT = "Monitor"
+MONITORED_ROOTS = {
+    DEFAULT_ROOT: {"path": MONITOR_DIR, "rules": None, "scan_interval": 3600},
+}
+MAX_CONCURRENT_SCANS = 2  # Full scans running at once across all roots
+SCHEDULER_TICK_SECONDS = 5  # How often the scheduler looks for due scans
+BASELINE_COUNT_SECONDS = 300  # How long a counted baseline size is reused (by /metrics)
+
+
+class MonitoredRoot:
+    """One watched directory tree with its own policy, baseline, backups and observer.
+
+    The default root keeps the original baseline/backup locations and the shared
+    monitor_service, so existing data keeps working.
+    """
+
+    def __init__(self, name, path, rules=None, scan_interval=0):
+        self.name = name
+        self.path = os.path.abspath(path)
+        self.is_default = name == DEFAULT_ROOT
+        self.policy = default_policy if self.is_default and rules is None else CriticalPolicy(rules, root=self.path)
+        self.partition = None if self.is_default else name  # Baseline partition and backup namespace
+        self.service = monitor_service if self.is_default else MonitorService()
+        self.scan_interval = scan_interval
+        self.next_scan_at = time.monotonic() + scan_interval if scan_interval else None
+        self.scanning = False
+        self.last_scan = {}
+        self.counted = None  # (monotonic time, baseline entries) from the last count
+        self.sweep = checkpoints.load(name)  # Current or last verification sweep
+        if self.sweep and self.sweep["status"] != "completed" and scan_interval:
+            self.next_scan_at = time.monotonic()  # Finish an interrupted sweep first
+
+    def is_critical(self, path):
+        return self.policy.is_critical(path)
+
+    def contains(self, path):
+        path = os.path.abspath(path)
+        return path == self.path or path.startswith(self.path + os.sep)
+
+    def open_baseline(self):
+        return open_baseline_store(partition=self.partition)
+
+    def backups(self):
+        return get_backup_store(self.partition)
+
+    def baseline_count(self):
+        """Entries in the baseline, counted at most once every BASELINE_COUNT_SECONDS."""
+        now = time.monotonic()
+        if self.counted is None or now - self.counted[0] >= BASELINE_COUNT_SECONDS:
+            store = self.open_baseline()
+            try:
+                self.counted = (now, store.count())
+            finally:
+                store.close()
+        return self.counted[1]
+
+    def status(self):
+        return {
+            "name": self.name,
+            "path": self.path,
+            "scanInterval": self.scan_interval,
+            "nextScanIn": round(max(0, self.next_scan_at - time.monotonic())) if self.next_scan_at else None,
+            "scanning": self.scanning,
+            "lastScan": self.last_scan,
+            "verification": sweep_progress(self.sweep),
+            "subscribers": len(self.service.handlers),
+        }
+
+
+class RootRegistry:
+    """All monitored roots plus the scheduler that runs their periodic full scans."""
+
+    def __init__(self, roots=None, max_concurrent_scans=None):
+        self.roots = {}
+        self.lock = threading.Lock()
+        self.max_concurrent_scans = max_concurrent_scans or MAX_CONCURRENT_SCANS
+        self.executor = None
+        self.scheduler = None
+        self.stop_event = threading.Event()
+        for name, settings in (MONITORED_ROOTS if roots is None else roots).items():
+            self.add(name, **settings)
+
+    def add(self, name, path, rules=None, scan_interval=0):
+        """Register a root (names double as baseline partition and backup namespace)."""
+        root = MonitoredRoot(name, path, rules, scan_interval)
+        with self.lock:
+            if name in self.roots:
+                raise ValueError(f"Root already registered: {name}")
+            self.roots[name] = root
+        return root
+
+    def get(self, name):
+        return self.roots.get(name)
+
+    @property
+    def default(self):
+        return self.roots[DEFAULT_ROOT]
+
+    def __iter__(self):
+        return iter(list(self.roots.values()))
+
+    def for_path(self, path):
+        """Return the innermost root containing a path (the default root if none does)."""
+        matches = [root for root in self if root.contains(path)]
+        return max(matches, key=lambda root: len(root.path)) if matches else self.default
+
+    def start_scheduler(self):
+        """Start the background thread that queues due scans on a bounded pool."""
+        with self.lock:
+            if self.scheduler is not None:
+                return
+            self.stop_event.clear()
+            self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent_scans, thread_name_prefix="fim-scan")
+            self.scheduler = threading.Thread(target=self._schedule, name="fim-scan-scheduler", daemon=True)
+            self.scheduler.start()
+
+    def stop_scheduler(self):
+        with self.lock:
+            scheduler, executor = self.scheduler, self.executor
+            self.scheduler = self.executor = None
+        if scheduler is not None:
+            self.stop_event.set()
+            scheduler.join()
+            executor.shutdown(wait=True)
+
+    def _schedule(self):
+        while not self.stop_event.wait(SCHEDULER_TICK_SECONDS):
+            now = time.monotonic()
+            due = [root for root in self if root.next_scan_at is not None and root.next_scan_at <= now and not root.scanning]
+            # Longest-waiting roots first; the pool size caps how many run together,
+            # so one large root occupies a single worker and smaller ones keep going
+            for root in sorted(due, key=lambda root: root.next_scan_at):
+                root.scanning = True
+                self.executor.submit(self.run_scan, root)
+
+    def run_scan(self, root):
+        """Periodic scan of one root: ingest it if it has no baseline yet, else run a
+        rate-limited, resumable verification sweep that alerts on what it finds."""
+        from website.fim_monitor import ingest_directory  # Avoid a circular import
+        from website.recipients import admin_recipients
+
+        root.scanning = True
+        started = time.monotonic()
+        try:
+            store = root.open_baseline()
+            try:
+                has_baseline = store.exists()
+            finally:
+                store.close()
+            if has_baseline:
+                sweep = run_sweep(root, admin_recipients.admin_emails(), stop_event=self.stop_event)
+                root.last_scan = dict(sweep["counts"], sweep=sweep["status"])
+            else:
+                root.last_scan = {"ingested": ingest_directory(root.path)["files"]}
+            root.last_scan["status"] = "ok"
+        except Exception as e:
+            root.last_scan = {"status": "failed", "error": str(e)}
+            fim_logger.error(f"ERROR | Scheduled scan of {root.name} failed | {e}")
+        finally:
+            root.last_scan["duration"] = round(time.monotonic() - started, 3)
+            root.last_scan["finished"] = time.time()
+            if root.scan_interval:
+                root.next_scan_at = time.monotonic() + root.scan_interval
+            root.scanning = False
+        return root.last_scan
+
+
+root_registry = RootRegistry()  # Every monitored root in this process
+
+
+def services():
+    """Distinct monitor services across roots."""
+    return list({id(root.service): root.service for root in root_registry}.values())
+
+
+def policy_cache(field):
+    policies = {id(root.policy): root.policy for root in root_registry}.values()
+    return sum(getattr(policy.cache_info(), field) for policy in policies)
+
+
+registry.sampled(
+    "fim_baseline_entries", "Files recorded in each root's baseline (recounted every few minutes)",
+    lambda: {root.name: root.baseline_count() for root in root_registry}, "root",
+)
+registry.sampled(
+    "fim_observers", "Running watchdog observers",
+    lambda: sum(1 for service in services() if service.observer is not None and service.observer.is_alive()),
+)
+registry.sampled("fim_watched_directories", "Directories scheduled on an observer", lambda: sum(len(service.watches) for service in services()))
+registry.sampled("fim_monitoring_users", "Users with an active monitoring subscription", lambda: sum(len(service.handlers) for service in services()))
+registry.sampled("fim_scan_running", "Whether each root's scheduled scan is running", lambda: {root.name: int(root.scanning) for root in root_registry}, "root")
+registry.sampled(
+    "fim_verification_percent", "Progress of each root's current or last verification sweep",
+    lambda: {root.name: (sweep_progress(root.sweep) or {}).get("percent") for root in root_registry}, "root",
+)
+registry.sampled("fim_policy_cache_hits_total", "Critical-path policy cache hits", lambda: policy_cache("hits"), kind="counter")
+registry.sampled("fim_policy_cache_misses_total", "Critical-path policy cache misses", lambda: policy_cache("misses"), kind="counter")
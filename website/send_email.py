@@ -1,20 +1,38 @@
 import smtplib
+import queue
+import threading
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from website.fim_utils import  fim_logger
+from website.metrics import registry, SMTP_BUCKETS
 # Constants for the email
 SENDER_EMAIL = "rajairethomas10@gmail.com"  # Sender email
 SENDER_PASSWORD = "wlaj vcwq ksew dmzd"  #"mkpn arvm gmph xvwy" Sender email password or app password for Gmail
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 465  # SSL port for Gmail
+SMTP_USE_SSL = True  # False for plain SMTP (e.g. a local debugging server)
+
+# Dispatcher settings
+ALERT_QUEUE_SIZE = 1000  # Pending emails before new alerts are dropped
+SMTP_TIMEOUT = 30  # Seconds per SMTP operation
+SMTP_IDLE_TIMEOUT = 60  # Close the pooled connection after this long without mail
+MAX_SEND_ATTEMPTS = 5
+RETRY_BACKOFF = 1.0  # First retry delay in seconds, doubled on each failure
+MAX_BACKOFF = 60.0
 
 # Logging setup (if required)
 
 
-def send_critical_alert(recipients, added_files, deleted_files, modified_files):
-    """Send a modern HTML email to all admins when critical files are altered."""
+def send_critical_alert(recipients, added_files, deleted_files, modified_files, unauthorized_files=None):
+    """Queue a modern HTML email to all admins when critical files are altered."""
     
     subject = "🚨 URGENT: Critical File Integrity Violation Detected! 🚨"
+    unauthorized_row = f"""
+            <tr>
+                <td style="color: red;">Unauthorized</td>
+                <td>{", ".join(unauthorized_files)}</td>
+            </tr>""" if unauthorized_files else ""
 
     # Modern Email Design
     content_html = f"""
@@ -38,28 +56,147 @@ def send_critical_alert(recipients, added_files, deleted_files, modified_files):
             <tr>
                 <td style="color: red;">Modified</td>
                 <td>{", ".join(modified_files) if modified_files else "None"}</td>
-            </tr>
+            </tr>{unauthorized_row}
         </table>
         <p><strong>Immediate action is required!</strong> Review the changes and restore backups if necessary.</p>
     </body>
     </html>
     """
 
-    for recipient in recipients:
+    alert_dispatcher.submit(recipients, subject, content_html)
+
+
+def is_permanent(error):
+    """Whether an SMTP error is a 5xx rejection that sending again cannot fix."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class AlertDispatcher:
+    """Send queued alert emails from a background thread over one pooled SMTP connection."""
+
+    def __init__(self, host=None, port=None, use_ssl=None, sender=None, password=None, queue_size=None):
+        self.host = host or SMTP_SERVER
+        self.port = port or SMTP_PORT
+        self.use_ssl = SMTP_USE_SSL if use_ssl is None else use_ssl
+        self.sender = sender or SENDER_EMAIL
+        self.password = SENDER_PASSWORD if password is None else password
+        self.queue = queue.Queue(maxsize=queue_size or ALERT_QUEUE_SIZE)
+        self.server = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="fim-alert-dispatcher", daemon=True)
+                self.thread.start()
+
+    def submit(self, recipients, subject, content_html):
+        """Queue one message per recipient; returns False if the queue is full."""
+        if self.thread is None:
+            self.start()
+        for recipient in recipients:
+            try:
+                self.queue.put_nowait((recipient, subject, content_html))
+            except queue.Full:
+                self.dropped += 1
+                fim_logger.error(f"Alert queue full, dropping email to {recipient}")
+                return False
+        return True
+
+    def flush(self, timeout=None):
+        """Block until every queued email has been handled (or the timeout passes)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=SMTP_IDLE_TIMEOUT)
+            except queue.Empty:
+                self._disconnect()  # Don't hold an idle session open
+                continue
+            try:
+                self._deliver(*item)
+            except Exception as e:  # A bad message must not stop the dispatcher
+                self.failed += 1
+                self._disconnect()
+                fim_logger.error(f"Error sending email to {item[0]}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _deliver(self, recipient, subject, content_html):
         msg = MIMEMultipart()
-        msg['From'] = SENDER_EMAIL
+        msg['From'] = self.sender
         msg['To'] = recipient
         msg['Subject'] = subject
 
         # Attach the HTML content
         msg.attach(MIMEText(content_html, 'html'))
+        payload = msg.as_string()
 
-        try:
-            # Set up the SMTP server
-            with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT) as server:
-                server.login(SENDER_EMAIL, SENDER_PASSWORD)
-                # Send the email
-                server.sendmail(SENDER_EMAIL, recipient, msg.as_string())
+        delay = RETRY_BACKOFF
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            started = time.perf_counter()
+            try:
+                self._connection().sendmail(self.sender, recipient, payload)
+                smtp_seconds.observe(time.perf_counter() - started, "sent")
+                self.sent += 1
                 fim_logger.info(f"Email sent successfully to {recipient}")
-        except Exception as e:
-            fim_logger.error(f"Error sending email to {recipient}: {e}")
+                return
+            except (smtplib.SMTPException, OSError) as e:
+                smtp_seconds.observe(time.perf_counter() - started, "error")
+                self._disconnect()  # Reconnect on the next attempt
+                if is_permanent(e):
+                    self.failed += 1
+                    fim_logger.error(f"Error sending email to {recipient}: rejected by the server: {e}")
+                    return
+                if attempt == MAX_SEND_ATTEMPTS:
+                    break
+                fim_logger.warning(f"Error sending email to {recipient} (attempt {attempt}): {e}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_BACKOFF)
+
+        self.failed += 1
+        fim_logger.error(f"Error sending email to {recipient}: giving up after {MAX_SEND_ATTEMPTS} attempts")
+
+    def _connection(self):
+        """Return the pooled, authenticated SMTP connection, opening it if needed."""
+        if self.server is None:
+            smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+            server = smtp_class(self.host, self.port, timeout=SMTP_TIMEOUT)
+            try:
+                if self.password:
+                    server.login(self.sender, self.password)
+            except Exception:
+                server.close()  # Not pooled yet, so nothing else would close the socket
+                raise
+            self.server = server
+        return self.server
+
+    def _disconnect(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+
+smtp_seconds = registry.histogram("fim_smtp_send_seconds", "SMTP send attempts (connect included) by result", SMTP_BUCKETS, "result")
+alert_dispatcher = AlertDispatcher()  # Shared by every caller in the process
+registry.sampled("fim_alert_queue_depth", "Alert emails waiting for the dispatcher", lambda: alert_dispatcher.queue.qsize())
+registry.sampled(
+    "fim_alert_emails_total", "Alert emails by outcome",
+    lambda: {"sent": alert_dispatcher.sent, "failed": alert_dispatcher.failed, "dropped": alert_dispatcher.dropped},
+    "outcome", kind="counter",
+)
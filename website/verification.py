@@ -0,0 +1,231 @@
+# verification.py
+import os
+import json
+import time
+import threading
+from itertools import islice
+from website.fim_utils import fim_logger
+from website.hash_engine import hash_file
+from website.accumulator import CHANGE_KINDS, MAX_SAMPLE_PATHS
+
+# Verification sweep settings
+VERIFY_MODE = "incremental"  # "incremental" trusts unchanged stat tuples, "full" re-hashes every file
+VERIFY_BYTES_PER_SECOND = 32 * 1024 * 1024  # Hashing budget shared by all sweeps (0 = unlimited)
+VERIFY_FILES_PER_SECOND = 2000  # Files examined per second across all sweeps (0 = unlimited)
+VERIFY_CHECKPOINT_EVERY = 1000  # Files between checkpoints...
+VERIFY_CHECKPOINT_SECONDS = 10  # ...or seconds, whichever comes first
+VERIFY_STATE_FILE = "verification.json"  # Resume points and last results per root
+VERIFY_PAGE_SIZE = 500  # Baseline entries read per query (no cursor stays open while the sweep sleeps)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`.
+
+    take() may overdraw the bucket for one large request (a big file) and then
+    sleeps until the balance is back to zero, so the long-run rate still holds.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, amount=1, stop_event=None):
+        """Spend tokens, sleeping as needed; returns the seconds spent waiting."""
+        if not self.rate:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            if stop_event is not None:
+                stop_event.wait(wait)
+            else:
+                time.sleep(wait)
+        return wait
+
+
+byte_bucket = TokenBucket(VERIFY_BYTES_PER_SECOND)
+file_bucket = TokenBucket(VERIFY_FILES_PER_SECOND)
+
+
+class CheckpointStore:
+    """Sweep state per root in one small JSON file, replaced atomically on every save."""
+
+    def __init__(self, path=None):
+        self.path = path or VERIFY_STATE_FILE
+        self.lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            fim_logger.error(f"ERROR | Ignoring corrupt verification state in {self.path}")
+            return {}
+
+    def load(self, root_name):
+        with self.lock:
+            return self._read().get(root_name)
+
+    def save(self, root_name, state):
+        with self.lock:
+            data = self._read()
+            data[root_name] = state
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+
+
+checkpoints = CheckpointStore()
+
+
+def new_sweep_state(mode, total):
+    return {
+        "status": "running",
+        "mode": mode,
+        "started": time.time(),
+        "finished": None,
+        "last_path": None,  # Resume point: every path up to this one has been verified
+        "total": total,  # Baseline size when the sweep started (ETA estimate)
+        "files": 0,
+        "bytes_hashed": 0,
+        "active_seconds": 0.0,  # Time actually spent sweeping (excludes downtime between resumes)
+        "throttled_seconds": 0.0,
+        "counts": dict.fromkeys(CHANGE_KINDS, 0),
+        "paths": {kind: [] for kind in CHANGE_KINDS},
+        "errors": 0,  # Files that could not be read (not counted as changes)
+        "error_paths": [],
+    }
+
+
+def sweep_progress(state):
+    """Percent done, rate and ETA for a sweep state."""
+    if not state:
+        return None
+    progress = {key: state[key] for key in ("status", "mode", "files", "total", "bytes_hashed", "counts")}
+    progress["errors"] = state.get("errors", 0)
+    rate = state["files"] / state["active_seconds"] if state["active_seconds"] else 0.0
+    remaining = max(0, state["total"] - state["files"])
+    progress["percent"] = min(100.0, round(100.0 * state["files"] / state["total"], 1)) if state["total"] else None
+    progress["files_per_second"] = round(rate, 1)
+    progress["eta_seconds"] = round(remaining / rate) if rate and state["status"] == "running" else None
+    progress["throttled_seconds"] = round(state["throttled_seconds"], 1)
+    return progress
+
+
+def _note(state, kind, relative_path):
+    state["counts"][kind] += 1
+    if len(state["paths"][kind]) < MAX_SAMPLE_PATHS:
+        state["paths"][kind].append(relative_path)
+
+
+def _note_error(state, relative_path):
+    state["errors"] = state.get("errors", 0) + 1
+    error_paths = state.setdefault("error_paths", [])
+    if len(error_paths) < MAX_SAMPLE_PATHS:
+        error_paths.append(relative_path)
+
+
+def paged_items(store, after=None, page_size=None):
+    """Baseline (path, entry) pairs in path order, one short query per page.
+
+    Each page is read completely before it is yielded, so no read cursor (or SQLite
+    read transaction) is held open while the caller sleeps on its I/O budget.
+    """
+    page_size = page_size or VERIFY_PAGE_SIZE
+    while True:
+        items = store.items(after=after)
+        page = list(islice(items, page_size))
+        items.close()
+        yield from page
+        if len(page) < page_size:
+            return
+        after = page[-1][0]
+
+
+def run_sweep(root, recipients=None, mode=None, stop_event=None):
+    """Verify one root against its baseline under the I/O budget, resuming from its checkpoint.
+
+    Returns the final sweep state; its status is "interrupted" if stop_event was set,
+    in which case the next call continues after the last checkpointed path.
+    """
+    from website.fim_monitor import (  # Avoid a circular import
+        entry_hash, iter_sorted_files, merge_join, send_batch_email_alert, signature_matches, email_batch,
+    )
+
+    state = checkpoints.load(root.name)
+    store = root.open_baseline()
+    resumed_at = time.monotonic()
+    try:
+        if not state or state["status"] == "completed":
+            state = new_sweep_state(mode or VERIFY_MODE, store.count())
+            fim_logger.info(f"INFO | Verification sweep of {root.name} started ({state['total']} baseline files)")
+        else:  # Interrupted, or the process died mid-sweep
+            state["status"] = "running"
+            fim_logger.info(f"INFO | Verification sweep of {root.name} resumed after {state['last_path']} ({state['files']} files done)")
+        root.sweep = state
+
+        resume_from = state["last_path"]
+        live_files = iter_sorted_files(root.path, critical=root.is_critical, start_after=resume_from)
+        last_checkpoint, since_checkpoint = resumed_at, 0
+
+        for relative_path, live, previous in merge_join(live_files, paged_items(store, resume_from)):
+            if stop_event is not None and stop_event.is_set():
+                state["status"] = "interrupted"
+                break
+
+            state["throttled_seconds"] += file_bucket.take(1, stop_event)
+            if live is None:
+                _note(state, "deleted", relative_path)
+            elif previous is None:
+                _note(state, "added", relative_path)
+            elif state["mode"] == "full" or not signature_matches(previous, live[2]):
+                _, file_path, signature = live
+                state["throttled_seconds"] += byte_bucket.take(signature["size"], stop_event)
+                sha256 = hash_file(file_path)
+                if sha256 is None:
+                    _note_error(state, relative_path)
+                elif sha256 != entry_hash(previous):
+                    _note(state, "modified", relative_path)
+                state["bytes_hashed"] += signature["size"]
+
+            state["files"] += 1
+            state["last_path"] = relative_path
+            since_checkpoint += 1
+            now = time.monotonic()
+            if since_checkpoint >= VERIFY_CHECKPOINT_EVERY or now - last_checkpoint >= VERIFY_CHECKPOINT_SECONDS:
+                state["active_seconds"] += now - resumed_at
+                resumed_at = last_checkpoint = now
+                since_checkpoint = 0
+                checkpoints.save(root.name, state)
+        else:
+            state["status"] = "completed"
+            state["finished"] = time.time()
+    finally:
+        store.close()
+        if state is not None:
+            state["active_seconds"] += time.monotonic() - resumed_at
+            checkpoints.save(root.name, state)
+
+    if state["status"] == "completed":
+        fim_logger.info(
+            f"INFO | Verification sweep of {root.name} finished: {state['files']} files, "
+            f"{state['bytes_hashed']} bytes hashed, {state['counts']} in {state['active_seconds']:.1f}s"
+        )
+        if state.get("errors"):
+            fim_logger.error(f"ERROR | Verification sweep of {root.name} could not read {state['errors']} files: {state['error_paths']}")
+        if any(state["counts"].values()):
+            fim_logger.warning(f"WARNING | Verification sweep of {root.name} found changes missed by the watcher")
+            if recipients:
+                email_batch.window(recipients).record(**state["paths"])
+                send_batch_email_alert(recipients)
+    return state
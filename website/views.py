@@ -1,19 +1,43 @@
-from flask import Blueprint, render_template, request, jsonify, send_from_directory
+from flask import Blueprint, Response, render_template, request, jsonify, send_from_directory
 from flask_login import login_required, current_user
 import os
 import shutil
+import hashlib
+import hmac
 import threading
+import time
 import logging
-from watchdog.events import FileCreatedEvent, FileDeletedEvent, FileMovedEvent, DirCreatedEvent
-from .fim_monitor import is_critical, restore_backup, fim_logger, user_fim_handlers,start_fim_monitor
+from watchdog.events import FileCreatedEvent, FileDeletedEvent, FileMovedEvent, DirCreatedEvent, DirDeletedEvent, DirMovedEvent
+from .fim_monitor import restore_backup, fim_logger, user_fim_handlers, ingest_directory, subscribe, stop_fim_monitor
+from .roots import root_registry
+from . import MONITOR_DIR
+from .dir_cache import directory_cache
+from .event_store import get_event_store
+from .log_store import make_filter, parse_cursor, read_tail, wait_for_lines
+from .jobs import job_tracker
+from .metrics import registry
 # In views.py
 from .handler import FIMHandler
 
 views = Blueprint('views', __name__)
 
-# Set the ROOT_FOLDER dynamically
+# The file browser works on the default monitored root
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))  # Gets the Flask app directory
-ROOT_FOLDER = os.path.join(os.path.dirname(BASE_DIR), "Monitor")  # Moves up one level
+ROOT_FOLDER = MONITOR_DIR
+
+# File browser paging
+LIST_PAGE_SIZE = 500  # Default entries per /api/list page
+MAX_LIST_PAGE_SIZE = 5000
+MAX_TREE_DEPTH = 3  # Levels returned by one /api/tree call (the UI expands lazily)
+MAX_BULK_OPERATIONS = 10000  # Items accepted by one /api/bulk request
+BULK_OPERATIONS = ("create-file", "create-folder", "delete", "rename")
+
+# Log streaming
+MAX_LOG_WAIT = 30  # Longest /logs long-poll in seconds
+LOG_STREAM_HEARTBEAT = 15  # Seconds between keep-alive comments on /logs/stream
+
+# Metrics
+METRICS_TOKEN = None  # Bearer token for Prometheus scrapers (None = logged-in admins only)
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG)
@@ -39,6 +63,7 @@ def get_root():
 @views.route("/api/list")
 @login_required
 def list_directory():
+    """One page of a folder listing (folders first, then by name), revalidated via ETag."""
     requested_path = request.args.get("path", "").strip()
     abs_path = os.path.normpath(os.path.join(ROOT_FOLDER, *requested_path.split("/")))
 
@@ -46,37 +71,73 @@ def list_directory():
         return jsonify({"error": "Access Denied"}), 403
 
     try:
-        items = [
-            {
-                "name": entry.name,
-                "path": os.path.relpath(entry.path, ROOT_FOLDER),
-                "isFolder": entry.is_dir(),
-                "isCritical": is_critical(entry.path),
-            }
-            for entry in os.scandir(abs_path)
-        ]
-        return jsonify({"files": items})
+        limit = max(1, min(int(request.args.get("limit", LIST_PAGE_SIZE)), MAX_LIST_PAGE_SIZE))
+        cursor = request.args.get("cursor") or None
+        items, next_cursor, listing = directory_cache.page(abs_path, cursor, limit)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor or limit"}), 400
     except PermissionError:
         return jsonify({"error": "Access Denied"}), 403
+    except FileNotFoundError:
+        return jsonify({"error": "Folder not found"}), 404
+
+    relative_dir = os.path.relpath(abs_path, ROOT_FOLDER)
+    files = [
+        {
+            "name": item["name"],
+            "path": item["name"] if relative_dir == "." else os.path.join(relative_dir, item["name"]),
+            "isFolder": item["isFolder"],
+            "isCritical": item["isCritical"],
+        }
+        for item in items
+    ]
+    response = jsonify({"files": files, "nextCursor": next_cursor, "total": len(listing["items"])})
+    response.set_etag(f"{listing['etag']}:{cursor or ''}:{limit}")
+    return response.make_conditional(request)
 
 @views.route("/api/tree")
 @login_required
 def get_folder_tree():
-    def build_tree(directory):
+    """Folder tree below `path`, `depth` levels deep; deeper nodes are expanded on demand."""
+    requested_path = request.args.get("path", "").strip()
+    abs_path = os.path.normpath(os.path.join(ROOT_FOLDER, *requested_path.split("/")))
+
+    if not abs_path.startswith(ROOT_FOLDER):
+        return jsonify({"error": "Access Denied"}), 403
+
+    try:
+        depth = max(1, min(int(request.args.get("depth", 1)), MAX_TREE_DEPTH))
+    except ValueError:
+        return jsonify({"error": "Invalid depth"}), 400
+
+    etags = []
+
+    def build_tree(directory, levels):
         tree = []
         try:
-            for entry in os.scandir(directory):
-                if entry.is_dir():
-                    tree.append({
-                        "name": entry.name,
-                        "path": os.path.relpath(entry.path, ROOT_FOLDER),
-                        "children": build_tree(entry.path),
-                    })
-        except PermissionError:
+            listing = directory_cache.listing(directory)
+        except OSError:
             return []
+        etags.append(listing["etag"])
+        for item in listing["items"]:
+            if not item["isFolder"]:
+                break  # Folders sort first
+            child = os.path.join(directory, item["name"])
+            has_children = directory_cache.has_subfolders(child)
+            etags.append(str(int(has_children)))  # Depends on the child's own listing
+            node = {
+                "name": item["name"],
+                "path": os.path.relpath(child, ROOT_FOLDER),
+                "hasChildren": has_children,
+            }
+            if levels > 1:
+                node["children"] = build_tree(child, levels - 1)
+            tree.append(node)
         return tree
 
-    return jsonify(build_tree(ROOT_FOLDER))
+    response = jsonify(build_tree(abs_path, depth))
+    response.set_etag(hashlib.sha1(f"{depth}:{':'.join(etags)}".encode()).hexdigest())
+    return response.make_conditional(request)
 
 @views.route("/api/file")
 @login_required
@@ -90,11 +151,34 @@ def serve_file():
     return send_from_directory(os.path.dirname(abs_path), os.path.basename(abs_path))
 
 # --- File Operations ---
-from watchdog.events import FileCreatedEvent, FileDeletedEvent, DirCreatedEvent, FileMovedEvent
+# Endpoints only queue FIM notifications (the event pipeline does the logging, hashing
+# and alerting); folder deletes and renames run as background jobs (see /api/jobs).
 
 def get_fim_handler():
     """Retrieve the FIM handler for the current user."""
-    return user_fim_handlers.get(current_user.firstName, FIMHandler(current_user.role, current_user.firstName))
+    return user_fim_handlers.get(current_user.firstName) or FIMHandler(current_user.role, current_user.firstName)
+
+
+def busy_response(*paths):
+    """409 response if a background job is still working on one of the paths (None otherwise)."""
+    job = job_tracker.busy(*paths)
+    if job:
+        return jsonify({"error": "A background operation is still running on this path", "job": job}), 409
+    return None
+
+
+def delete_tree(abs_path, handler):
+    """Background job: remove a folder, then queue its FIM notification."""
+    with handler.operating_on(abs_path):
+        shutil.rmtree(abs_path)  # If it fails midway, the watcher's records of what went are still this user's
+        handler.on_any_event(DirDeletedEvent(abs_path))
+
+
+def move_tree(abs_path, new_path, handler):
+    """Background job: rename a folder, then queue its FIM notification."""
+    with handler.operating_on(abs_path, new_path):
+        os.rename(abs_path, new_path)
+        handler.on_any_event(DirMovedEvent(abs_path, new_path))
 
 
 @views.route("/api/create-file", methods=["POST"])
@@ -112,6 +196,10 @@ def create_file():
     if not file_path.startswith(ROOT_FOLDER):
         return jsonify({"error": "Access Denied"}), 403
 
+    busy = busy_response(file_path)
+    if busy:
+        return busy
+
     try:
         with open(file_path, 'w'):
             pass  # Create an empty file
@@ -142,11 +230,19 @@ def delete_item():
     if not os.path.exists(abs_path):
         return jsonify({"error": "File not found"}), 404
 
+    busy = busy_response(abs_path)
+    if busy:
+        return busy
+
     try:
         if os.path.isdir(abs_path):
-            shutil.rmtree(abs_path)
-        else:
-            os.remove(abs_path)
+            # Large folders can take a while, so the response doesn't wait for rmtree
+            job = job_tracker.submit(
+                "delete", current_user.firstName, relative_path, [abs_path], delete_tree, abs_path, get_fim_handler()
+            )
+            return jsonify({"success": True, "job": job}), 202
+
+        os.remove(abs_path)
 
         # Correct event type
         event = FileDeletedEvent(abs_path)
@@ -172,6 +268,10 @@ def create_folder():
     if not folder_path.startswith(ROOT_FOLDER):
         return jsonify({"error": "Access Denied"}), 403
 
+    busy = busy_response(folder_path)
+    if busy:
+        return busy
+
     try:
         os.makedirs(folder_path, exist_ok=True)
 
@@ -206,7 +306,18 @@ def edit_item():
     if not new_path.startswith(ROOT_FOLDER):
         return jsonify({"error": "Access Denied"}), 403
 
+    busy = busy_response(abs_path, new_path)
+    if busy:
+        return busy
+
     try:
+        if os.path.isdir(abs_path):
+            job = job_tracker.submit(
+                "rename", current_user.firstName, relative_path, [abs_path, new_path],
+                move_tree, abs_path, new_path, get_fim_handler()
+            )
+            return jsonify({"success": True, "job": job}), 202
+
         os.rename(abs_path, new_path)
 
         # Correct event type
@@ -219,18 +330,173 @@ def edit_item():
 
 
 
+def resolve_bulk_item(item):
+    """Validate one /api/bulk item; returns (op, abs_path, new_path) or raises ValueError."""
+    op = item.get("op")
+    if op not in BULK_OPERATIONS:
+        raise ValueError(f"Unknown operation: {op}")
+    path = str(item.get("path", "")).strip()
+    if op in ("create-file", "create-folder"):
+        name = str(item.get("name", "")).strip()
+        if not name:
+            raise ValueError("Invalid name")
+        abs_path = os.path.normpath(os.path.join(ROOT_FOLDER, *path.split("/"), name))
+    else:
+        if not path:
+            raise ValueError("Invalid path")
+        abs_path = os.path.normpath(os.path.join(ROOT_FOLDER, *path.split("/")))
+    if not abs_path.startswith(ROOT_FOLDER + os.sep):
+        raise ValueError("Access Denied")
+
+    new_path = None
+    if op == "rename":
+        new_name = str(item.get("newName", "")).strip()
+        if not new_name:
+            raise ValueError("Invalid input")
+        new_path = os.path.normpath(os.path.join(os.path.dirname(abs_path), new_name))
+        if not new_path.startswith(ROOT_FOLDER + os.sep):
+            raise ValueError("Access Denied")
+    return op, abs_path, new_path
+
+
+def run_bulk(items, handler):
+    """Background job: apply bulk items in order, then send one FIM notification for all of them."""
+    results, changes = [], []
+    baseline = None  # Opened for the first folder delete/rename, to claim the files under it
+    try:
+        for index, (op, abs_path, new_path, error) in enumerate(items):
+            result = {"index": index, "op": op, "success": False}
+            try:
+                if error:
+                    raise ValueError(error)
+                started = time.monotonic()
+                if op == "create-file":
+                    with open(abs_path, "w"):
+                        pass  # Create an empty file
+                    change = ("created", abs_path, None, False)
+                elif op == "create-folder":
+                    try:
+                        os.makedirs(abs_path)
+                        change = ("created", abs_path, None, True)
+                    except FileExistsError:
+                        if not os.path.isdir(abs_path):
+                            raise
+                        change = None  # Already there: nothing changed, so nothing is reported or claimed
+                elif op == "delete":
+                    is_directory = os.path.isdir(abs_path)
+                    if is_directory:
+                        with handler.operating_on(abs_path):
+                            shutil.rmtree(abs_path)
+                    else:
+                        os.remove(abs_path)
+                    change = ("deleted", abs_path, None, is_directory)
+                else:
+                    is_directory = os.path.isdir(abs_path)
+                    with handler.operating_on(*((abs_path, new_path) if is_directory else ())):
+                        os.rename(abs_path, new_path)
+                    change = ("moved", abs_path, new_path, is_directory)
+                if change:
+                    if change[3] and op != "create-folder" and baseline is None:
+                        baseline = handler.root.open_baseline()
+                    # The batch is reported once below, so the watcher's copies of exactly this change are dropped
+                    handler.claim_bulk_change(change, baseline, started)
+                    changes.append(change)
+                result["success"] = True
+            except FileNotFoundError:
+                result["error"] = "File not found"
+            except Exception as e:
+                result["error"] = str(e)
+            results.append(result)
+    finally:
+        if baseline is not None:
+            baseline.close()
+
+    if changes:
+        paths = [path for change in changes for path in change[1:3] if path]
+        handler.handle_bulk(changes, os.path.commonpath([os.path.dirname(path) for path in paths]))
+    succeeded = sum(1 for result in results if result["success"])
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+@views.route("/api/bulk", methods=["POST"])
+@login_required
+def bulk_operations():
+    """Create, delete and rename many items in one background job with one FIM event and alert.
+
+    Body: {"operations": [{"op": "create-file" | "create-folder" | "delete" | "rename",
+    "path": ..., "name": ... (create), "newName": ... (rename)}, ...]}. Items run in
+    order; per-item results are in the job status.
+    """
+    data = request.get_json(silent=True) or {}
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "No operations given"}), 400
+    if len(operations) > MAX_BULK_OPERATIONS:
+        return jsonify({"error": f"At most {MAX_BULK_OPERATIONS} operations per request"}), 400
+
+    # The job locks the folders it works in (a handful), not every one of its paths
+    items, locked = [], set()
+    for item in operations:
+        try:
+            op, abs_path, new_path = resolve_bulk_item(item if isinstance(item, dict) else {})
+        except ValueError as e:
+            items.append((item.get("op") if isinstance(item, dict) else None, None, None, str(e)))
+            continue
+        items.append((op, abs_path, new_path, None))
+        locked.update(os.path.dirname(path) for path in (abs_path, new_path) if path)
+
+    busy = busy_response(*locked)
+    if busy:
+        return busy
+
+    job = job_tracker.submit(
+        "bulk", current_user.firstName, f"{len(items)} operations", sorted(locked), run_bulk, items, get_fim_handler()
+    )
+    return jsonify({"success": True, "job": job}), 202
+
+
+@views.route("/api/jobs")
+@login_required
+def list_jobs():
+    """Background file operations, newest first (admins see everyone's)."""
+    owner = None if current_user.role == "admin" else current_user.firstName
+    return jsonify({"jobs": job_tracker.list(owner)})
+
+
+@views.route("/api/jobs/<job_id>")
+@login_required
+def job_status(job_id):
+    """Status of one background file operation."""
+    job = job_tracker.get(job_id)
+    if job is None or (current_user.role != "admin" and job["owner"] != current_user.firstName):
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+def requested_root():
+    """The monitored root named by ?root= (the default root when absent), or None if unknown."""
+    name = request.args.get("root")
+    return root_registry.get(name) if name else root_registry.default
+
+
 @views.route('/start-monitoring')
 @login_required
 def start_monitoring():
-    """Start File Integrity Monitoring."""
+    """Start File Integrity Monitoring (adds a reference to the root's observer)."""
     username = current_user.firstName
+    root = requested_root()
+    if root is None:
+        return jsonify({"error": "Unknown root"}), 404
 
-    if username in user_fim_handlers:
-        return jsonify({"message": "FIM monitoring already running."}), 400
+    # Checked and subscribed atomically, so concurrent starts can't both create a subscription
+    references, new = subscribe(root.path, current_user.role, username)
+    if not new:
+        return jsonify({"message": "FIM monitoring already running.", "references": references})
 
-    fim_thread = threading.Thread(target=start_fim_monitor, args=(ROOT_FOLDER, current_user.role, username), daemon=True)
+    # Back up and baseline the root in the background
+    fim_thread = threading.Thread(target=ingest_directory, args=(root.path,), daemon=True)
     fim_thread.start()
-    fim_logger.info(f"FIM monitoring started for {username}")
+    fim_logger.info(f"FIM monitoring started for {username} on {root.name}")
 
     return jsonify({"message": "FIM monitoring started."})
 
@@ -238,25 +504,104 @@ def start_monitoring():
 @views.route('/stop-monitoring')
 @login_required
 def stop_monitoring():
-    """Stop File Integrity Monitoring."""
+    """Stop File Integrity Monitoring (drops a reference; the watch ends with the last one)."""
     username = current_user.firstName
-    if username in user_fim_handlers:
-        observer = user_fim_handlers[username].observer
-        observer.stop()
-        observer.join()
-        del user_fim_handlers[username]
-        fim_logger.info(f"Stopped FIM monitoring for {username}")
-        return jsonify({"message": "FIM monitoring stopped."})
-    
-    return jsonify({"message": "No active monitoring session."}), 400
+    root = requested_root()
+    if root is None:
+        return jsonify({"error": "Unknown root"}), 404
+    remaining = stop_fim_monitor(username, root.path)
+
+    if remaining is None:
+        return jsonify({"message": "No active monitoring session."}), 400
+    if remaining:
+        return jsonify({"message": "FIM monitoring still in use.", "references": remaining})
+    return jsonify({"message": "FIM monitoring stopped."})
+
+@views.route("/api/roots")
+@login_required
+def list_roots():
+    """Monitored roots with their scan schedule and last scan result."""
+    return jsonify({"roots": [root.status() for root in root_registry]})
+
+@views.route("/api/events")
+@login_required
+def list_events():
+    """Page through recorded FIM events, newest first (employees only see their own)."""
+    args = request.args
+    user = args.get("user") if current_user.role == "admin" else current_user.firstName
+    flags = {"true": True, "1": True, "false": False, "0": False}
+    try:
+        events, next_cursor = get_event_store().query(
+            user=user,
+            path=args.get("path"),
+            event_type=args.get("type"),
+            since=args.get("since", type=float),
+            until=args.get("until", type=float),
+            critical=flags.get(args.get("critical", "").lower()),
+            unauthorized=flags.get(args.get("unauthorized", "").lower()),
+            root=args.get("root"),
+            cursor=args.get("cursor"),
+            limit=args.get("limit", type=int),
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    return jsonify({"events": events, "nextCursor": next_cursor})
 
 @views.route("/logs")
 @login_required
 def get_logs():
+    """Log lines as text: the tail by default, or the lines after `cursor` (long-polled with `wait`).
+
+    The next cursor comes back in the X-Log-Cursor header; `level` and `user` filter server-side.
+    """
     try:
-        with open("fim.log", "r") as log_file:
-            logs = log_file.read()
-        return logs, 200, {"Content-Type": "text/plain"}
+        line_filter = make_filter(request.args.get("level"), request.args.get("user"))
+        limit = request.args.get("limit", type=int)
+        cursor = request.args.get("cursor")
+        if cursor:
+            wait = min(max(request.args.get("wait", 0, type=float), 0), MAX_LOG_WAIT)
+            lines, next_cursor = wait_for_lines(cursor, wait, line_filter=line_filter, limit=limit)
+        else:
+            lines, next_cursor = read_tail(request.args.get("tail", type=int) or limit, line_filter=line_filter)
+    except ValueError:
+        return "Invalid cursor", 400
     except Exception as e:
         return str(e), 500
 
+    body = "".join(line + "\n" for line in lines)
+    return body, 200, {"Content-Type": "text/plain", "X-Log-Cursor": next_cursor}
+
+@views.route("/logs/stream")
+@login_required
+def stream_logs():
+    """Server-sent events version of /logs (tail -f); resumes from Last-Event-ID."""
+    line_filter = make_filter(request.args.get("level"), request.args.get("user"))
+    cursor = request.headers.get("Last-Event-ID") or request.args.get("cursor")
+    try:
+        if cursor:
+            parse_cursor(cursor)
+        else:
+            _, cursor = read_tail(1)  # Start at the end of the live log
+    except ValueError:
+        return "Invalid cursor", 400
+
+    def events(cursor):
+        while True:
+            lines, cursor = wait_for_lines(cursor, LOG_STREAM_HEARTBEAT, line_filter=line_filter)
+            if not lines:
+                yield ": keep-alive\n\n"
+                continue
+            data = "".join(f"data: {line}\n" for line in lines)
+            yield f"id: {cursor}\n{data}\n"
+
+    return Response(events(cursor), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@views.route("/metrics")
+def metrics():
+    """Prometheus text exposition of the FIM engine's counters, gauges and histograms."""
+    token = request.headers.get("Authorization", "")
+    scraper = METRICS_TOKEN is not None and hmac.compare_digest(token, f"Bearer {METRICS_TOKEN}")
+    if not scraper and not (current_user.is_authenticated and current_user.role == "admin"):
+        return Response("Forbidden\n", status=403, mimetype="text/plain")
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")